@@ -0,0 +1,685 @@
+"""
+Load and latency benchmark for submission_server.py
+
+Starts a local OpenAI-compatible stub (latency, token rate, malformed/truncated output),
+a fake Google Calendar API over synthetic calendars, then the server itself, and drives
+/receive with a replayable workload at each concurrency level. Results are written as JSON
+so runs against different versions of submission_server.py can be compared:
+
+    python benchmark.py run --concurrency 1,8,32 --requests 200 --output results/new.json
+    python benchmark.py run --server ../old/submission_server.py --output results/old.json
+    python benchmark.py compare results/old.json results/new.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+IST = timezone(timedelta(hours=5, minutes=30))
+EMPLOYEES = [
+    "userone.amd@gmail.com",
+    "usertwo.amd@gmail.com",
+    "userthree.amd@gmail.com"
+]
+ISO_RE = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}[+-]\d{2}:\d{2}')
+
+def ist(dt: datetime) -> str:
+    return dt.astimezone(IST).strftime('%Y-%m-%dT%H:%M:%S+05:30')
+
+def parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return round(ordered[rank], 2)
+
+def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 2) if values else None,
+        "mean": round(sum(values) / len(values), 2) if values else None
+    }
+
+def start_http_server(handler_class, port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# Stub LLM: answers each agent prompt with plausible JSON, paced like a real model
+
+class StubLLM:
+    def __init__(self, latency_ms: float, tokens_per_sec: float, malformed_rate: float,
+                 truncated_rate: float, max_concurrency: int, seed: int):
+        self.latency = latency_ms / 1000.0
+        self.tokens_per_sec = tokens_per_sec
+        self.malformed_rate = malformed_rate
+        self.truncated_rate = truncated_rate
+        self.slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = defaultdict(int)
+        self.server = None
+
+    def answer(self, prompt: str) -> str:
+        if "Parse this meeting request" in prompt:
+            kind = "parse"
+            match = re.search(r'Current date: (\d{4}-\d{2}-\d{2})', prompt)
+            base = datetime.strptime(match.group(1), '%Y-%m-%d') if match else datetime(2025, 7, 14)
+            day = base + timedelta(days=1)
+            while day.weekday() >= 5:
+                day += timedelta(days=1)
+            text = json.dumps({"duration_minutes": 30, "urgency": "medium",
+                               "preferred_datetime": day.strftime('%Y-%m-%dT14:00:00+05:30')})
+        elif prompt.startswith("Find "):
+            kind = "find_slots"
+            match = re.search(r'between (\S+) and', prompt)
+            duration = int(re.search(r'Find (\d+)min', prompt).group(1))
+            day = parse_time(match.group(1)).astimezone(IST).replace(minute=0, second=0) if match else datetime(2025, 7, 14, tzinfo=IST)
+            text = json.dumps([{"start": ist(day.replace(hour=hour)),
+                                "end": ist(day.replace(hour=hour) + timedelta(minutes=duration)),
+                                "score": round(0.95 - i * 0.1, 2)}
+                               for i, hour in enumerate((10, 11, 14, 15, 16))])
+        elif " ranking " in prompt:
+            kind = "rank_slots"
+            count = len(re.findall(r'^\d+: ', prompt, re.M))
+            text = json.dumps([{"index": i, "score": round(0.95 - i * 0.05, 2)} for i in range(min(count, 5))])
+        elif " negotiation." in prompt or "Boss final decision" in prompt:
+            kind = "negotiate" if " negotiation." in prompt else "decide"
+            # First concrete slot after the prompt header, skipping the example in the template
+            times = [t for t in ISO_RE.findall(prompt) if not t.startswith("2025-07-17T14:00")]
+            start = times[0] if times else "2025-07-17T14:00:00+05:30"
+            end = times[1] if len(times) > 1 else ist(parse_time(start) + timedelta(minutes=30))
+            text = json.dumps({"start": start, "end": end, "confidence": 0.9})
+        else:
+            kind = "other"
+            text = "{}"
+
+        roll = self.random.random()
+        with self.lock:
+            self.calls[kind] += 1
+            if roll < self.malformed_rate:
+                self.calls["malformed"] += 1
+                return "I am sorry, I could not find a suitable answer for that request."
+            if roll < self.malformed_rate + self.truncated_rate:
+                self.calls["truncated"] += 1
+                return text[:max(1, int(len(text) * 0.6))]
+        return text
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.calls)
+
+    def start(self, port: int = 0) -> str:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if stub.slots:
+                    stub.slots.acquire()
+                try:
+                    if self.path.endswith('/chat/completions'):
+                        self._chat(body)
+                    elif self.path.endswith('/completions'):
+                        self._completions(body)
+                    else:
+                        self._json(404, {"error": {"message": "unknown path"}})
+                finally:
+                    if stub.slots:
+                        stub.slots.release()
+
+            def _chat(self, body: Dict):
+                prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+                text = stub.answer(prompt)
+                time.sleep(stub.latency)
+                if body.get("stream"):
+                    self._stream(text)
+                    return
+                time.sleep(len(text) / 4.0 / stub.tokens_per_sec)
+                self._json(200, {
+                    "id": "bench", "object": "chat.completion", "created": int(time.time()), "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4,
+                              "total_tokens": (len(prompt) + len(text)) // 4}
+                })
+
+            def _stream(self, text: str):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                chunk_chars = 16  # about four tokens per event
+                try:
+                    for i in range(0, len(text), chunk_chars):
+                        piece = text[i:i + chunk_chars]
+                        time.sleep(len(piece) / 4.0 / stub.tokens_per_sec)
+                        event = {"id": "bench", "object": "chat.completion.chunk", "created": int(time.time()), "model": "stub",
+                                 "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client stopped reading once its JSON value was complete
+                self.close_connection = True
+
+            def _completions(self, body: Dict):
+                prompts = body.get("prompt")
+                prompts = prompts if isinstance(prompts, list) else [prompts or ""]
+                texts = [stub.answer(p) for p in prompts]
+                time.sleep(stub.latency + max(len(t) for t in texts) / 4.0 / stub.tokens_per_sec)
+                self._json(200, {
+                    "id": "bench", "object": "text_completion", "created": int(time.time()), "model": body.get("model", "stub"),
+                    "choices": [{"index": i, "text": t, "finish_reason": "stop", "logprobs": None} for i, t in enumerate(texts)],
+                    "usage": {"prompt_tokens": sum(len(p) for p in prompts) // 4, "completion_tokens": sum(len(t) for t in texts) // 4,
+                              "total_tokens": sum(len(p) for p in prompts + texts) // 4}
+                })
+
+            def _json(self, status: int, payload: Dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = start_http_server(Handler, port)
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+# Fake Calendar API: events.list, freeBusy and the multipart batch endpoint over synthetic calendars
+
+class FakeCalendar:
+    PAGE_SIZE = 25
+
+    def __init__(self, seed: int, start: datetime, days: int, events_per_day: int, latency_ms: float):
+        self.latency = latency_ms / 1000.0
+        self.lock = threading.Lock()
+        self.calls = defaultdict(int)
+        self.events = {email: self._synthesize(random.Random(f"{seed}:{email}"), email, start, days, events_per_day)
+                       for email in EMPLOYEES}
+        self.server = None
+
+    @staticmethod
+    def _synthesize(rng: random.Random, email: str, start: datetime, days: int, per_day: int) -> List[Dict]:
+        events = []
+        for offset in range(days):
+            day = (start + timedelta(days=offset)).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=IST)
+            if day.weekday() >= 5:
+                continue
+            for half_hour in sorted(rng.sample(range(18, 36), min(18, rng.randint(max(0, per_day - 2), per_day + 2)))):
+                begin = day + timedelta(minutes=30 * half_hour)
+                end = begin + timedelta(minutes=rng.choice((30, 30, 60, 90)))
+                events.append({
+                    "summary": rng.choice(("Standup", "1:1", "Design review", "Customer call", "Focus time")),
+                    "start": {"dateTime": ist(begin)},
+                    "end": {"dateTime": ist(end)},
+                    "attendees": [{"email": email}, {"email": rng.choice(EMPLOYEES)}]
+                })
+        for index, event in enumerate(events):
+            event["id"] = f"{email}-{index}"
+        return events
+
+    def _owner(self, authorization: Optional[str]) -> Optional[str]:
+        token = (authorization or "").split(" ", 1)[-1]
+        return token[len("bench-"):] if token.startswith("bench-") else None
+
+    def _in_range(self, email: str, time_min: str, time_max: str) -> List[Dict]:
+        lo, hi = parse_time(time_min), parse_time(time_max)
+        return [e for e in self.events.get(email, [])
+                if parse_time(e["end"]["dateTime"]) > lo and parse_time(e["start"]["dateTime"]) < hi]
+
+    def handle(self, method: str, path: str, body: Optional[str], authorization: Optional[str]) -> Dict:
+        url = urlparse(path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        owner = self._owner(authorization)
+        if url.path.endswith('/events'):
+            with self.lock:
+                self.calls["events.list"] += 1
+            calendar_id = url.path.rstrip('/').split('/')[-2]
+            email = owner if calendar_id == 'primary' else calendar_id
+            if "syncToken" in query:
+                items = []  # the synthetic calendars never change after startup
+            elif "timeMin" in query:
+                items = self._in_range(email, query["timeMin"], query["timeMax"])
+            else:
+                items = self.events.get(email, [])
+            offset = int(query.get("pageToken", 0))
+            page = {"items": items[offset:offset + self.PAGE_SIZE]}
+            if offset + self.PAGE_SIZE < len(items):
+                page["nextPageToken"] = str(offset + self.PAGE_SIZE)
+            elif "timeMin" not in query:
+                page["nextSyncToken"] = f"sync-{email}"
+            return page
+        if url.path.endswith('/freeBusy'):
+            with self.lock:
+                self.calls["freebusy"] += 1
+            request = json.loads(body or '{}')
+            calendars = {}
+            for item in request.get("items", []):
+                email = owner if item["id"] == 'primary' else item["id"]
+                if email in self.events:
+                    calendars[item["id"]] = {"busy": [{"start": e["start"]["dateTime"], "end": e["end"]["dateTime"]}
+                                                      for e in self._in_range(email, request["timeMin"], request["timeMax"])]}
+                else:
+                    calendars[item["id"]] = {"errors": [{"domain": "global", "reason": "notFound"}]}
+            return {"kind": "calendar#freeBusy", "calendars": calendars}
+        return {}
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.calls)
+
+    def start(self, port: int = 0) -> str:
+        calendar = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(calendar.latency)
+                self._json(calendar.handle('GET', self.path, None, self.headers.get('Authorization')))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+                time.sleep(calendar.latency)
+                if self.path.startswith('/batch'):
+                    self._batch(body)
+                else:
+                    self._json(calendar.handle('POST', self.path, body, self.headers.get('Authorization')))
+
+            def _batch(self, body: str):
+                with calendar.lock:
+                    calendar.calls["batch"] += 1
+                boundary = self.headers['Content-Type'].split('boundary=')[1].strip('"')
+                parts = [p for p in body.replace('\r\n', '\n').split('--' + boundary) if p.strip() and p.strip() != '--']
+                out = []
+                for part in parts:
+                    content_id = re.search(r'Content-ID: <(.*?)>', part).group(1)
+                    inner = part.strip('\n').split('\n\n', 1)[1]
+                    head, _, inner_body = inner.partition('\n\n')
+                    request_line, *header_lines = head.split('\n')
+                    method, path, _ = request_line.split(' ')
+                    headers = {k.strip().lower(): v.strip() for k, _, v in (h.partition(':') for h in header_lines)}
+                    payload = json.dumps(calendar.handle(method, path, inner_body.strip() or None,
+                                                         headers.get('authorization', self.headers.get('Authorization'))))
+                    out.append(f"--bench_batch\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                               f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n{payload}\r\n")
+                data = (''.join(out) + "--bench_batch--\r\n").encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'multipart/mixed; boundary=bench_batch')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _json(self, payload: Dict):
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = start_http_server(Handler, port)
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+def write_tokens(directory: str):
+    """Token files the server loads from TOKEN_BASE_PATH; the fake calendar maps the bearer back to the owner"""
+    for email in EMPLOYEES:
+        with open(os.path.join(directory, f"{email.split('@')[0]}.token"), 'w') as f:
+            json.dump({
+                "token": f"bench-{email}",
+                "refresh_token": "bench",
+                "token_uri": "https://oauth2.googleapis.com/token",
+                "client_id": "bench",
+                "client_secret": "bench",
+                "scopes": ["https://www.googleapis.com/auth/calendar"],
+                "expiry": "2099-01-01T00:00:00Z"
+            }, f)
+
+# Workload: deterministic from a seed, saved/replayed as JSONL (the /receive_batch input format)
+
+EMAIL_TEMPLATES = [
+    "Hi team, let's meet {day} at {hour} for {duration} minutes to discuss {topic}.",
+    "Can we sync {day} at {hour}? {duration} mins should be enough for {topic}.",
+    "Urgent: need {duration} minutes {day} to go over {topic}.",
+    "Let's catch up {day} about {topic}.",
+    "Please find time next week for a {duration} minute review of {topic}.",
+    "Quick call when everyone is free this week? Want to talk about {topic}."
+]
+TOPICS = ("the roadmap", "Q3 planning", "the launch checklist", "hiring", "the incident review", "budget")
+
+def generate_workload(count: int, seed: int, base: datetime) -> List[Dict]:
+    rng = random.Random(seed)
+    workload = []
+    for i in range(count):
+        sender = rng.choice(EMPLOYEES)
+        attendees = [e for e in EMPLOYEES if e != sender]
+        attendees = rng.sample(attendees, rng.randint(1, len(attendees)))
+        received = base + timedelta(days=rng.randint(0, 20), hours=rng.randint(8, 18), minutes=rng.randint(0, 59))
+        content = rng.choice(EMAIL_TEMPLATES).format(
+            day=rng.choice(("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "tomorrow", "next Tuesday")),
+            hour=rng.choice(("10 AM", "11:30 AM", "2 PM", "3:30 PM", "4 PM")),
+            duration=rng.choice((15, 30, 45, 60)),
+            topic=rng.choice(TOPICS)
+        )
+        workload.append({
+            "Request_id": f"bench-{seed}-{i}",
+            "Datetime": received.strftime('%d-%m-%YT%H:%M:%S'),
+            "Location": "IIT Mumbai",
+            "From": sender,
+            "Attendees": [{"email": e} for e in attendees],
+            "Subject": rng.choice(TOPICS).capitalize(),
+            "EmailContent": content
+        })
+    return workload
+
+def load_workload(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def save_workload(path: str, workload: List[Dict]):
+    with open(path, 'w') as f:
+        for request in workload:
+            f.write(json.dumps(request) + "\n")
+
+# Driving the server
+
+def rss_mb(pid: Optional[int]) -> Optional[float]:
+    """Resident set size from /proc (Linux only)"""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    return None
+
+def wait_for_server(url: str, process: Optional[subprocess.Popen], timeout: float = 60.0):
+    parsed = urlparse(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode} (see --server-log)")
+        try:
+            with socket.create_connection((parsed.hostname, parsed.port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not start listening on {url} within {timeout}s")
+
+def send_request(url: str, request: Dict, timeout: float) -> Dict:
+    body = json.dumps({**request, "Trace": True}).encode()  # span tree in MetaData for the phase breakdown
+    http_request = urllib.request.Request(f"{url}/receive", data=body, method='POST',
+                                          headers={"Content-Type": "application/json", "X-Trace": "1"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            payload = json.loads(response.read())
+            status = response.status
+    except urllib.error.HTTPError as e:
+        return {"latency_ms": (time.perf_counter() - started) * 1000, "status": e.code, "error": f"HTTP {e.code}"}
+    except Exception as e:
+        return {"latency_ms": (time.perf_counter() - started) * 1000, "status": None, "error": str(e)}
+    latency_ms = (time.perf_counter() - started) * 1000
+    output = payload.get("output", payload)
+    return {
+        "latency_ms": latency_ms,
+        "status": status,
+        "error": output.get("error"),
+        "metadata": output.get("MetaData", {})
+    }
+
+def phase_breakdown(results: List[Dict]) -> Dict[str, Dict]:
+    """Span durations by name, from the MetaData.trace the server attaches for X-Trace requests"""
+    durations = defaultdict(list)
+    totals = defaultdict(float)
+    for result in results:
+        trace = result.get("metadata", {}).get("trace") or {}
+        for span in trace.get("spans", []):
+            durations[span["name"]].append(span["duration_ms"])
+        for key, value in trace.get("totals", {}).items():
+            totals[key] += value
+    phases = {name: {"count": len(values), **latency_summary(values)} for name, values in sorted(durations.items())}
+    return {"phases": phases, "trace_totals": {k: round(v, 2) for k, v in sorted(totals.items())}}
+
+def run_level(url: str, workload: List[Dict], concurrency: int, timeout: float, pid: Optional[int],
+              llm: StubLLM, calendar: FakeCalendar) -> Dict:
+    rss_before = rss_mb(pid)
+    llm_before, calendar_before = llm.stats(), calendar.stats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda request: send_request(url, request, timeout), workload))
+    elapsed = time.perf_counter() - started
+    rss_after = rss_mb(pid)
+
+    ok = [r for r in results if r["status"] == 200 and not r["error"]]
+    latencies = [r["latency_ms"] for r in ok]
+    errors = defaultdict(int)
+    for r in results:
+        if r not in ok:
+            errors[str(r["error"])[:120]] += 1
+    llm_after, calendar_after = llm.stats(), calendar.stats()
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "succeeded": len(ok),
+        "errors": dict(errors),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "latency_ms": latency_summary(latencies),
+        **phase_breakdown(ok),
+        "memory_mb": {
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+            "growth": round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None
+        },
+        "llm_calls": {k: v - llm_before.get(k, 0) for k, v in llm_after.items() if v - llm_before.get(k, 0)},
+        "calendar_calls": {k: v - calendar_before.get(k, 0) for k, v in calendar_after.items() if v - calendar_before.get(k, 0)}
+    }
+
+def git_revision(path: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(path) or ".",
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def command_run(args) -> int:
+    base = datetime.strptime(args.start_date, '%Y-%m-%d')
+    workload = load_workload(args.workload) if args.workload else generate_workload(args.requests, args.seed, base)
+    if args.save_workload:
+        save_workload(args.save_workload, workload)
+
+    llm = StubLLM(args.llm_latency_ms, args.llm_tokens_per_sec, args.malformed_rate,
+                  args.truncated_rate, args.llm_max_concurrency, args.seed)
+    calendar = FakeCalendar(args.seed, base - timedelta(days=7), args.calendar_days,
+                            args.events_per_day, args.calendar_latency_ms)
+    ai_base_url = llm.start()
+    calendar_url = calendar.start()
+
+    process = None
+    token_dir = tempfile.mkdtemp(prefix="bench-keys-")
+    write_tokens(token_dir)
+    url = args.url
+    server_path = os.path.abspath(args.server)
+    if url is None:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        env = {
+            **os.environ,
+            "AI_BASE_URL": ai_base_url,
+            "CALENDAR_API_ENDPOINT": f"{calendar_url}/calendar/v3/",
+            "CALENDAR_BATCH_URI": f"{calendar_url}/batch/calendar/v3",
+            "TOKEN_BASE_PATH": token_dir,
+            "SERVER_PORT": str(port),
+            "LOG_LEVEL": "WARNING"
+        }
+        for pair in args.server_env:
+            key, _, value = pair.partition('=')
+            env[key] = value
+        log = open(args.server_log, 'w') if args.server_log else subprocess.DEVNULL
+        process = subprocess.Popen([sys.executable, server_path], cwd=os.path.dirname(server_path), env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+    else:
+        print(f"Driving existing server at {url}; point its AI_BASE_URL at {ai_base_url} and "
+              f"CALENDAR_API_ENDPOINT at {calendar_url}/calendar/v3/ with tokens from {token_dir}")
+
+    try:
+        wait_for_server(url, process)
+        pid = process.pid if process is not None else args.pid
+        if args.warmup:
+            run_level(url, workload[:args.warmup], 1, args.timeout, pid, llm, calendar)
+
+        levels = []
+        for concurrency in (int(c) for c in args.concurrency.split(',')):
+            level = run_level(url, workload, concurrency, args.timeout, pid, llm, calendar)
+            levels.append(level)
+            latency = level["latency_ms"]
+            print(f"c={concurrency:<4} {level['throughput_rps']} req/s  p50={latency['p50']}ms  p99={latency['p99']}ms  "
+                  f"ok={level['succeeded']}/{level['requests']}  rss={level['memory_mb']['rss_after']}MB")
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    results = {
+        "benchmark": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "label": args.label,
+            "server": server_path if args.url is None else args.url,
+            "git_revision": git_revision(server_path),
+            "python": sys.version.split()[0],
+            "server_env": args.server_env,
+            "workload": {"requests": len(workload), "seed": args.seed, "source": args.workload or "generated"},
+            "llm_stub": {"latency_ms": args.llm_latency_ms, "tokens_per_sec": args.llm_tokens_per_sec,
+                         "malformed_rate": args.malformed_rate, "truncated_rate": args.truncated_rate,
+                         "max_concurrency": args.llm_max_concurrency},
+            "calendar_stub": {"latency_ms": args.calendar_latency_ms, "days": args.calendar_days,
+                              "events_per_day": args.events_per_day}
+        },
+        "levels": levels
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+    return 0
+
+def command_compare(args) -> int:
+    """Per-level throughput and latency deltas between two result files"""
+    with open(args.baseline) as f:
+        baseline = {level["concurrency"]: level for level in json.load(f)["levels"]}
+    with open(args.candidate) as f:
+        candidate = {level["concurrency"]: level for level in json.load(f)["levels"]}
+
+    def delta(old, new):
+        if old in (None, 0) or new is None:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    regressed = False
+    print(f"{'conc':>5} {'rps':>16} {'p50 ms':>22} {'p99 ms':>22} {'rss growth MB':>16}")
+    for concurrency in sorted(set(baseline) & set(candidate)):
+        old, new = baseline[concurrency], candidate[concurrency]
+        rps_old, rps_new = old["throughput_rps"], new["throughput_rps"]
+        p50_old, p50_new = old["latency_ms"]["p50"], new["latency_ms"]["p50"]
+        p99_old, p99_new = old["latency_ms"]["p99"], new["latency_ms"]["p99"]
+        print(f"{concurrency:>5} {rps_new!s:>7} ({delta(rps_old, rps_new):>7}) "
+              f"{p50_new!s:>10} ({delta(p50_old, p50_new):>8}) {p99_new!s:>10} ({delta(p99_old, p99_new):>8}) "
+              f"{new['memory_mb']['growth']!s:>16}")
+        if p99_old and p99_new and p99_new > p99_old * (1 + args.threshold):
+            regressed = True
+        if rps_old and rps_new and rps_new < rps_old * (1 - args.threshold):
+            regressed = True
+    if regressed:
+        print(f"Regression beyond {args.threshold:.0%} detected")
+    return 1 if regressed else 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="benchmark a server against the stubs")
+    run.add_argument("--server", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "submission_server.py"),
+                     help="submission_server.py to start (default: the one next to this script)")
+    run.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                     help="extra environment for the server, e.g. SERVER_MODE=asgi or LLM_CACHE=0")
+    run.add_argument("--server-log", help="file for the server's stdout/stderr")
+    run.add_argument("--url", help="drive an already running server instead of starting one")
+    run.add_argument("--pid", type=int, help="pid of the --url server, for memory sampling")
+    run.add_argument("--concurrency", default="1,4,16", help="comma separated concurrency levels")
+    run.add_argument("--requests", type=int, default=100, help="generated workload size")
+    run.add_argument("--seed", type=int, default=7)
+    run.add_argument("--start-date", default="2025-07-01", help="first request date of the generated workload")
+    run.add_argument("--workload", help="replay a JSONL workload instead of generating one")
+    run.add_argument("--save-workload", help="write the workload as JSONL for later replay")
+    run.add_argument("--warmup", type=int, default=5, help="requests sent once before measuring")
+    run.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    run.add_argument("--llm-latency-ms", type=float, default=200.0, help="stub time to first token")
+    run.add_argument("--llm-tokens-per-sec", type=float, default=50.0, help="stub decode speed")
+    run.add_argument("--llm-max-concurrency", type=int, default=0, help="stub concurrent requests (0: unlimited)")
+    run.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of replies with no JSON at all")
+    run.add_argument("--truncated-rate", type=float, default=0.0, help="fraction of replies cut off mid-JSON")
+    run.add_argument("--calendar-latency-ms", type=float, default=20.0)
+    run.add_argument("--calendar-days", type=int, default=90)
+    run.add_argument("--events-per-day", type=int, default=4)
+    run.add_argument("--label", help="free-form label stored with the results")
+    run.add_argument("--output", help="results JSON path (default: print to stdout)")
+    run.set_defaults(handler=command_run)
+
+    compare = commands.add_parser("compare", help="compare two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=0.1,
+                         help="relative p99/throughput change that counts as a regression (exit code 1)")
+    compare.set_defaults(handler=command_compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,22 +6,696 @@ FIXED: Display and processed format issues
 """
 
 import asyncio
+import atexit
 import aiohttp
+import bisect
+import calendar
+import functools
+import hashlib
+import heapq
+import itertools
+import logging
+import logging.handlers
 import concurrent.futures
+import contextlib
+import contextvars
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import queue
+import random
+import re
+import sys
+import tempfile
+import sqlite3
+import threading
 import time
+import urllib.parse
+import weakref
+from collections import Counter, OrderedDict, deque
+from collections.abc import Mapping
 
 # Import everything from your original code
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 import pytz
 import json
-from openai import OpenAI
+import math
+from openai import AsyncOpenAI, OpenAI
+import httpx
 from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request as GoogleAuthRequest
+import google_auth_httplib2
+import httplib2
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest, HttpRequest
 from flask import Flask, request, jsonify, render_template_string
 from threading import Thread
 
+# ADDED: Metrics subsystem - thread-safe counters, fixed-memory latency histogram, bounded history
+METRICS_RECENT_LIMIT = int(os.getenv("METRICS_RECENT_LIMIT", "100"))
+RECEIVED_DATA_LIMIT = int(os.getenv("RECEIVED_DATA_LIMIT", "100"))
+
+class LatencyHistogram:
+    """Log-bucketed histogram (~9% relative error) from 1ms to ~1h in a fixed array"""
+    
+    GROWTH = 2 ** 0.125
+    MIN_SECONDS = 0.001
+    BUCKETS = 176  # 0.001 * GROWTH**176 ~ 4100s
+    
+    def __init__(self):
+        self.counts = [0] * (self.BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self.MIN_SECONDS:
+            return 0
+        return min(self.BUCKETS, int(math.log(seconds / self.MIN_SECONDS, self.GROWTH)) + 1)
+    
+    def observe(self, seconds: float):
+        self.counts[self._bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+    
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(self.max, self.MIN_SECONDS * self.GROWTH ** bucket)
+        return self.max
+    
+    def dump(self) -> Dict:
+        return {"counts": list(self.counts), "count": self.count, "total": self.total, "max": self.max}
+    
+    def absorb(self, state: Dict):
+        """Add another histogram's buckets (same bucket layout in every process)"""
+        for bucket, bucket_count in enumerate(state["counts"]):
+            self.counts[bucket] += bucket_count
+        self.count += state["count"]
+        self.total += state["total"]
+        self.max = max(self.max, state["max"])
+
+class MetricsStore:
+    """Replaces the old global dict: every update goes through one lock"""
+    
+    QUANTILES = (0.5, 0.9, 0.99)
+    
+    def __init__(self, recent_limit: int = METRICS_RECENT_LIMIT):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._gauges = {}
+        self._latency = LatencyHistogram()
+        self._histograms = {}  # name -> LatencyHistogram for waits other than request latency
+        self._recent = deque(maxlen=recent_limit)
+        self.start_time = datetime.now()
+    
+    @staticmethod
+    def _key(name: str, labels: Optional[Dict[str, str]]) -> tuple:
+        return (name, tuple(sorted(labels.items())) if labels else ())
+    
+    def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None):
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+    
+    def set(self, name: str, value: Any, labels: Optional[Dict[str, str]] = None):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+    
+    def get(self, name: str, default: Any = 0, labels: Optional[Dict[str, str]] = None) -> Any:
+        key = self._key(name, labels)
+        with self._lock:
+            if key in self._gauges:
+                return self._gauges[key]
+            return self._counters.get(key, default)
+    
+    def observe_latency(self, seconds: float):
+        with self._lock:
+            self._latency.observe(seconds)
+    
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
+    
+    def add_recent(self, entry: Dict):
+        with self._lock:
+            self._recent.append(entry)
+    
+    def record_fallback(self, call_site: str):
+        """An agent's LLM call failed and its deterministic fallback answered instead"""
+        with self._lock:
+            self._counters[('ai_fallbacks', ())] += 1
+            self._counters[('ai_fallbacks_by_call_site', (('call_site', call_site),))] += 1
+    
+    def _ai_success_rate(self) -> float:
+        calls = self._counters[('ai_calls', ())]
+        return round(1 - self._counters[('ai_fallbacks', ())] / calls, 4) if calls else 0
+    
+    def dump(self) -> Dict:
+        """Raw state, so another process can merge it (see WorkerMetrics)"""
+        with self._lock:
+            return {
+                "counters": [[name, labels, value] for (name, labels), value in self._counters.items()],
+                "gauges": [[name, labels, value] for (name, labels), value in self._gauges.items()],
+                "latency": self._latency.dump(),
+                "histograms": {name: histogram.dump() for name, histogram in self._histograms.items()},
+                "recent": list(self._recent),
+                "start_time": self.start_time.timestamp()
+            }
+    
+    def absorb(self, state: Dict, worker: Optional[str] = None):
+        """Merge a dump: counters and histograms add up, gauges are kept per worker (dropped without one)"""
+        with self._lock:
+            for name, labels, value in state["counters"]:
+                self._counters[(name, tuple(tuple(label) for label in labels))] += value
+            if worker is not None:
+                for name, labels, value in state["gauges"]:
+                    self._gauges[(name, tuple(sorted([tuple(label) for label in labels] + [("worker", worker)])))] = value
+            self._latency.absorb(state["latency"])
+            for name, histogram_state in state["histograms"].items():
+                self._histograms.setdefault(name, LatencyHistogram()).absorb(histogram_state)
+            self._recent.extend(state["recent"])
+            self.start_time = min(self.start_time, datetime.fromtimestamp(state["start_time"]))
+    
+    def after_fork(self):
+        """A prefork worker counts from zero (the supervisor publishes what happened before the fork)"""
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._latency = LatencyHistogram()
+        self._histograms = {}
+        self._recent.clear()
+    
+    def prometheus(self) -> str:
+        """Prometheus text exposition format (numeric counters and gauges only)"""
+        def series(name: str, labels: tuple) -> str:
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+            return f"meeting_assistant_{name}{{{label_text}}}" if label_text else f"meeting_assistant_{name}"
+        
+        lines = []
+        with self._lock:
+            for kind, values in (("counter", self._counters), ("gauge", self._gauges)):
+                typed = set()
+                for (name, labels), value in sorted(values.items()):
+                    if not isinstance(value, (int, float)) or isinstance(value, bool):
+                        continue
+                    if name not in typed:
+                        lines.append(f"# TYPE meeting_assistant_{name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{series(name, labels)} {value}")
+            lines.append("# TYPE meeting_assistant_ai_success_rate gauge")
+            lines.append(f"meeting_assistant_ai_success_rate {self._ai_success_rate()}")
+            lines.append("# TYPE meeting_assistant_uptime_seconds gauge")
+            lines.append(f"meeting_assistant_uptime_seconds {round((datetime.now() - self.start_time).total_seconds(), 1)}")
+            for name, histogram in [("processing_seconds", self._latency)] + sorted(self._histograms.items()):
+                lines.append(f"# TYPE meeting_assistant_{name} summary")
+                for q in self.QUANTILES:
+                    lines.append(f'meeting_assistant_{name}{{quantile="{q}"}} {round(histogram.percentile(q), 6)}')
+                lines.append(f"meeting_assistant_{name}_sum {round(histogram.total, 6)}")
+                lines.append(f"meeting_assistant_{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsStore()
+
+# ADDED: Prefork metrics - every process publishes its store to a file and /metrics merges them all,
+# like prometheus_client's multiprocess mode
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")  # defaults to a temp directory per port under prefork
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "2"))  # how stale other workers' numbers may be
+
+class WorkerMetrics:
+    """Counters and histograms are summed across workers (exited workers' totals are kept);
+    gauges get a worker label, since an in-flight count or circuit mode is per process"""
+    
+    RETIRED = "retired"
+    
+    def __init__(self, flush_seconds: float = METRICS_FLUSH_SECONDS):
+        self.directory = None
+        self.flush_seconds = flush_seconds
+        self._name = None
+        self._thread = None
+    
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+    
+    def enable(self, directory: str, name: str = "supervisor"):
+        """Called by the supervisor before forking; clears files left by an earlier run"""
+        os.makedirs(directory, exist_ok=True)
+        for filename in os.listdir(directory):
+            if filename.endswith((".json", ".tmp")):
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(directory, filename))
+        self.directory = directory
+        self._name = name
+    
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+    
+    def _read(self, name: str) -> Optional[Dict]:
+        try:
+            with open(self._path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write(self, name: str, state: Dict):
+        path = self._path(name)
+        scratch = f"{path}.{os.getpid()}.tmp"
+        with open(scratch, "w") as f:
+            json.dump(state, f, default=str)
+        os.replace(scratch, path)  # scrapes never see a half-written file
+    
+    def publish(self):
+        if self.enabled:
+            self._write(self._name, metrics.dump())
+    
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.publish()
+            except OSError as e:
+                startup_log.warning("Cannot publish worker metrics: %s", e)
+    
+    def after_fork(self):
+        """In a new worker: publish under its own name from a background thread"""
+        if self.enabled:
+            self._name = f"worker-{os.getpid()}"
+            self._thread = Thread(target=self._run, name="metrics-publisher", daemon=True)
+            self._thread.start()
+    
+    def retire(self, pid: int):
+        """Supervisor, after a worker exited: fold its counters into the retired totals, drop its gauges"""
+        if not self.enabled:
+            return
+        state = self._read(f"worker-{pid}")
+        if state is None:
+            return
+        retired = MetricsStore()
+        previous = self._read(self.RETIRED)
+        if previous is not None:
+            retired.absorb(previous)
+        retired.absorb(state)
+        self._write(self.RETIRED, retired.dump())
+        with contextlib.suppress(OSError):
+            os.remove(self._path(f"worker-{pid}"))
+    
+    def merged(self) -> MetricsStore:
+        self.publish()  # the scraped worker's own numbers are always current
+        merged = MetricsStore()
+        workers = 0
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".json"):
+                continue
+            name = filename[:-len(".json")]
+            state = self._read(name)
+            if state is not None:
+                merged.absorb(state, worker=None if name == self.RETIRED else name)
+                workers += name.startswith("worker-")
+        merged.set('workers', workers)
+        return merged
+    
+    def prometheus(self) -> str:
+        return self.merged().prometheus() if self.enabled else metrics.prometheus()
+
+worker_metrics = WorkerMetrics()
+
+# ADDED: Span tracing - per-phase timings exported as OpenTelemetry (OTLP/JSON) spans
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")  # e.g. traces/spans.jsonl; one OTLP document per request
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "meeting-assistant")
+_current_span = contextvars.ContextVar("current_span", default=None)
+_trace_export_lock = threading.Lock()
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "error")
+    
+    def __init__(self, trace: "RequestTrace", name: str, parent_id: Optional[str], attributes: Dict):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+class RequestTrace:
+    """Every span of one request, plus request-wide totals (tokens, calendar calls)"""
+    
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.totals = Counter()
+        self._lock = threading.Lock()
+    
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+    
+    def count(self, key: str, value: float):
+        with self._lock:
+            self.totals[key] += value
+    
+    def summary(self) -> Dict:
+        """Compact view attached to MetaData when the caller asks for it"""
+        with self._lock:
+            spans = list(self.spans)
+            totals = dict(self.totals)
+        origin = min(span.start_ns for span in spans) if spans else 0
+        return {
+            "trace_id": self.trace_id,
+            "totals": totals,
+            "spans": [{
+                "name": span.name,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "start_ms": round((span.start_ns - origin) / 1e6, 2),
+                "duration_ms": round(((span.end_ns or time.time_ns()) - span.start_ns) / 1e6, 2),
+                **({"attributes": span.attributes} if span.attributes else {}),
+                **({"error": span.error} if span.error else {})
+            } for span in spans]
+        }
+    
+    def to_otlp(self) -> Dict:
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+        
+        with self._lock:
+            spans = list(self.spans)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", TRACE_SERVICE_NAME),
+                                        attribute("process.pid", os.getpid())]},
+            "scopeSpans": [{
+                "scope": {"name": "submission_server"},
+                "spans": [{
+                    "traceId": self.trace_id,
+                    "spanId": span.span_id,
+                    **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns or time.time_ns()),
+                    "attributes": [attribute(k, v) for k, v in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+                } for span in spans]
+            }]
+        }]}
+    
+    def export(self, path: str):
+        line = (json.dumps(self.to_otlp()) + "\n").encode('utf-8')
+        with _trace_export_lock:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # One O_APPEND write per document, so prefork workers sharing the file never interleave lines
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """Child span of the current one; a no-op outside a traced request"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    current = Span(parent.trace, name, parent.span_id, attributes)
+    parent.trace.add(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = str(e)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+def trace_count(key: str, value: float = 1):
+    """Add to the current span's attribute and the request-wide total"""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes[key] = current.attributes.get(key, 0) + value
+        current.trace.count(key, value)
+
+def trace_attributes(**attributes):
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+def traced_submit(executor, name: str, fn, *args, **attributes):
+    """executor.submit that carries the trace context into the worker and records queue wait"""
+    context = contextvars.copy_context()  # request priority and deadline ride along even untraced
+    if _current_span.get() is None:
+        return executor.submit(context.run, fn, *args)
+    queued_ns = time.time_ns()
+    
+    def run():
+        with span(name, **attributes) as current:
+            current.attributes["queue_wait_ms"] = round((current.start_ns - queued_ns) / 1e6, 2)
+            return fn(*args)
+    return executor.submit(context.run, run)
+
+async def traced(name: str, awaitable, **attributes):
+    """Await inside its own span (each gather()ed coroutine gets its own task context)"""
+    with span(name, **attributes):
+        return await awaitable
+
+def trace_requested(data: Dict) -> bool:
+    return bool(data.get('Trace')) if isinstance(data, dict) else False
+
+def traced_request(name: str):
+    """Root span around a pipeline entry point; exports to TRACE_EXPORT_PATH and, when the
+    request sets "Trace": true, attaches the trace summary to output MetaData"""
+    def begin(data, queued_ns):
+        if not (TRACE_EXPORT_PATH or trace_requested(data)):
+            return None, None
+        trace = RequestTrace()
+        root = Span(trace, name, None, {"request_id": str(data.get('Request_id', ''))})
+        if queued_ns:
+            root.attributes["queue_wait_ms"] = round((root.start_ns - queued_ns) / 1e6, 2)
+        trace.add(root)
+        return root, _current_span.set(root)
+    
+    def finish(root, data, result):
+        if root is None:
+            return result
+        root.end_ns = time.time_ns()
+        output = result.get('output', {})
+        if 'error' in output:
+            root.error = str(output['error'])
+        if TRACE_EXPORT_PATH:
+            try:
+                root.trace.export(TRACE_EXPORT_PATH)
+            except OSError as e:
+                request_log.warning("Trace export failed: %s", e)
+        if trace_requested(data) and 'MetaData' in output:
+            output['MetaData']['trace'] = root.trace.summary()
+        return result
+    
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(data, *args, queued_ns: Optional[int] = None, **kwargs):
+                root, token = begin(data, queued_ns)
+                try:
+                    result = await fn(data, *args, **kwargs)
+                finally:
+                    if token is not None:
+                        _current_span.reset(token)
+                return finish(root, data, result)
+            return async_wrapper
+        
+        @functools.wraps(fn)
+        def wrapper(data, *args, queued_ns: Optional[int] = None, **kwargs):
+            root, token = begin(data, queued_ns)
+            try:
+                result = fn(data, *args, **kwargs)
+            finally:
+                if token is not None:
+                    _current_span.reset(token)
+            return finish(root, data, result)
+        return wrapper
+    return decorator
+
+TOKEN_BASE_PATH = os.getenv("TOKEN_BASE_PATH", "Keys")
+AGENT_RELOAD_INTERVAL = float(os.getenv("AGENT_RELOAD_INTERVAL", "5"))
+CALENDAR_API_ENDPOINT = os.getenv("CALENDAR_API_ENDPOINT")  # e.g. http://localhost:8085/calendar/v3/ for a fake server
+CALENDAR_BATCH_URI = os.getenv("CALENDAR_BATCH_URI", "https://www.googleapis.com/batch/calendar/v3")
+
+TOKEN_STORE_PATH = os.getenv("TOKEN_STORE_PATH")  # SQLite token table instead of the TOKEN_BASE_PATH directory
+TOKEN_EMAIL_DOMAIN = os.getenv("TOKEN_EMAIL_DOMAIN", "gmail.com")  # token files are named after the local part
+
+def token_path_for(email: str) -> str:
+    """Token file for an employee, e.g. Keys/userone.amd.token"""
+    username = email.split("@")[0]  # This gives "userone.amd", "usertwo.amd", etc.
+    return os.path.join(TOKEN_BASE_PATH, f"{username}.token")  # FIXED: Removed duplicate .amd
+
+def load_employee_token(email: str) -> Dict:
+    """Read a single employee token file"""
+    with open(token_path_for(email), 'r') as f:
+        return json.load(f)
+
+# ADDED: Token indexes - list who has a token without reading any credentials
+class TokenDirectory:
+    """Token files in one directory; the version of a token is its file mtime"""
+    
+    def __init__(self, directory: str = TOKEN_BASE_PATH, domain: str = TOKEN_EMAIL_DOMAIN):
+        self.directory = directory
+        self.domain = domain
+    
+    def scan(self) -> Dict[str, float]:
+        versions = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".token") and entry.is_file():
+                        versions[f"{entry.name[:-len('.token')]}@{self.domain}"] = entry.stat().st_mtime
+        except OSError as e:
+            startup_log.warning("Cannot index token directory %s: %s", self.directory, e)
+        return versions
+    
+    def load(self, email: str) -> Dict:
+        return load_employee_token(email)
+
+class TokenDatabase:
+    """Tokens in SQLite: tokens(email TEXT PRIMARY KEY, token TEXT, updated_at REAL), token holding the file's JSON"""
+    
+    def __init__(self, path: str = TOKEN_STORE_PATH):
+        self.path = path
+    
+    def scan(self) -> Dict[str, float]:
+        with contextlib.closing(sqlite3.connect(self.path)) as db:
+            return dict(db.execute("SELECT email, updated_at FROM tokens").fetchall())
+    
+    def load(self, email: str) -> Dict:
+        with contextlib.closing(sqlite3.connect(self.path)) as db:
+            row = db.execute("SELECT token FROM tokens WHERE email = ?", (email,)).fetchone()
+        if row is None:
+            raise KeyError(f"no token for {email}")
+        return json.loads(row[0])
+
+def token_source():
+    return TokenDatabase(TOKEN_STORE_PATH) if TOKEN_STORE_PATH else TokenDirectory()
+
+# ADDED: Structured logging - levels, per-category sampling, lazy payloads, background writer
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text or json
+# category=rate pairs; full request/response payloads are the expensive ones
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "payload=0.01")
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for pair in spec.split(','):
+        if '=' in pair:
+            category, rate = pair.split('=', 1)
+            rates[category.strip()] = float(rate)
+    return rates
+
+class LazyJSON:
+    """Serialized only if the record is actually emitted (on the writer thread)"""
+    __slots__ = ("value", "indent")
+    
+    def __init__(self, value: Any, indent: Optional[int] = 2):
+        self.value = value
+        self.indent = indent
+    
+    def __str__(self) -> str:
+        return json.dumps(self.value, indent=self.indent, ensure_ascii=False, default=str)
+
+class _CategoryFilter(logging.Filter):
+    """Runs on the calling thread: samples by category and stamps the category and trace id"""
+    
+    def __init__(self, category: str, rate: float):
+        super().__init__()
+        self.category = category
+        self.rate = rate
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate < 1.0 and random.random() >= self.rate:
+            return False
+        record.category = self.category
+        current = _current_span.get()
+        record.trace_id = current.trace.trace_id if current is not None else None
+        return True
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "category": getattr(record, 'category', record.name),
+            "msg": record.getMessage()
+        }
+        if getattr(record, 'trace_id', None):
+            entry["trace_id"] = record.trace_id
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+_log_queue = queue.SimpleQueue()
+_log_root = logging.getLogger("meeting_assistant")
+_log_sample_rates = _parse_sample_rates(LOG_SAMPLE_RATES)
+_log_listener = None
+
+def start_log_listener():
+    """(Re)start the background writer; also used to revive it in forked workers"""
+    global _log_listener
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_JSONFormatter() if LOG_FORMAT == 'json'
+                                else logging.Formatter("%(asctime)s %(levelname)s [%(category)s] %(message)s"))
+    _log_listener = logging.handlers.QueueListener(_log_queue, stream_handler)
+    _log_listener.start()
+
+def stop_log_listener():
+    if _log_listener is not None:
+        _log_listener.stop()  # drains what is already queued
+
+_log_root.setLevel(LOG_LEVEL)
+_log_root.propagate = False
+_log_root.addHandler(_DeferredQueueHandler(_log_queue))
+start_log_listener()
+atexit.register(stop_log_listener)
+
+def get_logger(category: str) -> logging.Logger:
+    logger = logging.getLogger(f"meeting_assistant.{category}")
+    if not logger.filters:
+        logger.addFilter(_CategoryFilter(category, _log_sample_rates.get(category, 1.0)))
+    return logger
+
+startup_log = get_logger("startup")
+request_log = get_logger("request")
+payload_log = get_logger("payload")
+llm_log = get_logger("llm")
+parse_log = get_logger("parse")
+timezone_log = get_logger("timezone")
+calendar_log = get_logger("calendar")
+agent_log = get_logger("agent")
+batch_log = get_logger("batch")
+
 # MCP Integration for timezone handling
 try:
     from pydantic_ai.mcp import MCPServerStdio
@@ -33,54 +707,1736 @@ try:
         ],
     )
     MCP_AVAILABLE = True
-    print("✅ MCP Time Server initialized")
+    startup_log.info("✅ MCP Time Server initialized")
 except ImportError:
     MCP_AVAILABLE = False
-    print("⚠️ MCP not available, using fallback timezone handling")
-
-# ADDED: Global metrics tracking (ONLY ADDITION - no logic changes)
-metrics = {
-    'total_requests': 0,
-    'successful_requests': 0,
-    'failed_requests': 0,
-    'processing_times': [],
-    'recent_requests': [],
-    'timezone_conflicts': 0,
-    'ai_fallbacks': 0,
-    'start_time': datetime.now(),
-    'ai_success_rate': 0,
-    'average_processing_time': 0
-}
+    startup_log.warning("⚠️ MCP not available, using fallback timezone handling")
+
+AI_BASE_URL = os.getenv("AI_BASE_URL", "http://localhost:3000/v1")
+AI_MODEL = "/home/user/Models/deepseek-ai/deepseek-llm-7b-chat"
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "20"))  # seconds per LLM call, then the fallback answers
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "0"))  # client retries inside one call's timeout budget
+
+_ai_client = None
+_ai_client_lock = threading.Lock()
+
+def get_ai_client() -> OpenAI:
+    """Process-wide OpenAI client so every agent shares one HTTP connection pool"""
+    global _ai_client
+    if _ai_client is None:
+        with _ai_client_lock:
+            if _ai_client is None:
+                _ai_client = OpenAI(api_key="NULL", base_url=AI_BASE_URL,
+                                    timeout=LLM_CALL_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+    return _ai_client
+
+# ADDED: AsyncOpenAI clients for the asyncio pipeline, one per event loop
+ASYNC_LLM_MAX_CONNECTIONS = int(os.getenv("ASYNC_LLM_MAX_CONNECTIONS", "256"))
+_async_ai_clients = weakref.WeakKeyDictionary()
+
+def get_async_ai_client() -> AsyncOpenAI:
+    """AsyncOpenAI client bound to the running loop with a bounded connection pool"""
+    loop = asyncio.get_running_loop()
+    client = _async_ai_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key="NULL",
+            base_url=AI_BASE_URL,
+            timeout=LLM_CALL_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=ASYNC_LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_LLM_MAX_CONNECTIONS
+            ))
+        )
+        _async_ai_clients[loop] = client
+    return client
+
+# ADDED: Cross-request micro-batching of LLM calls through the multi-prompt completions API
+LLM_BATCHING = os.getenv("LLM_BATCHING", "0") == "1"
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "10"))
+LLM_MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", "32"))
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
 
-# FIXED: Your original configurations with corrected token loading
-def load_employee_tokens():
-    """FIXED: Corrected token path construction"""
-    employee_emails = [
-        "userone.amd@gmail.com",
-        "usertwo.amd@gmail.com", 
-        "userthree.amd@gmail.com"
-    ]
+def render_chat_prompt(messages: List[Dict]) -> str:
+    """DeepSeek chat template, so chat messages can go through the plain completions endpoint"""
+    prompt = ""
+    for message in messages:
+        if message["role"] == "system":
+            prompt += message["content"] + "\n\n"
+        elif message["role"] == "user":
+            prompt += "User: " + message["content"] + "\n\n"
+        elif message["role"] == "assistant":
+            prompt += "Assistant: " + message["content"] + "\n\n"
+    return prompt + "Assistant:"
+
+class LLMBatchDispatcher:
+    """Collects chat calls from all threads/loops for a short window and sends them as one batch"""
     
-    tokens = {}
-    for email in employee_emails:
-        try:
-            username = email.split("@")[0]  # This gives "userone.amd", "usertwo.amd", etc.
-            token_path = f"Keys/{username}.token"  # FIXED: Removed duplicate .amd
-            
-            with open(token_path, 'r') as f:
-                token_data = json.load(f)
-            
-            tokens[email] = token_data
-            print(f"Loaded token for {email}")
+    def __init__(self, window_ms: float = LLM_BATCH_WINDOW_MS, max_batch_size: int = LLM_MAX_BATCH_SIZE):
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._senders = None
+    
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._senders = ThreadPoolExecutor(max_workers=LLM_BATCH_CONCURRENCY,
+                                                       thread_name_prefix="llm-batch")
+                    self._thread = Thread(target=self._collect_loop, name="llm-batcher", daemon=True)
+                    self._thread.start()
+    
+    def submit(self, messages: List[Dict], temperature: float, max_tokens: int) -> concurrent.futures.Future:
+        """Queue one chat call; the returned future resolves to the completion text"""
+        self._ensure_started()
+        future = concurrent.futures.Future()
+        self._queue.put((render_chat_prompt(messages), temperature, max_tokens, future))
+        return future
+    
+    def _collect_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
             
+            # One completions request shares sampling params, so group by them
+            groups = {}
+            for item in batch:
+                groups.setdefault((item[1], item[2]), []).append(item)
+            for (temperature, max_tokens), items in groups.items():
+                self._senders.submit(self._send, items, temperature, max_tokens)
+    
+    @staticmethod
+    def _send(items: List[tuple], temperature: float, max_tokens: int):
+        sent_ns = time.time_ns()
+        for item in items:
+            item[3].sent_ns = sent_ns  # lets callers split queue wait from execution
+        try:
+            response = get_ai_client().completions.create(
+                model=AI_MODEL,
+                prompt=[item[0] for item in items],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stop=["User:"]
+            )
+            texts = {choice.index: choice.text for choice in response.choices}
+            metrics.inc('llm_batches')
+            metrics.inc('llm_batched_calls', len(items))
+            for index, item in enumerate(items):
+                item[3].set_result((texts.get(index) or "").strip())
         except Exception as e:
-            print(f"Failed to load token for {email}: {e}")
+            for item in items:
+                item[3].set_exception(e)
     
-    return tokens
+    def after_fork(self):
+        """Threads do not survive fork(); drop the parent's so _ensure_started makes new ones"""
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._senders = None
 
-EMPLOYEE_TOKENS = load_employee_tokens()
-AI_BASE_URL = "http://localhost:3000/v1"
-AI_MODEL = "/home/user/Models/deepseek-ai/deepseek-llm-7b-chat"
+llm_batcher = LLMBatchDispatcher()
+
+# ADDED: Prefork worker processes share the SQLite cache tiers through one local file
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))  # worker processes accepting on one socket
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH") or ("cache/shared_cache.sqlite3" if SERVER_WORKERS > 1 else None)
+
+# ADDED: Content-addressed completion cache (in-memory LRU + optional SQLite tier)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") == "1"
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH") or SHARED_CACHE_PATH  # e.g. cache/llm_cache.sqlite3 to survive restarts
+
+class CompletionCache:
+    """Completion text keyed on sha256(model, messages, temperature, max_tokens) with TTL eviction"""
+    
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL,
+                 path: Optional[str] = LLM_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.Lock()  # memory tier only; SQLite I/O never runs under it
+        self._memory = OrderedDict()  # key -> (expires_at, text)
+        self._local = threading.local()  # one SQLite connection per thread, so disk reads run concurrently
+        self._pruned = False
+    
+    @staticmethod
+    def key(messages: List[Dict], temperature: float, max_tokens: int) -> str:
+        payload = json.dumps({
+            "model": AI_MODEL,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        """This thread's lazily opened connection to the SQLite tier"""
+        if not self.path:
+            return None
+        db = getattr(self._local, "db", None)
+        if db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+            with self._lock:
+                prune, self._pruned = not self._pruned, True
+            if prune:
+                db.execute("DELETE FROM completions WHERE expires_at < ?", (time.time(),))
+            db.commit()
+            self._local.db = db
+        return db
+    
+    @staticmethod
+    def _record(call_site: str, hit: bool):
+        """Exported as llm_cache_hits / llm_cache_misses{call_site=...} on /metrics"""
+        metrics.inc('llm_cache_hits' if hit else 'llm_cache_misses', labels={'call_site': call_site})
+    
+    def get(self, call_site: str, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._record(call_site, True)
+                    return entry[1]
+                del self._memory[key]
+        
+        row = None
+        db = self._disk()
+        if db is not None:
+            row = db.execute(
+                "SELECT value, expires_at FROM completions WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        self._record(call_site, row is not None)
+        if row is None:
+            return None
+        with self._lock:
+            self._remember(key, row[0], row[1])  # backfill the memory tier
+        return row[0]
+    
+    def _remember(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def put(self, key: str, value: str):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+        db = self._disk()
+        if db is not None:
+            db.execute("INSERT OR REPLACE INTO completions (key, value, expires_at) VALUES (?, ?, ?)",
+                       (key, value, expires_at))
+            db.commit()
+    
+    def after_fork(self):
+        """SQLite connections must not cross fork(); the worker opens its own on first use"""
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+completion_cache = CompletionCache()
+
+# ADDED: Streaming completions - stop generating once the JSON answer is complete
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"
+
+_JSON_CLOSERS = {'{': '}', '[': ']'}
+
+class JSONStreamExtractor:
+    """Incremental scanner for the first top-level JSON object/array in model output.
+    
+    feed() returns True as soon as a complete value of the expected kind has been read;
+    value() parses it, or repairs a truncated one by closing open strings and brackets.
+    A truncated array keeps only its complete elements: a half-written slot would lose its "end".
+    """
+    
+    def __init__(self, expect: str = '{'):
+        self.expect = expect
+        self._buffer = []
+        self._start = None
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._end = None
+        self._element_end = None  # just past the last complete element of a top-level array
+        self._pos = 0
+    
+    @property
+    def complete(self) -> bool:
+        return self._end is not None
+    
+    def feed(self, chunk: str) -> bool:
+        if self._end is not None:
+            return True
+        self._buffer.append(chunk)
+        for char in chunk:
+            pos = self._pos
+            self._pos += 1
+            if self._start is None:
+                if char == self.expect:
+                    self._start = pos
+                    self._stack.append(char)
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._element_end = pos + 1
+            elif char == '"':
+                self._in_string = True
+            elif char in _JSON_CLOSERS:
+                self._stack.append(char)
+            elif char in ('}', ']'):
+                if self._stack and _JSON_CLOSERS[self._stack[-1]] == char:
+                    self._stack.pop()
+                if len(self._stack) == 1:
+                    self._element_end = pos + 1
+                if not self._stack:
+                    self._end = pos + 1
+                    return True
+        return False
+    
+    @property
+    def text(self) -> str:
+        return ''.join(self._buffer)
+    
+    def value(self):
+        if self._start is None:
+            raise ValueError(f"No JSON {'object' if self.expect == '{' else 'array'} in response")
+        text = self.text
+        if self._end is not None:
+            return json.loads(text[self._start:self._end])
+        if self.expect == '[':
+            # Truncated at max_tokens: drop the element that was cut off
+            fragment = text[self._start:self._element_end] if self._element_end is not None else '['
+            llm_log.debug("🔧 Fixed truncated JSON array: dropped the incomplete last element")
+            return json.loads(fragment + ']')
+        # Truncated at max_tokens: close whatever is still open
+        fragment = text[self._start:].rstrip().rstrip(',')
+        if self._in_string:
+            fragment += '"'
+        fragment += ''.join(_JSON_CLOSERS[opener] for opener in reversed(self._stack))
+        llm_log.debug("🔧 Fixed truncated JSON: closed %d open brackets", len(self._stack))
+        return json.loads(fragment)
+
+def extract_json(text: str, expect: str = '{'):
+    """The one shared extractor every agent's LLM response goes through"""
+    if not text:
+        raise ValueError("Empty response")
+    extractor = JSONStreamExtractor(expect)
+    extractor.feed(text)
+    return extractor.value()
+
+def _stream_completion(messages: List[Dict], temperature: float, max_tokens: int, expect: str) -> str:
+    stream = get_ai_client().chat.completions.create(
+        model=AI_MODEL,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    extractor = JSONStreamExtractor(expect)
+    chunks = 0
+    deadline = time.monotonic() + LLM_CALL_TIMEOUT  # the client timeout only bounds each read
+    try:
+        for chunk in stream:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"LLM stream exceeded {LLM_CALL_TIMEOUT}s")
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            chunks += 1
+            if delta and extractor.feed(delta):
+                metrics.inc('llm_stream_early_stops')
+                break
+    finally:
+        stream.response.close()  # cancels the rest of the generation server-side
+    # Servers stream about one token per chunk; the prompt side is estimated
+    record_llm_usage(count_prompt_tokens(messages), chunks, estimated=True)
+    return extractor.text.strip()
+
+async def _astream_completion(messages: List[Dict], temperature: float, max_tokens: int, expect: str) -> str:
+    stream = await get_async_ai_client().chat.completions.create(
+        model=AI_MODEL,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    extractor = JSONStreamExtractor(expect)
+    chunks = 0
+    try:
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            chunks += 1
+            if delta and extractor.feed(delta):
+                metrics.inc('llm_stream_early_stops')
+                break
+    finally:
+        await stream.response.aclose()
+    record_llm_usage(count_prompt_tokens(messages), chunks, estimated=True)
+    return extractor.text.strip()
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+# ADDED: Prompt token counts from the served model's tokenizer (chars/4 heuristic when it cannot be loaded)
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", AI_MODEL)  # HF tokenizer name or path ("" = heuristic only)
+
+class PromptTokenizer:
+    """Lazily loaded tokenizer; transformers is optional"""
+    
+    def __init__(self, source: str = PROMPT_TOKENIZER):
+        self.source = source
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+    
+    def _load(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._tokenizer = self._open()
+                    self._loaded = True
+        return self._tokenizer
+    
+    def _open(self):
+        if not self.source:
+            return None
+        if os.path.isabs(self.source) and not os.path.isdir(self.source):
+            llm_log.info("No tokenizer at %s, estimating prompt tokens", self.source)
+            return None
+        try:
+            from transformers import AutoTokenizer
+            return AutoTokenizer.from_pretrained(self.source)
+        except ImportError:
+            llm_log.info("transformers not installed, estimating prompt tokens")
+        except Exception as e:
+            llm_log.warning("Cannot load tokenizer %s: %s, estimating prompt tokens", self.source, e)
+        return None
+    
+    @property
+    def exact(self) -> bool:
+        return self._load() is not None
+    
+    def after_fork(self):
+        self._lock = threading.Lock()
+    
+    def count(self, text: str) -> int:
+        tokenizer = self._load()
+        if tokenizer is None:
+            return estimate_tokens(text)
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+prompt_tokenizer = PromptTokenizer()
+
+def count_prompt_tokens(messages: List[Dict]) -> int:
+    return prompt_tokenizer.count(render_chat_prompt(messages))
+
+def record_llm_usage(prompt_tokens: int, completion_tokens: int, estimated: bool = False):
+    metrics.inc('llm_prompt_tokens', prompt_tokens)
+    metrics.inc('llm_completion_tokens', completion_tokens)
+    trace_count("llm.prompt_tokens", prompt_tokens)
+    trace_count("llm.completion_tokens", completion_tokens)
+    if estimated:
+        trace_attributes(tokens_estimated=True)
+
+def _record_response_usage(response):
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        record_llm_usage(usage.prompt_tokens or 0, usage.completion_tokens or 0)
+
+def _record_batched_usage(messages: List[Dict], text: str, future: concurrent.futures.Future, submitted_ns: int):
+    # One usage block covers the whole batch, so per-call counts are estimated
+    record_llm_usage(count_prompt_tokens(messages), estimate_tokens(text), estimated=True)
+    sent_ns = getattr(future, 'sent_ns', None)
+    if sent_ns:
+        trace_attributes(queue_wait_ms=round((sent_ns - submitted_ns) / 1e6, 2))
+
+# ADDED: Admission control - bounded in-flight pipelines and LLM calls, waiters served by urgency then deadline
+# Pipelines at once (0 = unlimited). Flask threads are the scarce resource; the asyncio pipeline is bounded
+# by ASYNC_MAX_INFLIGHT instead, so ASGI defaults to unlimited
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT",
+                                       "16" if os.getenv("SERVER_MODE", "flask").lower() == "flask" else "0"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "128"))  # waiting beyond this -> 429
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))  # queued longer -> 503
+LLM_MAX_OUTSTANDING = int(os.getenv("LLM_MAX_OUTSTANDING", "32"))  # LLM calls in flight (0 = unlimited)
+URGENCY_RANK = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
+# (urgency rank, ordering deadline, real deadline) of the request being served; LLM calls queue with it too.
+# Requests without a deadline order as if due ADMISSION_QUEUE_TIMEOUT after arrival, but only a real one
+# bounds how long they wait
+_request_priority = contextvars.ContextVar("request_priority",
+                                           default=(URGENCY_RANK['medium'], math.inf, math.inf))
+
+class AdmissionRejected(Exception):
+    """429 when the queue is full, 503 when the wait would outlast the queue timeout or deadline"""
+    
+    def __init__(self, status: int, message: str, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class _Waiter:
+    __slots__ = ("grant", "granted", "cancelled")
+    
+    def __init__(self, grant):
+        self.grant = grant
+        self.granted = False
+        self.cancelled = False
+
+class PriorityLimiter:
+    """At most `limit` holders; queued callers get slots in (urgency rank, deadline, arrival) order.
+    
+    Serves threads and event loops alike: release() hands the slot straight to the next waiter.
+    """
+    
+    def __init__(self, name: str, limit: int, max_queue: int = 0, queue_timeout: Optional[float] = None):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._heap = []
+        self._arrivals = itertools.count()
+        self._active = 0
+        self._queued = 0
+        self._hold_seconds = 1.0  # moving average of how long a slot is held, for Retry-After
+    
+    def _publish(self):
+        metrics.set(f'{self.name}_inflight', self._active)
+        metrics.set(f'{self.name}_queue_depth', self._queued)
+    
+    def after_fork(self):
+        """Holders and waiters are threads of the parent; a worker starts empty"""
+        self._lock = threading.Lock()
+        self._heap = []
+        self._active = 0
+        self._queued = 0
+        self._publish()
+    
+    def _retry_after(self) -> int:
+        return max(1, math.ceil((self._queued + 1) / max(1, self.limit) * self._hold_seconds))
+    
+    def expected_wait(self) -> float:
+        """Seconds a newcomer would queue at the current depth and hold times"""
+        if self.limit <= 0:
+            return 0.0
+        with self._lock:
+            return self._queued / self.limit * self._hold_seconds
+    
+    def _reject(self, status: int, reason: str, message: str):
+        with self._lock:
+            retry_after = self._retry_after()
+        metrics.inc(f'{self.name}_rejected', labels={'reason': reason})
+        raise AdmissionRejected(status, message, retry_after)
+    
+    def _enter(self, priority: tuple, grant, bounded: bool) -> Optional[_Waiter]:
+        """Take a free slot (returns None) or join the queue (returns the waiter)"""
+        with self._lock:
+            if self._active < self.limit and not self._queued:
+                self._active += 1
+                self._publish()
+                return None
+            full = bounded and self.max_queue and self._queued >= self.max_queue
+            if not full:
+                waiter = _Waiter(grant)
+                heapq.heappush(self._heap, (priority[0], priority[1], next(self._arrivals), waiter))
+                self._queued += 1
+                self._publish()
+                return waiter
+        self._reject(429, "queue_full", f"{self.name} queue is full ({self.max_queue} waiting)")
+    
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Leave the queue; False when a slot was granted meanwhile (the caller now holds it)"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            waiter.cancelled = True
+            self._queued -= 1
+            self._publish()
+            return True
+    
+    def _timeout(self, priority: tuple, bounded: bool) -> Optional[float]:
+        if not bounded:
+            return None
+        limits = [self.queue_timeout] if self.queue_timeout else []
+        if priority[2] != math.inf:
+            limits.append(max(0.0, priority[2] - time.time()))
+        return min(limits) if limits else None
+    
+    def _admitted(self, started: float) -> float:
+        waited = time.perf_counter() - started
+        metrics.observe(f'{self.name}_wait_seconds', waited)
+        return waited
+    
+    def release(self, held_seconds: Optional[float] = None):
+        with self._lock:
+            if held_seconds is not None:
+                self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held_seconds
+            while self._heap:
+                waiter = heapq.heappop(self._heap)[-1]
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                self._queued -= 1
+                self._publish()
+                waiter.grant()  # the slot passes over without _active dropping
+                return
+            self._active -= 1
+            self._publish()
+    
+    def acquire(self, priority: Optional[tuple] = None, bounded: bool = True) -> float:
+        """Block until a slot is held; returns seconds spent queued"""
+        priority = priority or _request_priority.get()
+        started = time.perf_counter()
+        granted = threading.Event()
+        waiter = self._enter(priority, granted.set, bounded)
+        if waiter is not None and not granted.wait(self._timeout(priority, bounded)) and self._abandon(waiter):
+            self._reject(503, "timeout", f"{self.name} queue wait exceeded")
+        return self._admitted(started)
+    
+    async def aacquire(self, priority: Optional[tuple] = None, bounded: bool = True) -> float:
+        priority = priority or _request_priority.get()
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+        
+        def grant():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+        
+        waiter = self._enter(priority, grant, bounded)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(granted), self._timeout(priority, bounded))
+            except asyncio.TimeoutError:
+                if self._abandon(waiter):
+                    self._reject(503, "timeout", f"{self.name} queue wait exceeded")
+            except asyncio.CancelledError:
+                if not self._abandon(waiter):
+                    self.release()
+                raise
+        return self._admitted(started)
+    
+    @contextlib.contextmanager
+    def slot(self, priority: Optional[tuple] = None, bounded: bool = True):
+        """Hold a slot for the block; its priority becomes the request priority inside it"""
+        if self.limit <= 0:
+            yield 0.0
+            return
+        priority = priority or _request_priority.get()
+        waited = self.acquire(priority, bounded)
+        held_from = time.perf_counter()
+        token = _request_priority.set(priority)
+        try:
+            yield waited
+        finally:
+            _request_priority.reset(token)
+            self.release(time.perf_counter() - held_from)
+    
+    @contextlib.asynccontextmanager
+    async def aslot(self, priority: Optional[tuple] = None, bounded: bool = True):
+        if self.limit <= 0:
+            yield 0.0
+            return
+        priority = priority or _request_priority.get()
+        waited = await self.aacquire(priority, bounded)
+        held_from = time.perf_counter()
+        token = _request_priority.set(priority)
+        try:
+            yield waited
+        finally:
+            _request_priority.reset(token)
+            self.release(time.perf_counter() - held_from)
+
+def request_priority(data: Dict, deadline: Optional[float] = None) -> tuple:
+    """Queue order for a request: urgency from the rule parser, then its absolute deadline"""
+    urgency = 'medium'
+    if isinstance(data, dict) and isinstance(data.get('EmailContent'), str):
+        urgency = rule_parser.urgency(data['EmailContent'])
+    if deadline is None:
+        return URGENCY_RANK[urgency], time.time() + ADMISSION_QUEUE_TIMEOUT, math.inf
+    return URGENCY_RANK[urgency], deadline, deadline
+
+pipeline_limiter = PriorityLimiter("pipeline", ADMISSION_MAX_INFLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT)
+llm_limiter = PriorityLimiter("llm", LLM_MAX_OUTSTANDING)
+
+# ADDED: Circuit breaker for the inference backend - fail fast into the deterministic fallbacks
+LLM_LATENCY_SLO = float(os.getenv("LLM_LATENCY_SLO", "8"))  # seconds; slower calls count as SLO breaches
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # consecutive errors/timeouts -> open
+LLM_BREAKER_SLO_BREACHES = int(os.getenv("LLM_BREAKER_SLO_BREACHES", "5"))  # consecutive slow calls -> open
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))  # open this long, then one probe call
+LLM_DEGRADE_QUEUE_SECONDS = float(os.getenv("LLM_DEGRADE_QUEUE_SECONDS", "10"))  # expected queue wait -> degraded (0 = off)
+
+class LLMUnavailable(RuntimeError):
+    """Raised instead of calling the LLM; every call site's fallback handles it like any LLM error"""
+
+class CircuitBreaker:
+    """closed -> open after consecutive failures or SLO breaches -> half_open probe -> closed.
+    
+    Independently, the gateway is 'degraded' while the expected admission queue wait is past
+    LLM_DEGRADE_QUEUE_SECONDS, and recovers once it falls below half of that.
+    """
+    
+    MODES = ("closed", "open", "half_open", "degraded")
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._degraded = False
+        self._failures = 0
+        self._slow = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._publish()
+    
+    @property
+    def mode(self) -> str:
+        with self._lock:
+            return self._mode()
+    
+    def _mode(self) -> str:
+        if self._state == "closed" and self._degraded:
+            return "degraded"
+        return self._state
+    
+    def _publish(self):
+        mode = self._mode()
+        metrics.set('llm_mode', mode)
+        for candidate in self.MODES:
+            metrics.set('llm_mode_active', int(candidate == mode), labels={'mode': candidate})
+    
+    def after_fork(self):
+        self._lock = threading.Lock()
+        self._probing = False  # a probe in flight belonged to the parent
+    
+    def _transition(self, state: str, reason: str):
+        previous = self._mode()
+        self._state = state
+        if state == "open":
+            self._opened_at = time.monotonic()
+        if state != "half_open":
+            self._probing = False
+        self._failures = self._slow = 0
+        self._publish()
+        metrics.inc('llm_breaker_transitions', labels={'to': state})
+        llm_log.warning("🔌 LLM circuit %s -> %s (%s)", previous, self._mode(), reason)
+    
+    def _check_degraded(self):
+        if LLM_DEGRADE_QUEUE_SECONDS <= 0:
+            return
+        expected_wait = max(pipeline_limiter.expected_wait(), llm_limiter.expected_wait())
+        if not self._degraded and expected_wait > LLM_DEGRADE_QUEUE_SECONDS:
+            self._degraded = True
+        elif self._degraded and expected_wait < LLM_DEGRADE_QUEUE_SECONDS / 2:
+            self._degraded = False
+        else:
+            return
+        self._publish()
+        llm_log.warning("🔌 LLM gateway %s (expected queue wait %.1fs)",
+                        "degraded to fallbacks" if self._degraded else "recovered", expected_wait)
+    
+    def before_call(self) -> bool:
+        """Returns True when this call is the half-open probe; raises LLMUnavailable to short-circuit"""
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= LLM_BREAKER_COOLDOWN:
+                self._transition("half_open", "cooldown elapsed")
+            if self._state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            if self._state != "closed":
+                reason = "open"
+            else:
+                self._check_degraded()
+                if not self._degraded:
+                    return False
+                reason = "degraded"
+        metrics.inc('llm_short_circuits', labels={'reason': reason})
+        raise LLMUnavailable("LLM gateway degraded" if reason == "degraded" else "LLM circuit open")
+    
+    def on_success(self, seconds: float, probe: bool):
+        with self._lock:
+            slow = seconds > LLM_LATENCY_SLO
+            if slow:
+                metrics.inc('llm_slo_breaches')
+            if probe:
+                if slow:
+                    self._transition("open", f"probe took {seconds:.1f}s")
+                else:
+                    self._transition("closed", "probe succeeded")
+                return
+            self._failures = 0
+            self._slow = self._slow + 1 if slow else 0
+            if self._state == "closed" and self._slow >= LLM_BREAKER_SLO_BREACHES:
+                self._transition("open", f"{LLM_BREAKER_SLO_BREACHES} calls slower than {LLM_LATENCY_SLO}s")
+    
+    def on_abandon(self, probe: bool):
+        """Caller gave up before an outcome; frees the half-open probe slot"""
+        if probe:
+            with self._lock:
+                self._probing = False
+    
+    def on_failure(self, error: Exception, probe: bool):
+        with self._lock:
+            if probe:
+                self._transition("open", f"probe failed: {error}")
+                return
+            self._failures += 1
+            if self._state == "closed" and self._failures >= LLM_BREAKER_FAILURES:
+                self._transition("open", f"{LLM_BREAKER_FAILURES} consecutive failures, last: {error}")
+
+llm_breaker = CircuitBreaker()
+
+def _raw_chat_completion(messages: List[Dict], temperature: float, max_tokens: int,
+                         expect: Optional[str] = None) -> str:
+    if LLM_BATCHING:
+        submitted_ns = time.time_ns()
+        future = llm_batcher.submit(messages, temperature, max_tokens)
+        text = future.result(timeout=LLM_CALL_TIMEOUT)
+        _record_batched_usage(messages, text, future, submitted_ns)
+        return text
+    if LLM_STREAMING and expect:
+        return _stream_completion(messages, temperature, max_tokens, expect)
+    response = get_ai_client().chat.completions.create(
+        model=AI_MODEL,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    _record_response_usage(response)
+    return (response.choices[0].message.content or "").strip()
+
+async def _araw_chat_completion(messages: List[Dict], temperature: float, max_tokens: int,
+                                expect: Optional[str] = None) -> str:
+    if LLM_BATCHING:
+        submitted_ns = time.time_ns()
+        future = llm_batcher.submit(messages, temperature, max_tokens)
+        text = await asyncio.wrap_future(future)
+        _record_batched_usage(messages, text, future, submitted_ns)
+        return text
+    if LLM_STREAMING and expect:
+        return await _astream_completion(messages, temperature, max_tokens, expect)
+    response = await get_async_ai_client().chat.completions.create(
+        model=AI_MODEL,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    _record_response_usage(response)
+    return (response.choices[0].message.content or "").strip()
+
+def chat_completion(call_site: str, messages: List[Dict], temperature: float, max_tokens: int,
+                    parse=None, expect: Optional[str] = None):
+    """Single place every agent's blocking LLM call goes through.
+    
+    Returns parse(text) when a parser is given; only completions that parse are cached.
+    expect ('{' or '[') lets a streamed generation stop once that JSON value is complete.
+    """
+    metrics.inc('ai_calls')
+    metrics.inc('ai_calls_by_call_site', labels={'call_site': call_site})
+    with span(f"llm.{call_site}", max_tokens=max_tokens) as current:
+        key = CompletionCache.key(messages, temperature, max_tokens) if LLM_CACHE_ENABLED else None
+        cached = completion_cache.get(call_site, key) if key else None
+        if current is not None:
+            current.attributes["cache_hit"] = cached is not None
+        if cached is not None:
+            return parse(cached) if parse else cached
+        
+        prompt_tokens = count_prompt_tokens(messages)
+        metrics.inc('llm_prompt_tokens_by_call_site', prompt_tokens, labels={'call_site': call_site})
+        if current is not None:
+            current.attributes["prompt_tokens"] = prompt_tokens
+        probe = llm_breaker.before_call()
+        try:
+            with llm_limiter.slot() as waited:
+                started = time.perf_counter()
+                try:
+                    text = _raw_chat_completion(messages, temperature, max_tokens, expect)
+                except Exception as e:
+                    llm_breaker.on_failure(e, probe)
+                    probe = False
+                    raise
+                llm_breaker.on_success(time.perf_counter() - started, probe)
+                probe = False
+        except BaseException:
+            llm_breaker.on_abandon(probe)  # rejected while queued for a slot: no outcome, free the probe
+            raise
+        if current is not None and waited:
+            current.attributes["llm_queue_wait_ms"] = round(waited * 1000, 2)
+        result = parse(text) if parse else text
+        if key:
+            completion_cache.put(key, text)
+        return result
+
+async def achat_completion(call_site: str, messages: List[Dict], temperature: float, max_tokens: int,
+                           parse=None, expect: Optional[str] = None):
+    """Async twin of chat_completion used by the asyncio pipeline"""
+    metrics.inc('ai_calls')
+    metrics.inc('ai_calls_by_call_site', labels={'call_site': call_site})
+    with span(f"llm.{call_site}", max_tokens=max_tokens) as current:
+        key = CompletionCache.key(messages, temperature, max_tokens) if LLM_CACHE_ENABLED else None
+        cached = completion_cache.get(call_site, key) if key else None
+        if current is not None:
+            current.attributes["cache_hit"] = cached is not None
+        if cached is not None:
+            return parse(cached) if parse else cached
+        
+        prompt_tokens = count_prompt_tokens(messages)
+        metrics.inc('llm_prompt_tokens_by_call_site', prompt_tokens, labels={'call_site': call_site})
+        if current is not None:
+            current.attributes["prompt_tokens"] = prompt_tokens
+        probe = llm_breaker.before_call()
+        try:
+            async with llm_limiter.aslot() as waited:
+                started = time.perf_counter()
+                try:
+                    text = await asyncio.wait_for(_araw_chat_completion(messages, temperature, max_tokens, expect),
+                                                  LLM_CALL_TIMEOUT)
+                except Exception as e:
+                    llm_breaker.on_failure(e, probe)
+                    probe = False
+                    raise
+                llm_breaker.on_success(time.perf_counter() - started, probe)
+                probe = False
+        except BaseException:
+            # Lost a hedge race (cancelled, queued or mid-call) or rejected while queued: says nothing
+            # about the gateway, so the half-open probe goes back for the next call
+            llm_breaker.on_abandon(probe)
+            raise
+        if current is not None and waited:
+            current.attributes["llm_queue_wait_ms"] = round(waited * 1000, 2)
+        result = parse(text) if parse else text
+        if key:
+            completion_cache.put(key, text)
+        return result
+
+# ADDED: Per-request deadlines - the budget is split across phases, and an LLM step that is at risk of
+# missing its share races the deterministic equivalent (first acceptable answer wins)
+DEADLINE_PHASE_SHARES = _parse_sample_rates(os.getenv("DEADLINE_PHASE_SHARES",
+                                                      "parse=0.15,find_slots=0.35,negotiate=0.3,decision=0.2"))
+DEADLINE_HEDGE_AT = float(os.getenv("DEADLINE_HEDGE_AT", "0.8"))  # share of a phase budget the LLM gets alone
+DEADLINE_HEDGE_WORKERS = int(os.getenv("DEADLINE_HEDGE_WORKERS", "64"))
+PHASES = ("parse", "find_slots", "negotiate", "decision")
+_request_deadline = contextvars.ContextVar("request_deadline", default=None)  # absolute time.time()
+_phase_deadline = contextvars.ContextVar("phase_deadline", default=None)  # absolute end of the current phase
+_phase_paths = contextvars.ContextVar("phase_paths", default=None)  # phase -> Counter of paths, per request
+_phase_paths_lock = threading.Lock()
+_llm_latency_estimates = {}  # call_site -> moving average seconds, to spot calls at risk up front
+_hedge_executor = ThreadPoolExecutor(max_workers=DEADLINE_HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+
+def request_deadline(data: Dict) -> Optional[float]:
+    """Absolute deadline from the request's Deadline_ms budget (body field or X-Deadline-Ms header)"""
+    try:
+        budget_ms = float(data.get('Deadline_ms'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return time.time() + budget_ms / 1000.0 if budget_ms > 0 else None
+
+@contextlib.contextmanager
+def deadline_scope(deadline: Optional[float]):
+    token = _request_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _request_deadline.reset(token)
+
+@contextlib.contextmanager
+def phase_budget(phase: str):
+    """Give this phase its share of what is left, counting the phases still to come"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        yield None
+        return
+    remaining_phases = PHASES[PHASES.index(phase):]
+    total = sum(DEADLINE_PHASE_SHARES.get(p, 0.0) for p in remaining_phases) or 1.0
+    budget = max(0.0, deadline - time.time()) * DEADLINE_PHASE_SHARES.get(phase, 0.0) / total
+    trace_attributes(budget_ms=round(budget * 1000, 1))
+    token = _phase_deadline.set(time.time() + budget)
+    try:
+        yield budget
+    finally:
+        _phase_deadline.reset(token)
+
+def record_phase_path(phase: str, path: str):
+    """Which path produced a phase's result: llm, rules, deterministic, deterministic_hedge, consensus or fallback"""
+    metrics.inc('phase_paths', labels={'phase': phase, 'path': path})
+    trace_attributes(path=path)
+    paths = _phase_paths.get()
+    if paths is not None:
+        with _phase_paths_lock:
+            paths.setdefault(phase, Counter())[path] += 1
+
+def phase_paths_summary() -> Dict:
+    paths = _phase_paths.get() or {}
+    with _phase_paths_lock:
+        return {phase: next(iter(counts)) if len(counts) == 1 else dict(counts)
+                for phase, counts in paths.items()}
+
+def request_scoped(fn):
+    """Pipeline entry point: starts the deadline clock (unless the endpoint already did) and a
+    fresh phase-path record for the request"""
+    @contextlib.contextmanager
+    def scope(data):
+        deadline_token = _request_deadline.set(_request_deadline.get() or request_deadline(data))
+        paths_token = _phase_paths.set({})
+        refresh_token = _calendar_refresh.set(set() if data.get('Calendar_refresh') else None)
+        counts_token = _calendar_cache_counts.set(Counter())
+        try:
+            yield
+        finally:
+            _calendar_cache_counts.reset(counts_token)
+            _calendar_refresh.reset(refresh_token)
+            _phase_paths.reset(paths_token)
+            _request_deadline.reset(deadline_token)
+    
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(data, *args, **kwargs):
+            with scope(data):
+                return await fn(data, *args, **kwargs)
+        return async_wrapper
+    
+    @functools.wraps(fn)
+    def wrapper(data, *args, **kwargs):
+        with scope(data):
+            return fn(data, *args, **kwargs)
+    return wrapper
+
+def _observe_llm_latency(call_site: str, seconds: float):
+    previous = _llm_latency_estimates.get(call_site)
+    _llm_latency_estimates[call_site] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+def _hedge_plan(call_site: str) -> Optional[tuple]:
+    """(seconds the LLM runs alone, seconds left in the phase), or None when there is no deadline"""
+    phase_end = _phase_deadline.get()
+    if phase_end is None:
+        return None
+    remaining = phase_end - time.time()
+    at_risk = _llm_latency_estimates.get(call_site, 0.0) > remaining
+    return (0.0 if at_risk else remaining * DEADLINE_HEDGE_AT), remaining
+
+def hedged(phase: str, call_site: str, llm_call, deterministic, acceptable=bool):
+    """Run llm_call(); under a deadline, race deterministic() against it once it is at risk.
+    
+    LLM errors propagate so the caller's fallback still applies when nothing acceptable is left.
+    """
+    plan = _hedge_plan(call_site)
+    if plan is None or plan[1] <= 0:
+        if plan is not None:
+            record_phase_path(phase, "deterministic")  # phase budget already spent: skip the LLM
+            return deterministic()
+        started = time.perf_counter()
+        result = llm_call()
+        _observe_llm_latency(call_site, time.perf_counter() - started)
+        record_phase_path(phase, "llm")
+        return result
+    
+    alone, remaining = plan
+    phase_end = time.time() + remaining
+    
+    def timed_llm_call():
+        started = time.perf_counter()
+        result = llm_call()
+        _observe_llm_latency(call_site, time.perf_counter() - started)
+        return result
+    
+    future = _hedge_executor.submit(contextvars.copy_context().run, timed_llm_call)
+    try:
+        result = future.result(timeout=alone)
+        record_phase_path(phase, "llm")
+        return result
+    except concurrent.futures.TimeoutError:
+        pass
+    
+    alternative = deterministic()
+    if acceptable(alternative):
+        if future.done() and future.exception() is None:
+            record_phase_path(phase, "llm")
+            return future.result()
+        record_phase_path(phase, "deterministic_hedge")
+        return alternative  # the LLM call finishes in the background and is discarded
+    try:
+        result = future.result(timeout=max(0.0, phase_end - time.time()))
+    except concurrent.futures.TimeoutError:
+        raise TimeoutError(f"{call_site} missed its {remaining:.2f}s phase budget") from None
+    record_phase_path(phase, "llm")
+    return result
+
+async def ahedged(phase: str, call_site: str, llm_call, deterministic, acceptable=bool):
+    """Async twin of hedged; llm_call returns a coroutine, and a losing LLM call is cancelled"""
+    plan = _hedge_plan(call_site)
+    if plan is None or plan[1] <= 0:
+        if plan is not None:
+            record_phase_path(phase, "deterministic")
+            return deterministic()
+        started = time.perf_counter()
+        result = await llm_call()
+        _observe_llm_latency(call_site, time.perf_counter() - started)
+        record_phase_path(phase, "llm")
+        return result
+    
+    alone, remaining = plan
+    phase_end = time.time() + remaining
+    
+    async def timed_llm_call():
+        started = time.perf_counter()
+        result = await llm_call()
+        _observe_llm_latency(call_site, time.perf_counter() - started)
+        return result
+    
+    task = asyncio.ensure_future(timed_llm_call())
+    done, _ = await asyncio.wait({task}, timeout=alone)
+    if not done:
+        alternative = deterministic()
+        if acceptable(alternative) and (not task.done() or task.exception() is not None):
+            task.cancel()
+            record_phase_path(phase, "deterministic_hedge")
+            return alternative
+        done, _ = await asyncio.wait({task}, timeout=max(0.0, phase_end - time.time()))
+        if not done:
+            task.cancel()
+            raise TimeoutError(f"{call_site} missed its {remaining:.2f}s phase budget")
+    result = task.result()
+    record_phase_path(phase, "llm")
+    return result
+
+# ADDED: Deployment-selectable slot engine: "llm" (original), "deterministic", or "hybrid"
+# (deterministic candidates re-ranked by each agent's LLM)
+SLOT_ENGINE = os.getenv("SLOT_ENGINE", "llm").lower()
+SLOT_STEP_MINUTES = int(os.getenv("SLOT_STEP_MINUTES", "30"))
+SLOT_CANDIDATE_LIMIT = int(os.getenv("SLOT_CANDIDATE_LIMIT", "10"))
+BUSINESS_HOURS = (9, 18)  # 9AM-6PM local time, weekdays only
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Asia/Kolkata")
+IST_TZ = pytz.timezone('Asia/Kolkata')
+
+EMPLOYEE_TIMEZONES_PATH = os.getenv(
+    "EMPLOYEE_TIMEZONES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "employee_timezones.json")
+)
+
+def load_employee_timezones(path: str = EMPLOYEE_TIMEZONES_PATH) -> Dict[str, str]:
+    """Per-user timezone config ({"email": "Area/City"}); unknown zones are skipped"""
+    try:
+        with open(path, 'r') as f:
+            configured = json.load(f)
+    except FileNotFoundError:
+        startup_log.warning("⚠️ No timezone config at %s, everyone uses %s", path, DEFAULT_TIMEZONE)
+        return {}
+    timezones = {}
+    for email, tz_name in configured.items():
+        try:
+            pytz.timezone(tz_name)
+        except pytz.UnknownTimeZoneError:
+            startup_log.warning("⚠️ Unknown timezone %s for %s, using %s", tz_name, email, DEFAULT_TIMEZONE)
+            continue
+        timezones[email] = tz_name
+    return timezones
+
+EMPLOYEE_TIMEZONES = load_employee_timezones()
+
+def timezone_for(email: str) -> str:
+    return EMPLOYEE_TIMEZONES.get(email, DEFAULT_TIMEZONE)
+
+def iso_to_epoch(value: str) -> int:
+    """ISO datetime (or all-day date) from Google Calendar / the pipeline -> epoch seconds"""
+    if 'T' not in value:
+        # All-day events carry a bare date; block the whole day in the default timezone
+        day = datetime.strptime(value, '%Y-%m-%d')
+        return int(pytz.timezone(DEFAULT_TIMEZONE).localize(day).timestamp())
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = IST_TZ.localize(dt)
+    return int(dt.timestamp())
+
+def epoch_to_ist(epoch: int) -> str:
+    """Epoch seconds -> the +05:30 string format used throughout the pipeline"""
+    return datetime.fromtimestamp(epoch, IST_TZ).strftime('%Y-%m-%dT%H:%M:%S+05:30')
+
+def merge_intervals(intervals: List[tuple]) -> List[tuple]:
+    """Sort and merge overlapping/touching (start, end) intervals in one sweep"""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def events_to_busy(events: List[Dict]) -> List[tuple]:
+    """Processed calendar events -> merged busy epoch intervals"""
+    return merge_intervals([(iso_to_epoch(e["StartTime"]), iso_to_epoch(e["EndTime"])) for e in events])
+
+def intersect_intervals(a: List[tuple], b: List[tuple]) -> List[tuple]:
+    """Two-pointer intersection of two sorted, merged interval lists"""
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if start < end:
+            result.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+def subtract_intervals(base: List[tuple], busy: List[tuple]) -> List[tuple]:
+    """Remove sorted, merged busy intervals from sorted, merged base intervals"""
+    result = []
+    j = 0
+    for start, end in base:
+        cursor = start
+        while j < len(busy) and busy[j][1] <= cursor:
+            j += 1
+        k = j
+        while k < len(busy) and busy[k][0] < end:
+            if busy[k][0] > cursor:
+                result.append((cursor, busy[k][0]))
+            cursor = max(cursor, busy[k][1])
+            k += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+class TimezoneEngine:
+    """Per-timezone UTC-offset transition tables; business hours and local times by epoch arithmetic"""
+    
+    def __init__(self, step_minutes: int = SLOT_STEP_MINUTES):
+        self.step_seconds = step_minutes * 60
+        self._tables = {}
+        self._lock = threading.Lock()
+    
+    def after_fork(self):
+        self._lock = threading.Lock()  # the offset tables themselves are shared copy-on-write
+    
+    def _table(self, tz_name: str) -> tuple:
+        """(transition epochs, offset seconds) for the zone, built once from the tz database"""
+        table = self._tables.get(tz_name)
+        if table is None:
+            tz = pytz.timezone(tz_name)
+            transitions = getattr(tz, '_utc_transition_times', None)
+            if transitions:
+                epochs = [calendar.timegm(t.timetuple()) for t in transitions]
+                offsets = [int(info[0].total_seconds()) for info in tz._transition_info]
+            else:
+                epochs = [-2 ** 62]
+                offsets = [int(tz.utcoffset(datetime(2000, 1, 1)).total_seconds())]
+            table = (epochs, offsets)
+            with self._lock:
+                self._tables[tz_name] = table
+        return table
+    
+    def offset_at(self, tz_name: str, epoch: int) -> int:
+        epochs, offsets = self._table(tz_name)
+        return offsets[max(0, bisect.bisect_right(epochs, epoch) - 1)]
+    
+    def _local_to_epoch(self, tz_name: str, local_seconds: int) -> int:
+        """Wall-clock seconds (as if UTC) -> epoch; two lookups settle DST edges"""
+        guess = local_seconds - self.offset_at(tz_name, local_seconds)
+        return local_seconds - self.offset_at(tz_name, guess)
+    
+    def local_time(self, tz_name: str, epoch: int) -> datetime:
+        return datetime.fromtimestamp(epoch + self.offset_at(tz_name, epoch), pytz.utc).replace(tzinfo=None)
+    
+    def business_windows(self, tz_name: str, start_epoch: int, end_epoch: int) -> List[tuple]:
+        """Weekday business-hour windows of one timezone, clipped to the search window"""
+        first_day = (start_epoch + self.offset_at(tz_name, start_epoch)) // 86400 - 1
+        last_day = (end_epoch + self.offset_at(tz_name, end_epoch)) // 86400 + 1
+        windows = []
+        for day in range(first_day, last_day + 1):
+            if (day + 3) % 7 >= 5:  # 1970-01-01 was a Thursday; Saturday/Sunday
+                continue
+            start = max(self._local_to_epoch(tz_name, day * 86400 + BUSINESS_HOURS[0] * 3600), start_epoch)
+            end = min(self._local_to_epoch(tz_name, day * 86400 + BUSINESS_HOURS[1] * 3600), end_epoch)
+            if start < end:
+                windows.append((start, end))
+        return windows
+    
+    def coverage(self, weights: Dict[str, int], start_epoch: int, end_epoch: int) -> List[tuple]:
+        """Single sweep over every timezone's windows -> [(start, end, weight of zones in hours)]"""
+        edges = []
+        for tz_name, weight in weights.items():
+            for start, end in self.business_windows(tz_name, start_epoch, end_epoch):
+                edges.append((start, weight))
+                edges.append((end, -weight))
+        edges.sort()
+        segments = []
+        covered = 0
+        for i, (point, delta) in enumerate(edges):
+            covered += delta
+            if covered > 0 and i + 1 < len(edges) and edges[i + 1][0] > point:
+                segments.append((point, edges[i + 1][0], covered))
+        return segments
+    
+    def common_business_hours(self, tz_names, start_epoch: int, end_epoch: int) -> List[tuple]:
+        """Intervals inside every listed timezone's business hours"""
+        weights = {tz_name: 1 for tz_name in tz_names}
+        return merge_intervals([(s, e) for s, e, w in self.coverage(weights, start_epoch, end_epoch)
+                                if w == len(weights)])
+    
+    def best_business_hours(self, weights: Dict[str, int], start_epoch: int, end_epoch: int) -> tuple:
+        """Intervals covering the most participants when nothing covers all of them -> (intervals, weight)"""
+        segments = self.coverage(weights, start_epoch, end_epoch)
+        if not segments:
+            return [], 0
+        best = max(w for _, _, w in segments)
+        return merge_intervals([(s, e) for s, e, w in segments if w == best]), best
+    
+    def best_start_times(self, weights: Dict[str, int], start_epoch: int, end_epoch: int,
+                         duration_mins: int, anchor: int, limit: int = 3) -> List[int]:
+        """Grid-aligned starts inside the best-covered hours, closest to the anchor first"""
+        windows, _ = self.best_business_hours(weights, start_epoch, end_epoch)
+        duration = duration_mins * 60
+        starts = []
+        for window_start, window_end in windows:
+            slot_start = -(-window_start // self.step_seconds) * self.step_seconds
+            while slot_start + duration <= window_end:
+                starts.append(slot_start)
+                slot_start += self.step_seconds
+        starts.sort(key=lambda s: (abs(s - anchor), s))
+        return starts[:limit]
+
+timezone_engine = TimezoneEngine()
+
+def business_hours_utc(tz_name: str, start_epoch: int, end_epoch: int) -> List[tuple]:
+    """Weekday 9AM-6PM windows of one timezone as epoch intervals clipped to the search window"""
+    return timezone_engine.business_windows(tz_name, start_epoch, end_epoch)
+
+class SlotEngine:
+    """Deterministic common-slot finder: interval sweep over every participant's busy times"""
+    
+    def __init__(self, step_minutes: int = SLOT_STEP_MINUTES, limit: int = SLOT_CANDIDATE_LIMIT):
+        self.step_seconds = step_minutes * 60
+        self.limit = limit
+    
+    def free_intervals(self, busy_by_participant: Dict[str, List[tuple]], timezones: Dict[str, str],
+                       start_epoch: int, end_epoch: int) -> List[tuple]:
+        """Intersection of everyone's business hours minus the union of everyone's busy time"""
+        allowed = timezone_engine.common_business_hours(set(timezones.values()) or {DEFAULT_TIMEZONE},
+                                                        start_epoch, end_epoch)
+        all_busy = merge_intervals([iv for busy in busy_by_participant.values() for iv in busy])
+        return subtract_intervals(allowed, all_busy)
+    
+    def find_common_slots(self, busy_by_participant: Dict[str, List[tuple]], timezones: Dict[str, str],
+                          start_date: str, end_date: str, duration_mins: int,
+                          preferred_datetime: Optional[str] = None) -> List[Dict]:
+        """Same slot dict shape as find_available_slots: [{"start","end","score"}], best first"""
+        start_epoch = iso_to_epoch(start_date)
+        end_epoch = iso_to_epoch(end_date)
+        duration = duration_mins * 60
+        anchor = iso_to_epoch(preferred_datetime) if preferred_datetime else start_epoch
+        
+        free = self.free_intervals(busy_by_participant, timezones, start_epoch, end_epoch)
+        if not free and len(set(timezones.values())) > 1:
+            # No shared business hours (e.g. IST + New York): honour the largest timezone group
+            majority_tz = Counter(timezones.values()).most_common(1)[0][0]
+            agent_log.info("🧮 No overlapping business hours, using %s hours", majority_tz)
+            free = self.free_intervals(busy_by_participant, {'majority': majority_tz}, start_epoch, end_epoch)
+        
+        candidates = []
+        for free_start, free_end in free:
+            slot_start = -(-free_start // self.step_seconds) * self.step_seconds  # align up to the grid
+            while slot_start + duration <= free_end:
+                candidates.append(slot_start)
+                slot_start += self.step_seconds
+        
+        # Closest to the requested time wins; score decays by 0.05 per day away
+        candidates.sort(key=lambda s: abs(s - anchor))
+        slots = []
+        for slot_start in candidates[:self.limit]:
+            days_away = abs(slot_start - anchor) / 86400
+            slots.append({
+                "start": epoch_to_ist(slot_start),
+                "end": epoch_to_ist(slot_start + duration),
+                "score": round(max(0.1, 0.95 - 0.05 * days_away), 2)
+            })
+        return slots
+
+slot_engine = SlotEngine()
+
+# ADDED: Joint batch scheduling - non-conflicting slots for a whole batch over participant x time bitsets
+JOINT_LOCAL_SEARCH_ROUNDS = int(os.getenv("JOINT_LOCAL_SEARCH_ROUNDS", "3"))  # improvement passes after greedy
+JOINT_REPAIR_CANDIDATES = int(os.getenv("JOINT_REPAIR_CANDIDATES", "16"))  # starts tried per unplaced meeting
+
+class JointScheduler:
+    """Assigns every meeting of a batch a slot that no other batch meeting of a shared participant overlaps.
+    
+    Time is a grid of SLOT_STEP_MINUTES cells starting at the earliest search window. Each participant's
+    free time, bookings and each meeting's feasible starts are Python ints used as bitsets (bit i = cell i).
+    """
+    
+    def __init__(self, step_minutes: int = SLOT_STEP_MINUTES, rounds: int = JOINT_LOCAL_SEARCH_ROUNDS,
+                 repair_candidates: int = JOINT_REPAIR_CANDIDATES):
+        self.step_seconds = step_minutes * 60
+        self.rounds = rounds
+        self.repair_candidates = repair_candidates
+    
+    def _inner_cells(self, intervals: List[tuple], origin: int, cells: int) -> int:
+        """Cells lying wholly inside the intervals"""
+        mask = 0
+        for start, end in intervals:
+            first = max(0, -(-(start - origin) // self.step_seconds))
+            last = min(cells, (end - origin) // self.step_seconds)
+            if last > first:
+                mask |= ((1 << (last - first)) - 1) << first
+        return mask
+    
+    def _touched_cells(self, intervals: List[tuple], origin: int, cells: int) -> int:
+        """Cells any interval overlaps"""
+        mask = 0
+        for start, end in intervals:
+            first = max(0, (start - origin) // self.step_seconds)
+            last = min(cells, -(-(end - origin) // self.step_seconds))
+            if last > first:
+                mask |= ((1 << (last - first)) - 1) << first
+        return mask
+    
+    @staticmethod
+    def _starts(mask: int, length: int) -> int:
+        """Bits i where cells i .. i+length-1 are all set"""
+        run = mask
+        for shift in range(1, length):
+            run &= mask >> shift
+        return run
+    
+    @staticmethod
+    def _starts_blocked(taken: int, length: int) -> int:
+        """Bits i where any of cells i .. i+length-1 is taken"""
+        blocked = taken
+        for shift in range(1, length):
+            blocked |= taken >> shift
+        return blocked
+    
+    @staticmethod
+    def _nearest(mask: int, anchor: int) -> Optional[int]:
+        """Set bit closest to the anchor cell, the earlier one on a tie"""
+        if not mask:
+            return None
+        below = mask & ((1 << (anchor + 1)) - 1)
+        above = mask >> (anchor + 1)
+        best_below = below.bit_length() - 1 if below else None
+        best_above = (above & -above).bit_length() + anchor if above else None
+        if best_below is None:
+            return best_above
+        if best_above is None or anchor - best_below <= best_above - anchor:
+            return best_below
+        return best_above
+    
+    def _allowed_hours(self, timezones: Dict[str, str], start: int, end: int) -> List[tuple]:
+        """Same business-hours rule as SlotEngine, majority timezone when nothing is shared"""
+        tz_names = set(timezones.values()) or {DEFAULT_TIMEZONE}
+        allowed = timezone_engine.common_business_hours(tz_names, start, end)
+        if not allowed and len(tz_names) > 1:
+            majority_tz = Counter(timezones.values()).most_common(1)[0][0]
+            allowed = timezone_engine.common_business_hours({majority_tz}, start, end)
+        return allowed
+    
+    def schedule(self, meetings: List[Dict], busy_by_participant: Dict[str, List[tuple]]) -> List[Optional[Dict]]:
+        """meetings: [{"participants", "start", "end", "duration", "anchor", "urgency"}] with epoch seconds and
+        URGENCY_RANK urgency. Returns per meeting {"start", "end", "score", "placed"} in epochs, or None when
+        its window has no free slot at all"""
+        if not meetings:
+            return []
+        step = self.step_seconds
+        origin = min(m["start"] for m in meetings) // step * step
+        cells = -(-(max(m["end"] for m in meetings) - origin) // step)
+        everything = (1 << cells) - 1
+        
+        participants = {p for m in meetings for p in m["participants"]}
+        free = {p: everything & ~self._touched_cells(busy_by_participant.get(p, []), origin, cells)
+                for p in participants}
+        
+        lengths, anchors, base_starts = [], [], []
+        for m in meetings:
+            allowed = self._inner_cells(
+                self._allowed_hours({p: timezone_for(p) for p in m["participants"]}, m["start"], m["end"]),
+                origin, cells)
+            for p in m["participants"]:
+                allowed &= free[p]
+            lengths.append(max(1, -(-m["duration"] // step)))
+            anchors.append(min(cells - 1, max(0, round((m["anchor"] - origin) / step))))
+            base_starts.append(self._starts(allowed, lengths[-1]))
+        
+        booked = {p: 0 for p in participants}
+        placement = [None] * len(meetings)
+        
+        def block(i, cell):
+            return ((1 << lengths[i]) - 1) << cell
+        
+        def place(i, cell):
+            placement[i] = cell
+            for p in meetings[i]["participants"]:
+                booked[p] |= block(i, cell)
+        
+        def unplace(i):
+            for p in meetings[i]["participants"]:
+                booked[p] &= ~block(i, placement[i])
+            placement[i] = None
+        
+        def open_starts(i):
+            taken = 0
+            for p in meetings[i]["participants"]:
+                taken |= booked[p]
+            # a start is open when none of the meeting's cells is booked for any of its participants
+            return base_starts[i] & ~self._starts_blocked(taken, lengths[i])
+        
+        # Greedy: most urgent first, then the most constrained (fewest feasible starts)
+        order = sorted(range(len(meetings)),
+                       key=lambda i: (meetings[i]["urgency"], bin(base_starts[i]).count("1"), i))
+        unplaced = []
+        for i in order:
+            cell = self._nearest(open_starts(i), anchors[i])
+            if cell is None:
+                unplaced.append(i)
+            else:
+                place(i, cell)
+        
+        # Repair: free a start for an unplaced meeting by moving the one meeting in its way
+        for i in list(unplaced):
+            candidates, remaining = [], base_starts[i]
+            while remaining and len(candidates) < self.repair_candidates:
+                cell = self._nearest(remaining, anchors[i])
+                candidates.append(cell)
+                remaining &= ~(1 << cell)
+            for cell in candidates:
+                cells_needed = block(i, cell)
+                blockers = [j for j in range(len(meetings)) if placement[j] is not None
+                            and block(j, placement[j]) & cells_needed
+                            and set(meetings[j]["participants"]) & set(meetings[i]["participants"])]
+                if len(blockers) != 1:
+                    continue
+                j = blockers[0]
+                old = placement[j]
+                unplace(j)
+                place(i, cell)
+                moved = self._nearest(open_starts(j), anchors[j])
+                if moved is not None:
+                    place(j, moved)
+                    unplaced.remove(i)
+                    metrics.inc('joint_repairs')
+                    break
+                unplace(i)
+                place(j, old)
+        
+        # Local search: each meeting in turn moves to the open start closest to its preferred time
+        for _ in range(self.rounds):
+            improved = False
+            for i in order:
+                if placement[i] is None:
+                    continue
+                old = placement[i]
+                unplace(i)
+                cell = self._nearest(open_starts(i), anchors[i])
+                place(i, cell)  # its old start is still open, so there is always one
+                if abs(cell - anchors[i]) < abs(old - anchors[i]):
+                    improved = True
+            if not improved:
+                break
+        
+        results = []
+        for i, m in enumerate(meetings):
+            cell, placed = placement[i], True
+            if cell is None:
+                # No conflict-free start left: best calendar-free start, overlapping another batch meeting
+                cell, placed = self._nearest(base_starts[i], anchors[i]), False
+            if cell is None:
+                results.append(None)
+                continue
+            start = origin + cell * step
+            days_away = abs(start - m["anchor"]) / 86400
+            results.append({"start": start, "end": start + m["duration"], "placed": placed,
+                            "score": round(max(0.1, 0.95 - 0.05 * days_away), 2)})
+        return results
+
+joint_scheduler = JointScheduler()
+
+# ADDED: Long-lived MCP time-server session - one stdio subprocess for the whole process
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "5"))
+MCP_CACHE_TTL = float(os.getenv("MCP_CACHE_TTL", "300"))
+MCP_RESTART_BACKOFF = float(os.getenv("MCP_RESTART_BACKOFF", "30"))
+MCP_HEALTH_INTERVAL = float(os.getenv("MCP_HEALTH_INTERVAL", "60"))  # seconds between session pings (0 = off)
+
+class MCPTimeClient:
+    """Keeps one MCP session open on a background event loop, shared by every thread"""
+    
+    def __init__(self, server):
+        self._server = server
+        self._lock = threading.Lock()
+        self._loop = None
+        self._ready = None
+        self._stop = None
+        self._session_task = None
+        self._failed_at = 0.0
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._inflight = {}  # timezone -> concurrent future of the lookup every caller waits on
+    
+    def _ensure_loop(self):
+        """Start the background loop and its health monitor (caller holds the lock)"""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            Thread(target=self._loop.run_forever, daemon=True, name="mcp-time-client").start()
+            if MCP_HEALTH_INTERVAL > 0:
+                asyncio.run_coroutine_threadsafe(self._monitor(), self._loop)
+    
+    def _submit(self, coro) -> concurrent.futures.Future:
+        with self._lock:
+            self._ensure_loop()
+            return asyncio.run_coroutine_threadsafe(coro, self._loop)
+    
+    async def _run_session(self, ready: asyncio.Future, stop: asyncio.Event):
+        # Enter and exit the stdio session in one task, as anyio cancel scopes require
+        try:
+            async with self._server:
+                ready.set_result(True)
+                await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            timezone_log.warning("MCP session ended: %s", e)
+    
+    async def _ensure_session(self):
+        """Start the stdio session if needed; callers arriving meanwhile wait for the same start"""
+        starting = self._session_task is None or self._session_task.done()
+        if starting:
+            self._ready = self._loop.create_future()
+            self._stop = asyncio.Event()
+            self._session_task = asyncio.ensure_future(self._run_session(self._ready, self._stop))
+        await asyncio.shield(self._ready)
+        if starting:
+            metrics.inc('mcp_session_starts')
+            timezone_log.info("🌍 MCP time server session started")
+    
+    async def _call(self, timezone_name: str):
+        await self._ensure_session()
+        return await self._server.call_tool("get_current_time", {"timezone": timezone_name})
+    
+    async def _ping(self):
+        await self._ensure_session()
+        return await self._server.list_tools()
+    
+    async def _monitor(self):
+        """Periodic health check on the client loop, so a dead session is replaced before a request needs it"""
+        while True:
+            await asyncio.sleep(MCP_HEALTH_INTERVAL)
+            if time.time() - self._failed_at < MCP_RESTART_BACKOFF:
+                continue
+            try:
+                await asyncio.wait_for(self._ping(), MCP_CALL_TIMEOUT)
+                metrics.set('mcp_healthy', 1)
+            except Exception as e:
+                timezone_log.warning("MCP health check failed: %r, restarting session", e)
+                metrics.set('mcp_healthy', 0)
+                self._restart()
+    
+    def _restart(self):
+        """Drop a broken session; the next call after the backoff starts a fresh subprocess"""
+        self._failed_at = time.time()
+        if self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        self._session_task = None
+        metrics.inc('mcp_restarts')
+    
+    def _cached(self, timezone_name: str) -> Optional[Dict]:
+        with self._cache_lock:
+            cached = self._cache.get(timezone_name)
+            if cached and cached[0] > time.time():
+                metrics.inc('mcp_cache_hits')
+                return cached[1]
+        return None
+    
+    def _finish(self, timezone_name: str, future: concurrent.futures.Future):
+        """Done callback of a lookup: cache the answer and let the next miss start a new call"""
+        with self._lock:
+            if self._inflight.get(timezone_name) is future:
+                del self._inflight[timezone_name]
+        if not future.cancelled() and future.exception() is None:
+            metrics.inc('mcp_calls')
+            with self._cache_lock:
+                self._cache[timezone_name] = (time.time() + MCP_CACHE_TTL, future.result())
+    
+    def get_timezone_info(self, timezone_name: str) -> Optional[Dict]:
+        """Cached per timezone; None when the server is unavailable. Concurrent misses share one call"""
+        cached = self._cached(timezone_name)
+        if cached is not None:
+            return cached
+        
+        with self._lock:
+            if time.time() - self._failed_at < MCP_RESTART_BACKOFF:
+                return None
+            future = self._inflight.get(timezone_name)
+            started = future is None
+            if started:
+                self._ensure_loop()
+                future = self._inflight[timezone_name] = asyncio.run_coroutine_threadsafe(
+                    self._call(timezone_name), self._loop)
+        if started:  # outside the lock: an already finished future runs the callback right here
+            future.add_done_callback(functools.partial(self._finish, timezone_name))
+        
+        # The round trip runs without the lock: other timezones and cached lookups never wait behind it
+        try:
+            return future.result(timeout=MCP_CALL_TIMEOUT)
+        except Exception as e:
+            with self._lock:
+                first = self._inflight.get(timezone_name) is future
+                if first:
+                    del self._inflight[timezone_name]
+            if first:  # one waiter restarts the session, the rest just give up on this lookup
+                future.cancel()
+                timezone_log.warning("MCP timezone lookup failed for %s: %s, restarting session", timezone_name, e)
+                self._restart()
+            return None
+    
+    def health_check(self) -> bool:
+        """Round-trip a cheap tool listing; restarts the session when it does not answer"""
+        future = self._submit(self._ping())
+        try:
+            future.result(timeout=MCP_CALL_TIMEOUT)
+            return True
+        except Exception as e:
+            future.cancel()
+            timezone_log.warning("MCP health check failed: %s", e)
+            self._restart()
+            return False
+    
+    def close(self):
+        with self._lock:
+            if self._stop is not None and self._loop is not None:
+                self._loop.call_soon_threadsafe(self._stop.set)
+            self._session_task = None
+    
+    def after_fork(self):
+        """The loop thread and the stdio subprocess belong to the parent; keep only the timezone cache"""
+        self._lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._inflight = {}
+        self._loop = None
+        self._ready = None
+        self._stop = None
+        self._session_task = None
+
+mcp_time_client = MCPTimeClient(time_server) if MCP_AVAILABLE else None
 
 # ENHANCED TimezoneVerificationAgent with MCP support
 class TimezoneVerificationAgent:
@@ -88,97 +2444,86 @@ class TimezoneVerificationAgent:
     def __init__(self):
         self.mcp_available = MCP_AVAILABLE
         
-    async def get_timezone_info_mcp(self, timezone_name: str) -> Dict:
-        """Use MCP for accurate timezone information"""
+    def get_timezone_info_mcp(self, timezone_name: str) -> Dict:
+        """Use MCP for accurate timezone information (shared session, cached per timezone)"""
         if not self.mcp_available:
             return None
-            
-        try:
-            # Use MCP time server for timezone calculations
-            async with time_server as server:
-                result = await server.call_tool(
-                    "get_timezone_info",
-                    timezone=timezone_name
-                )
-                return result
-        except Exception as e:
-            print(f"MCP timezone lookup failed for {timezone_name}: {e}")
-            return None
+        return mcp_time_client.get_timezone_info(timezone_name)
 
-    def verify_timezone_compatibility(self, proposed_time: str, employee_agents: Dict) -> Dict:
-        """EXACT SAME logic as your original with MCP enhancement"""
-        timezone_assignments = {
-            "userone.amd@gmail.com": "Asia/Kolkata",
-            "usertwo.amd@gmail.com": "America/New_York",
-            "userthree.amd@gmail.com": "Asia/Kolkata"
-        }
+    def verify_timezone_compatibility(self, proposed_time: str, participants: List[str],
+                                      duration_minutes: int = 30) -> Dict:
+        """EXACT SAME logic as your original, on the timezone engine's offset tables, for the meeting's participants"""
+        timezone_assignments = {email: timezone_for(email) for email in dict.fromkeys(participants)}
         
         try:
-            ist_tz = pytz.timezone('Asia/Kolkata')
-            proposed_dt = datetime.fromisoformat(proposed_time.replace('+05:30', ''))
-            proposed_dt = ist_tz.localize(proposed_dt)
+            proposed_epoch = iso_to_epoch(proposed_time)
             
             timezone_conflicts = []
             compatible_count = 0
             
-            for email, timezone_name in timezone_assignments.items():
+            # One local-time lookup per distinct timezone, not per employee
+            local_times = {}
+            for timezone_name in set(timezone_assignments.values()):
                 try:
                     # Try MCP first for enhanced timezone handling
                     if self.mcp_available:
-                        try:
-                            # Run MCP call in event loop if available
-                            loop = asyncio.get_event_loop()
-                            mcp_result = loop.run_until_complete(
-                                self.get_timezone_info_mcp(timezone_name)
-                            )
-                            if mcp_result:
-                                print(f"🌍 MCP timezone info for {timezone_name}: {mcp_result}")
-                        except Exception as mcp_e:
-                            print(f"MCP call failed: {mcp_e}, using fallback")
-                    
-                    # YOUR EXACT ORIGINAL LOGIC (unchanged)
-                    employee_tz = pytz.timezone(timezone_name)
-                    local_time = proposed_dt.astimezone(employee_tz)
-                    
-                    hour = local_time.hour
-                    if hour < 9 or hour >= 18:
-                        timezone_conflicts.append({
-                            "agent": email,
-                            "timezone": timezone_name,
-                            "local_time": local_time.strftime("%I:%M %p"),
-                            "issue": f"Outside business hours ({hour}:00)"
-                        })
-                    else:
-                        compatible_count += 1
-                        
+                        mcp_result = self.get_timezone_info_mcp(timezone_name)
+                        if mcp_result:
+                            timezone_log.debug("🌍 MCP timezone info for %s: %s", timezone_name, mcp_result)
+                    local_times[timezone_name] = timezone_engine.local_time(timezone_name, proposed_epoch)
                 except Exception as e:
-                    print(f"Error checking timezone for {email}: {e}")
+                    timezone_log.warning("Error checking timezone %s: %s", timezone_name, e)
+                    local_times[timezone_name] = e
+            
+            for email, timezone_name in timezone_assignments.items():
+                local_time = local_times[timezone_name]
+                if isinstance(local_time, Exception):
                     timezone_conflicts.append({
                         "agent": email,
                         "timezone": timezone_name,
                         "local_time": "Unknown",
-                        "issue": f"Timezone error: {str(e)}"
+                        "issue": f"Timezone error: {str(local_time)}"
                     })
+                    continue
+                
+                # YOUR EXACT ORIGINAL LOGIC (unchanged)
+                hour = local_time.hour
+                if hour < BUSINESS_HOURS[0] or hour >= BUSINESS_HOURS[1]:
+                    timezone_conflicts.append({
+                        "agent": email,
+                        "timezone": timezone_name,
+                        "local_time": local_time.strftime("%I:%M %p"),
+                        "issue": f"Outside business hours ({hour}:00)"
+                    })
+                else:
+                    compatible_count += 1
             
             is_compatible = len(timezone_conflicts) == 0
             
             suggested_alternative = proposed_time
+            alternatives = []
             if not is_compatible:
-                suggested_dt = proposed_dt.replace(hour=16, minute=0)
-                suggested_alternative = suggested_dt.strftime('%Y-%m-%dT%H:%M:%S+05:30')
+                # Best-covered business hours within a week of the proposal, nearest first
+                weights = Counter(tz for tz in timezone_assignments.values() if not isinstance(local_times[tz], Exception))
+                day_start = iso_to_epoch(proposed_time[:10] + 'T00:00:00+05:30')
+                alternatives = [epoch_to_ist(start) for start in timezone_engine.best_start_times(
+                    weights, day_start, day_start + 7 * 86400, duration_minutes, proposed_epoch)]
+                if alternatives:
+                    suggested_alternative = alternatives[0]
             
             return {
                 "compatible": is_compatible,
                 "timezone_conflicts": timezone_conflicts,
                 "suggested_alternative": suggested_alternative,
+                "suggested_alternatives": alternatives,
                 "timezone_summary": f"{compatible_count} agents compatible, {len(timezone_conflicts)} agents have conflicts",
                 "recommendation": "Proceed with scheduling" if is_compatible else "Reschedule to suggested time",
                 "timezone_assignments": timezone_assignments,
-                "verification_method": "MCP-enhanced timezone calculation" if self.mcp_available else "Direct timezone calculation"
+                "verification_method": "MCP-enhanced timezone engine" if self.mcp_available else "Timezone engine (offset tables)"
             }
             
         except Exception as e:
-            print(f"Timezone verification failed: {e}")
+            timezone_log.error("Timezone verification failed: %s", e)
             return {
                 "compatible": True,
                 "timezone_conflicts": [],
@@ -189,73 +2534,368 @@ class TimezoneVerificationAgent:
                 "verification_method": "Ultimate fallback"
             }
 
+# ADDED: Rule-based fast-path parser - common emails never need an LLM round-trip
+PARSE_CONFIDENCE_THRESHOLD = float(os.getenv("PARSE_CONFIDENCE_THRESHOLD", "0.8"))
+
+_WEEKDAY_RE = re.compile(
+    r'\b(mon(?:day)?|tue(?:s|sday)?|wed(?:nesday)?|thu(?:r|rs|rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)\b'
+)
+_WEEKDAY_INDEX = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
+# Bare "sat" is also a verb ("we sat down"): it only counts next to a date word or followed by a time
+_SAT_BEFORE_RE = re.compile(
+    r'\b(?:on|this|next|by|until|till|before|after|every|coming|from|to|or|mon|tue|wed|thu|fri|sun)[\s,/-]*$'
+)
+_SAT_AFTER_RE = re.compile(
+    r'\s*(?:,\s*)?(?:\d|@|at\s+\d|morning|afternoon|evening|noon|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b)'
+    r'|\s*(?:/|-|or\b|and\b)\s*sun'
+)
+_MINUTES_RE = re.compile(r'\b(\d{1,3})\s*-?\s*(?:minutes?|mins?)\b')
+_HOURS_RE = re.compile(r'\b(\d{1,2}(?:\.\d+)?)\s*-?\s*(?:hours?|hrs?)\b')
+_HOUR_AND_HALF_RE = re.compile(r'\b(?:an?|one)\s+hour\s+and\s+a\s+half\b')
+_HALF_HOUR_RE = re.compile(r'\bhalf\s+(?:an\s+)?hour\b')
+_ONE_HOUR_RE = re.compile(r'\b(?:an?|one)\s+hour\b')
+_AMPM_TIME_RE = re.compile(r'\b(\d{1,2})(?::([0-5]\d))?\s*([ap])\.?\s?m\b\.?')
+_24H_TIME_RE = re.compile(r'\b([01]?\d|2[0-3]):([0-5]\d)\b')
+_BARE_AT_TIME_RE = re.compile(r'\bat\s+(\d{1,2})\b(?!\s*(?::|[ap]\.?\s?m|%|-|\)))')
+_NOON_RE = re.compile(r'\b(noon|midday)\b')
+_TODAY_RE = re.compile(r'\b(today|now)\b')
+_TOMORROW_RE = re.compile(r'\btomorrow\b')
+_DAY_AFTER_TOMORROW_RE = re.compile(r'\bday after tomorrow\b')
+_NEXT_WEEK_RE = re.compile(r'\bnext week\b')
+_IN_DAYS_RE = re.compile(r'\bin\s+(\d{1,2})\s+days?\b')
+# Bare "low"/"high" are too common ("low-key", "high-level"); only priority phrases count
+_LOW_URGENCY_RE = re.compile(
+    r"\b((?:not|isn't|isnt|aren't|never)\s+(?:that\s+|very\s+|too\s+)?urgent|no rush|low[ -]priority|whenever"
+    r"|(?:urgency|priority)\s*[:=-]?\s*low)\b"
+)
+_URGENT_RE = re.compile(r'\b(urgent|urgently|asap|immediately|emergency)\b')
+_HIGH_URGENCY_RE = re.compile(r'\b(high[ -]priority|important|critical|(?:urgency|priority)\s*[:=-]?\s*high)\b')
+# An urgency cue right after a negation in the same clause does not count ("nothing important", "no emergency")
+_NEGATION_RE = re.compile(r"\b(?:not|no|nothing|never|none|nor|without|hardly|isnt|arent|dont|doesnt)\b|\w+n['’]t\b")
+_CLAUSE_BREAK_RE = re.compile(r'[.;,!?:()\n]|\b(?:but|however|though|although)\b')
+NEGATION_WINDOW_WORDS = 3
+_VAGUE_RE = re.compile(r'\b(sometime|some time|flexible|whenever|either|or later|next month|later this)\b')
+# Abbreviations only count right after a clock time ("3 PM ET"); the names need "time" ("eastern time")
+_TIMEZONE_RE = re.compile(
+    r'\b\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?\s*)?(ist|est|edt|et|pst|pdt|pt|gmt|utc|bst|cet|cest)\b'
+    r'|\b(eastern|pacific)\s+time\b'
+)
+_TIMEZONE_NAMES = {
+    'ist': 'Asia/Kolkata',
+    'est': 'America/New_York', 'edt': 'America/New_York', 'et': 'America/New_York', 'eastern': 'America/New_York',
+    'pst': 'America/Los_Angeles', 'pdt': 'America/Los_Angeles', 'pt': 'America/Los_Angeles',
+    'pacific': 'America/Los_Angeles',
+    'gmt': 'UTC', 'utc': 'UTC', 'bst': 'Europe/London', 'cet': 'Europe/Berlin', 'cest': 'Europe/Berlin'
+}
+
+class RuleBasedMeetingParser:
+    """Compiled-regex parser for duration, urgency, day and time, with a confidence score"""
+    
+    def parse(self, email_content: str, base_date: datetime) -> tuple:
+        """Return (meeting_info, confidence); meeting_info has the same shape as the LLM parse"""
+        email_lower = email_content.lower()
+        confidence = 0.0
+        
+        duration, duration_found = self._duration(email_lower)
+        if duration_found:
+            confidence += 0.3
+        
+        urgency, mixed_urgency = self._urgency_cues(email_lower)
+        confidence += 0.05
+        
+        target_date, date_found, date_candidates = self._date(email_lower, base_date)
+        if date_found:
+            confidence += 0.35
+        
+        extracted_time, time_weight, time_candidates = self._time(email_lower)
+        confidence += time_weight
+        
+        # Ambiguity penalties: competing days/times or vague phrasing
+        if date_candidates > 1:
+            confidence -= 0.3
+        if time_candidates > 1:
+            confidence -= 0.2
+        if _VAGUE_RE.search(email_lower):
+            confidence -= 0.2
+        if mixed_urgency:
+            confidence -= 0.3
+        
+        if extracted_time:
+            target_datetime = target_date.replace(hour=extracted_time[0], minute=extracted_time[1],
+                                                  second=0, microsecond=0)
+        else:
+            # Default to 2 PM if no time specified
+            target_datetime = target_date.replace(hour=14, minute=0, second=0, microsecond=0)
+        
+        timezone_match = _TIMEZONE_RE.search(email_lower)
+        if timezone_match and extracted_time:
+            source_tz = pytz.timezone(_TIMEZONE_NAMES[timezone_match.group(1) or timezone_match.group(2)])
+            target_datetime = source_tz.localize(target_datetime).astimezone(IST_TZ).replace(tzinfo=None)
+        
+        return {
+            "duration_minutes": duration,
+            "urgency": urgency,
+            "preferred_datetime": target_datetime.strftime('%Y-%m-%dT%H:%M:%S+05:30')
+        }, round(max(0.0, min(1.0, confidence)), 2)
+    
+    def urgency(self, email_content: str) -> str:
+        """Urgency alone, cheap enough to order requests before the full parse runs"""
+        return self._urgency(email_content.lower())
+    
+    @staticmethod
+    def _duration(email_lower: str) -> tuple:
+        if _HOUR_AND_HALF_RE.search(email_lower):
+            return 90, True
+        match = _MINUTES_RE.search(email_lower)
+        if match and 5 <= int(match.group(1)) <= 480:
+            return int(match.group(1)), True
+        match = _HOURS_RE.search(email_lower)
+        if match and 0 < float(match.group(1)) <= 8:
+            return int(float(match.group(1)) * 60), True
+        if _HALF_HOUR_RE.search(email_lower):
+            return 30, True
+        if _ONE_HOUR_RE.search(email_lower):
+            return 60, True
+        return 30, False
+    
+    @classmethod
+    def _urgency(cls, email_lower: str) -> str:
+        return cls._urgency_cues(email_lower)[0]
+    
+    @staticmethod
+    def _negated(email_lower: str, start: int) -> bool:
+        """A negation among the few words before position start, within the same clause"""
+        prefix = email_lower[max(0, start - 60):start]
+        breaks = list(_CLAUSE_BREAK_RE.finditer(prefix))
+        if breaks:
+            prefix = prefix[breaks[-1].end():]
+        return bool(_NEGATION_RE.search(' '.join(prefix.split()[-NEGATION_WINDOW_WORDS:])))
+    
+    @classmethod
+    def _urgency_cues(cls, email_lower: str) -> tuple:
+        """(urgency, mixed); mixed when an urgent/high cue meets a low or negated one ("isn't urgent but important")"""
+        low_spans = []
+        for match in _LOW_URGENCY_RE.finditer(email_lower):
+            if not cls._negated(email_lower, match.start()):
+                low_spans.append(match.span())
+        found, negated = set(), False
+        for level, pattern in (("urgent", _URGENT_RE), ("high", _HIGH_URGENCY_RE)):
+            for match in pattern.finditer(email_lower):
+                if any(start <= match.start() < end for start, end in low_spans):
+                    continue  # the "urgent" of "not urgent"
+                if cls._negated(email_lower, match.start()):
+                    negated = True
+                else:
+                    found.add(level)
+        mixed = bool(found) and (negated or bool(low_spans))
+        if low_spans:
+            return "low", mixed
+        if "urgent" in found:
+            return "urgent", mixed
+        if "high" in found:
+            return "high", mixed
+        return "medium", mixed
+    
+    @staticmethod
+    def _weekdays(email_lower: str) -> set:
+        weekdays = set()
+        for match in _WEEKDAY_RE.finditer(email_lower):
+            if match.group(1) == 'sat' and not (_SAT_BEFORE_RE.search(email_lower, 0, match.start())
+                                                or _SAT_AFTER_RE.match(email_lower, match.end())):
+                continue
+            weekdays.add(_WEEKDAY_INDEX[match.group(1)[:3]])
+        return weekdays
+    
+    @staticmethod
+    def _date(email_lower: str, base_date: datetime) -> tuple:
+        """YOUR EXACT relative-date rules; returns (date, explicitly_found, number_of_candidates)"""
+        current_weekday = base_date.weekday()  # Monday=0, Sunday=6
+        weekdays = RuleBasedMeetingParser._weekdays(email_lower)
+        target_day = min(weekdays) if weekdays else None
+        relative_hits = sum(bool(p.search(email_lower)) for p in (_TODAY_RE, _TOMORROW_RE, _IN_DAYS_RE))
+        candidates = len(weekdays) + relative_hits
+        
+        in_days = _IN_DAYS_RE.search(email_lower)
+        if _DAY_AFTER_TOMORROW_RE.search(email_lower):
+            return base_date + timedelta(days=2), True, 1
+        if in_days:
+            return base_date + timedelta(days=int(in_days.group(1))), True, candidates
+        if _TODAY_RE.search(email_lower):
+            return base_date + timedelta(days=1), True, candidates  # Tomorrow
+        if _TOMORROW_RE.search(email_lower):
+            return base_date + timedelta(days=1), True, candidates
+        if _NEXT_WEEK_RE.search(email_lower):
+            if target_day is not None:
+                # Next week's specific day
+                days_to_add = 7 + (target_day - current_weekday)
+                if days_to_add <= 7:  # If it would be this week, add another week
+                    days_to_add += 7
+                return base_date + timedelta(days=days_to_add), True, candidates
+            return base_date + timedelta(days=7), True, max(candidates, 1)  # Next week
+        if target_day is not None:
+            # Calculate next occurrence of the specified day
+            if current_weekday <= target_day:
+                days_to_add = target_day - current_weekday
+                if days_to_add == 0:  # Same day, go to next week
+                    days_to_add = 7
+            else:
+                days_to_add = 7 - (current_weekday - target_day)
+            return base_date + timedelta(days=days_to_add), True, candidates
+        
+        # Default to next Thursday
+        if current_weekday <= 3:  # Thursday or earlier
+            days_to_add = 3 - current_weekday
+            if days_to_add == 0:  # Today is Thursday
+                days_to_add = 7
+        else:
+            days_to_add = 7 - (current_weekday - 3)
+        return base_date + timedelta(days=days_to_add), False, 0
+    
+    @staticmethod
+    def _time(email_lower: str) -> tuple:
+        """Returns ((hour, minute) or None, confidence weight, number of distinct times)"""
+        times = []
+        for match in _AMPM_TIME_RE.finditer(email_lower):
+            hour = int(match.group(1))
+            minute = int(match.group(2) or 0)
+            if not 1 <= hour <= 12:
+                continue
+            # Convert to 24-hour format
+            if match.group(3) == 'p' and hour != 12:
+                hour += 12
+            elif match.group(3) == 'a' and hour == 12:
+                hour = 0
+            times.append((hour, minute))
+        for match in _24H_TIME_RE.finditer(email_lower):
+            if not _AMPM_TIME_RE.match(email_lower, match.start()):
+                times.append((int(match.group(1)), int(match.group(2))))
+        if _NOON_RE.search(email_lower):
+            times.append((12, 0))
+        
+        distinct = list(dict.fromkeys(times))
+        if distinct:
+            return distinct[0], 0.3, len(distinct)
+        
+        bare = _BARE_AT_TIME_RE.search(email_lower)
+        if bare and 1 <= int(bare.group(1)) <= 12:
+            hour = int(bare.group(1))
+            # "at 3" in a work email means the afternoon
+            return (hour + 12 if hour < 8 else hour, 0), 0.15, 1
+        return None, 0.0, 0
+
+rule_parser = RuleBasedMeetingParser()
+
 # EXACT SAME MeetingParserAgent with JSON TRUNCATION FIX
 class MeetingParserAgent:
     """EXACT COPY of your original with JSON truncation fix"""
     def __init__(self):
-        self.ai_client = OpenAI(api_key="NULL", base_url=AI_BASE_URL)
         # YOUR EXACT SYSTEM PROMPT
         self.system_prompt = """Parse meeting requests. Extract duration, urgency, datetime. Return JSON: {"duration_minutes":30,"urgency":"medium","preferred_datetime":"2025-07-03T14:00:00+05:30"}"""
 
-    def parse_request(self, email_content: str, request_datetime: str) -> Dict:
-        """EXACT SAME AI logic with JSON truncation fix"""
+    def _messages(self, email_content: str, request_datetime: str) -> List[Dict]:
         base_date = datetime.strptime(request_datetime, '%d-%m-%YT%H:%M:%S')
         user_prompt = f"Parse: {email_content}. Date: {base_date.strftime('%Y-%m-%d')}."
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _parse_result(self, result: str) -> Dict:
+        # ENHANCED DEBUGGING, JSON fixing lives in the shared extractor
+        llm_log.debug("🔍 AI Response Raw: '%s'", result)
+        llm_log.debug("🔍 AI Response Length: %d", len(result))
+        
+        try:
+            parsed = extract_json(result, '{')
+            llm_log.debug("✅ AI JSON Parse Success: %s", parsed)
+            return parsed
+        except json.JSONDecodeError as json_err:
+            llm_log.warning("❌ AI JSON Parse Failed even after cleaning: %s", json_err)
+            raise json_err
 
+    def parse_request(self, email_content: str, request_datetime: str) -> Dict:
+        """EXACT SAME AI logic with JSON truncation fix"""
         try:
             # YOUR EXACT AI CALL with increased tokens to prevent truncation
-            response = self.ai_client.chat.completions.create(
-                model=AI_MODEL,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            return chat_completion(
+                "parse_request",
+                self._messages(email_content, request_datetime),
                 temperature=0.1,
-                max_tokens=100  # INCREASED from 50 to prevent truncation
+                max_tokens=100,  # INCREASED from 50 to prevent truncation
+                parse=self._parse_result,
+                expect='{'
+            )
+        except Exception as e:
+            parse_log.warning("MeetingParserAgent failed: %s", e)
+            raise e
+
+    async def aparse_request(self, email_content: str, request_datetime: str) -> Dict:
+        """Async twin of parse_request"""
+        try:
+            return await achat_completion(
+                "parse_request",
+                self._messages(email_content, request_datetime),
+                temperature=0.1,
+                max_tokens=100,
+                parse=self._parse_result,
+                expect='{'
             )
-            
-            result = response.choices[0].message.content.strip()
-            
-            # ENHANCED DEBUGGING with JSON fixing
-            print(f"🔍 AI Response Raw: '{result}'")
-            print(f"🔍 AI Response Length: {len(result)}")
-            print(f"🔍 AI Response Type: {type(result)}")
-            
-            if result:
-                # FIX COMMON JSON TRUNCATION ISSUES
-                cleaned_result = result
-                
-                # If JSON is incomplete, try to fix it
-                if cleaned_result.count('{') > cleaned_result.count('}'):
-                    # Missing closing braces
-                    missing_braces = cleaned_result.count('{') - cleaned_result.count('}')
-                    cleaned_result += '}' * missing_braces
-                    print(f"🔧 Fixed truncated JSON: added {missing_braces} closing braces")
-                
-                # Remove any trailing incomplete lines
-                if not cleaned_result.endswith('}'):
-                    lines = cleaned_result.split('\n')
-                    for i in range(len(lines)-1, -1, -1):
-                        if lines[i].strip().endswith('}'):
-                            cleaned_result = '\n'.join(lines[:i+1])
-                            break
-                
-                print(f"🧹 Cleaned JSON: '{cleaned_result}'")
-                
-                try:
-                    parsed = json.loads(cleaned_result)
-                    print(f"✅ AI JSON Parse Success: {parsed}")
-                    return parsed
-                except json.JSONDecodeError as json_err:
-                    print(f"❌ AI JSON Parse Failed even after cleaning: {json_err}")
-                    print(f"❌ Final JSON attempt: '{cleaned_result}'")
-                    raise json_err
-            else:
-                raise ValueError("Empty response")
         except Exception as e:
-            print(f"MeetingParserAgent failed: {e}")
+            parse_log.warning("MeetingParserAgent failed: %s", e)
             raise e
 
+# ADDED: Prompt compaction - free windows instead of raw busy lists, short slot strings, a token budget per prompt
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "512"))  # max prompt tokens per agent prompt (0 = unlimited)
+IST_OFFSET_SECONDS = 19800  # IST has no DST
+
+def fit_prompt(build, count: int, name: str, minimum: int = 1, budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """build(n) renders a prompt with the first n items; the largest n within the budget wins"""
+    prompt = build(count)
+    if budget <= 0 or count <= minimum or prompt_tokenizer.count(prompt) <= budget:
+        return prompt
+    low, high = minimum, count - 1  # build(low) is kept even when it is over budget
+    while low < high:
+        middle = (low + high + 1) // 2
+        if prompt_tokenizer.count(build(middle)) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    metrics.inc('prompt_items_trimmed', count - low, labels={'prompt': name})
+    return build(low)
+
+def free_windows_by_day(busy_intervals: List[tuple], tz_name: str, start_epoch: int, end_epoch: int,
+                        min_seconds: int = 0) -> List[tuple]:
+    """Business hours minus merged busy time -> [(IST day offset from the search start, [(start, end)])]"""
+    free = subtract_intervals(timezone_engine.business_windows(tz_name, start_epoch, end_epoch),
+                              merge_intervals(busy_intervals))
+    first_day = (start_epoch + IST_OFFSET_SECONDS) // 86400
+    days = {}
+    for start, end in free:
+        while start < end:  # other timezones' hours can cross IST midnight
+            day = (start + IST_OFFSET_SECONDS) // 86400
+            piece_end = min(end, (day + 1) * 86400 - IST_OFFSET_SECONDS)
+            if piece_end - start >= min_seconds:
+                days.setdefault(day - first_day, []).append((start, piece_end))
+            start = piece_end
+    return sorted(days.items())
+
+def _ist_clock(epoch: int, end: bool = False) -> str:
+    clock = epoch_to_ist(epoch)[11:16]
+    return "24:00" if end and clock == "00:00" else clock
+
+def format_free_day(offset: int, windows: List[tuple]) -> str:
+    """'D2 Wed: 09:00-10:30 14:00-18:00'"""
+    weekday = datetime.fromtimestamp(windows[0][0], IST_TZ).strftime('%a')
+    return f"D{offset} {weekday}: " + " ".join(f"{_ist_clock(s)}-{_ist_clock(e, end=True)}" for s, e in windows)
+
+def compact_slot(slot: Dict) -> str:
+    """{"start","end","score"|"confidence"} -> '2025-07-17T10:00:00+05:30..10:30 0.9'"""
+    start, end = str(slot.get('start', '')), str(slot.get('end', ''))
+    if len(start) >= 16 and start[:11] == end[:11]:
+        end = end[11:16]
+    score = slot.get('score', slot.get('confidence'))
+    return f"{start}..{end}" + (f" {score}" if score is not None else "")
+
 # OPTIMIZED EmployeeAgent that preserves ALL your AI logic
 class OptimizedEmployeeAgent:
     """Same AI logic as your original, just with parallel execution capability"""
@@ -263,171 +2903,967 @@ class OptimizedEmployeeAgent:
     def __init__(self, email: str, token_info: Dict):
         self.email = email
         self.token_info = token_info
+        self._creds_lock = threading.Lock()
+        self._http_local = threading.local()
+        self.credentials = self._build_credentials(token_info)
         self.calendar_service = self._init_calendar()
-        self.ai_client = OpenAI(api_key="NULL", base_url=AI_BASE_URL)
         
-    def _init_calendar(self):
-        """EXACT SAME as your original"""
+    @staticmethod
+    def _build_credentials(token_info: Dict) -> Credentials:
+        """EXACT SAME credentials as your original, plus expiry when the token file has it"""
         creds = Credentials(
-            token=self.token_info["token"],
-            refresh_token=self.token_info["refresh_token"],
-            token_uri=self.token_info["token_uri"],
-            client_id=self.token_info["client_id"],
-            client_secret=self.token_info["client_secret"],
-            scopes=self.token_info["scopes"]
+            token=token_info["token"],
+            refresh_token=token_info["refresh_token"],
+            token_uri=token_info["token_uri"],
+            client_id=token_info["client_id"],
+            client_secret=token_info["client_secret"],
+            scopes=token_info["scopes"]
         )
-        return build("calendar", "v3", credentials=creds)
+        if token_info.get("expiry"):
+            try:
+                # google-auth compares against naive UTC datetimes
+                creds.expiry = datetime.fromisoformat(token_info["expiry"].rstrip('Z')).replace(tzinfo=None)
+            except ValueError:
+                pass
+        return creds
+    
+    def _init_calendar(self):
+        """Built once per agent; requests go through a per-thread authorized HTTP client"""
+        client_options = {"api_endpoint": CALENDAR_API_ENDPOINT} if CALENDAR_API_ENDPOINT else None
+        return build("calendar", "v3", credentials=self.credentials,
+                     requestBuilder=self._build_request, cache_discovery=False,
+                     client_options=client_options)
+    
+    def _build_request(self, http, *args, **kwargs):
+        """httplib2 is not thread-safe, so each worker thread keeps its own connection"""
+        authed_http = getattr(self._http_local, 'http', None)
+        if authed_http is None or authed_http.credentials is not self.credentials:
+            authed_http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http())
+            self._http_local.http = authed_http
+        return HttpRequest(authed_http, *args, **kwargs)
+    
+    def ensure_fresh_credentials(self):
+        """Refresh the OAuth access token in place instead of rebuilding the agent"""
+        if self.credentials.valid or not self.credentials.refresh_token:
+            return
+        with self._creds_lock:
+            if self.credentials.valid:
+                return
+            self.credentials.refresh(GoogleAuthRequest())
+            self.token_info["token"] = self.credentials.token
+            metrics.inc('credential_refreshes')
+            calendar_log.info("🔑 Refreshed OAuth token for %s", self.email)
+    
+    def refresh_if_expiring(self, margin: float) -> bool:
+        """Refresh ahead of expiry (from the background sweep) so requests never wait on OAuth"""
+        expiry = self.credentials.expiry
+        if expiry is None or not self.credentials.refresh_token:
+            return False
+        if (expiry - datetime.utcnow()).total_seconds() > margin:
+            return False
+        with self._creds_lock:
+            self.credentials.refresh(GoogleAuthRequest())
+            self.token_info["token"] = self.credentials.token
+        calendar_log.info("🔑 Refreshed OAuth token for %s ahead of expiry", self.email)
+        return True
+    
+    def after_fork(self):
+        """httplib2 connections opened before fork() would be shared with the parent"""
+        self._creds_lock = threading.Lock()
+        self._http_local = threading.local()
+    
+    def update_token_info(self, token_info: Dict):
+        """Hot-swap credentials after the token file changed on disk"""
+        with self._creds_lock:
+            self.token_info = token_info
+            self.credentials = self._build_credentials(token_info)
     
     def get_calendar_events(self, start_time: str, end_time: str) -> List[Dict]:
-        """EXACT SAME logic as your original"""
-        events_result = self.calendar_service.events().list(
-            calendarId='primary',
-            timeMin=start_time,
-            timeMax=end_time,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+        """EXACT SAME event shape as your original, now paginated and field-masked"""
+        if calendar_mirror.enabled:
+            events = calendar_mirror.events(self, start_time, end_time)
+            if events is not None:
+                return events
+        return list(calendar_gateway.iter_events(self, start_time, end_time))
+    
+    async def aget_calendar_events(self, start_time: str, end_time: str) -> List[Dict]:
+        """Async twin of get_calendar_events over aiohttp"""
+        if calendar_mirror.enabled:
+            events = await asyncio.to_thread(calendar_mirror.events, self, start_time, end_time)
+            if events is not None:
+                return events
+        return await async_calendar_gateway.list_events(self, start_time, end_time)
+    
+    def _slot_messages(self, start_date: str, end_date: str, duration_mins: int,
+                       busy_intervals: List[tuple]) -> List[Dict]:
+        # Every busy period is accounted for: the model sees the free business-hour windows that fit the meeting
+        start_epoch = iso_to_epoch(start_date)
+        days = free_windows_by_day(busy_intervals, timezone_for(self.email), start_epoch, iso_to_epoch(end_date),
+                                   min_seconds=duration_mins * 60)
+        lines = [format_free_day(offset, windows) for offset, windows in days]
+        example_start = days[0][1][0][0] if days else start_epoch
         
-        events = events_result.get('items', [])
-        processed_events = []
+        def build(count: int) -> str:
+            return f"""Find {duration_mins}min slots between {start_date} and {end_date}.
+Free windows, IST (D0 = {start_date[:10]}); all other times are busy:
+{chr(10).join(lines[:count]) or "none"}
+Return JSON: [{{"start":"{epoch_to_ist(example_start)}","end":"{epoch_to_ist(example_start + duration_mins * 60)}","score":0.9}}]"""
         
-        for event in events:
-            attendees = []
-            if 'attendees' in event:
-                attendees = [a['email'] for a in event['attendees']]
-            else:
-                attendees = ["SELF"]
-                
-            processed_events.append({
-                "StartTime": event['start'].get('dateTime', event['start'].get('date')),
-                "EndTime": event['end'].get('dateTime', event['end'].get('date')),
-                "NumAttendees": len(attendees),
-                "Attendees": attendees,
-                "Summary": event.get('summary', 'Busy')
+        return [{"role": "user", "content": fit_prompt(build, len(lines), "find_available_slots")}]
+    
+    @staticmethod
+    def _parse_slots(result: str) -> List[Dict]:
+        return extract_json(result, '[')
+    
+    def _fallback_slots(self, start_date: str, duration_mins: int, error: Exception) -> List[Dict]:
+        agent_log.warning("AI slot finding failed for %s: %s, using fallback", self.email, error)
+        metrics.record_fallback('find_available_slots')
+        record_phase_path("find_slots", "fallback")
+        # YOUR EXACT FALLBACK LOGIC
+        start_dt = datetime.fromisoformat(start_date.replace('+05:30', ''))
+        slots = []
+        for i in range(5):
+            slot_start = start_dt.replace(hour=10 + i, minute=0)
+            slot_end = slot_start + timedelta(minutes=duration_mins)
+            slots.append({
+                "start": slot_start.strftime('%Y-%m-%dT%H:%M:%S+05:30'),
+                "end": slot_end.strftime('%Y-%m-%dT%H:%M:%S+05:30'),
+                "score": 0.8 - i * 0.1
             })
-        
-        return processed_events
+        return slots
     
-    def find_available_slots(self, start_date: str, end_date: str, duration_mins: int) -> List[Dict]:
-        """EXACT SAME AI logic with increased tokens"""
-        calendar_events = self.get_calendar_events(start_date, end_date)
+    def find_available_slots(self, start_date: str, end_date: str, duration_mins: int,
+                             busy_intervals: Optional[List[tuple]] = None) -> List[Dict]:
+        """EXACT SAME AI logic with increased tokens; busy intervals may come from the boss's batched calendar read"""
+        if busy_intervals is None:
+            busy_intervals = self.get_busy_intervals(start_date, end_date)
         
         try:
-            # YOUR EXACT logic for busy times
-            busy_times = []
-            for event in calendar_events:
-                busy_times.append({
-                    "start": event["StartTime"],
-                    "end": event["EndTime"]
-                })
-            
-            # YOUR EXACT PROMPT
-            prompt = f"""Find {duration_mins}min slots between {start_date} and {end_date}. 
-Busy: {json.dumps(busy_times[:10])}
-Hours: 9AM-6PM weekdays.
-Return JSON: [{{"start":"2025-07-17T10:00:00+05:30","end":"2025-07-17T10:30:00+05:30","score":0.9}}]"""
-            
             # YOUR EXACT AI CALL with increased tokens
-            response = self.ai_client.chat.completions.create(
-                model=AI_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=500  # INCREASED from 300
+            return hedged(
+                "find_slots", "find_available_slots",
+                lambda: chat_completion(
+                    "find_available_slots",
+                    self._slot_messages(start_date, end_date, duration_mins, busy_intervals),
+                    temperature=0.1,
+                    max_tokens=500,  # INCREASED from 300
+                    parse=self._parse_slots,
+                    expect='['
+                ),
+                lambda: self._engine_slots(start_date, end_date, duration_mins, busy_intervals)
             )
-            
-            result = response.choices[0].message.content.strip()
-            if result:
-                # Clean up potential JSON issues
-                cleaned_result = result
-                if not cleaned_result.startswith('['):
-                    # Find the JSON array
-                    start_idx = cleaned_result.find('[')
-                    if start_idx != -1:
-                        cleaned_result = cleaned_result[start_idx:]
-                
-                return json.loads(cleaned_result)
-            else:
-                raise ValueError("Empty response")
         except Exception as e:
-            print(f"AI slot finding failed for {self.email}: {e}, using fallback")
-            # YOUR EXACT FALLBACK LOGIC
-            start_dt = datetime.fromisoformat(start_date.replace('+05:30', ''))
-            slots = []
-            for i in range(5):
-                slot_start = start_dt.replace(hour=10 + i, minute=0)
-                slot_end = slot_start + timedelta(minutes=duration_mins)
-                slots.append({
-                    "start": slot_start.strftime('%Y-%m-%dT%H:%M:%S+05:30'),
-                    "end": slot_end.strftime('%Y-%m-%dT%H:%M:%S+05:30'),
-                    "score": 0.8 - i * 0.1
-                })
-            return slots
+            return self._fallback_slots(start_date, duration_mins, e)
     
-    def negotiate_slot(self, proposed_slots: List[Dict], other_agents_proposals: List[Dict]) -> Dict:
-        """EXACT SAME AI negotiation logic with increased tokens"""
+    async def afind_available_slots(self, start_date: str, end_date: str, duration_mins: int,
+                                    busy_intervals: Optional[List[tuple]] = None) -> List[Dict]:
+        """Async twin of find_available_slots"""
+        if busy_intervals is None:
+            busy_intervals = await self.aget_busy_intervals(start_date, end_date)
+        
+        try:
+            return await ahedged(
+                "find_slots", "find_available_slots",
+                lambda: achat_completion(
+                    "find_available_slots",
+                    self._slot_messages(start_date, end_date, duration_mins, busy_intervals),
+                    temperature=0.1,
+                    max_tokens=500,
+                    parse=self._parse_slots,
+                    expect='['
+                ),
+                lambda: self._engine_slots(start_date, end_date, duration_mins, busy_intervals)
+            )
+        except Exception as e:
+            return self._fallback_slots(start_date, duration_mins, e)
+    
+    def _engine_slots(self, start_date: str, end_date: str, duration_mins: int,
+                      busy_intervals: List[tuple]) -> List[Dict]:
+        """Deterministic twin of the LLM slot finder: this agent's own free slots from the slot engine"""
+        return slot_engine.find_common_slots({self.email: busy_intervals}, {self.email: timezone_for(self.email)},
+                                             start_date, end_date, duration_mins)
+    
+    def get_busy_intervals(self, start_date: str, end_date: str) -> List[tuple]:
+        """Busy periods from the calendar as merged epoch intervals for the slot engine"""
+        return events_to_busy(self.get_calendar_events(start_date, end_date))
+    
+    async def aget_busy_intervals(self, start_date: str, end_date: str) -> List[tuple]:
+        return events_to_busy(await self.aget_calendar_events(start_date, end_date))
+    
+    def _rank_messages(self, candidate_slots: List[Dict], duration_mins: int) -> List[Dict]:
+        listing = "\n".join(f"{i}: {slot['start']}" for i, slot in enumerate(candidate_slots))
+        prompt = f"""Agent {self.email} ranking {duration_mins}min meeting slots.
+All slots are free for everyone. Prefer earlier days and mid-day times.
+{listing}
+Return JSON: [{{"index":0,"score":0.9}}]"""
+        return [{"role": "user", "content": prompt}]
+    
+    @staticmethod
+    def _apply_ranking(result: str, candidate_slots: List[Dict]) -> List[Dict]:
+        rankings = extract_json(result, '[')
+        
+        ranked = []
+        seen = set()
+        for item in rankings:
+            index = int(item.get("index", -1))
+            if 0 <= index < len(candidate_slots) and index not in seen:
+                seen.add(index)
+                ranked.append({**candidate_slots[index], "score": float(item.get("score", candidate_slots[index]["score"]))})
+        # Keep any slots the model skipped, in engine order
+        ranked.extend(slot for i, slot in enumerate(candidate_slots) if i not in seen)
+        return ranked
+    
+    def rank_slots(self, candidate_slots: List[Dict], duration_mins: int) -> List[Dict]:
+        """Hybrid mode: the LLM only re-ranks slots that are already known to be free"""
+        if not candidate_slots:
+            return []
         try:
-            # YOUR EXACT PROMPT
-            prompt = f"""Agent {self.email} negotiation.
-My slots: {json.dumps(proposed_slots[:3])}
-Others: {json.dumps(other_agents_proposals[:2])}
+            return hedged("find_slots", "rank_slots",
+                          lambda: chat_completion("rank_slots", self._rank_messages(candidate_slots, duration_mins),
+                                                  temperature=0.1, max_tokens=150,
+                                                  parse=lambda result: self._apply_ranking(result, candidate_slots),
+                                                  expect='['),
+                          lambda: candidate_slots)  # engine order
+        except Exception as e:
+            agent_log.warning("AI slot ranking failed for %s: %s, keeping engine order", self.email, e)
+            metrics.record_fallback('rank_slots')
+            record_phase_path("find_slots", "fallback")
+            return candidate_slots
+    
+    async def arank_slots(self, candidate_slots: List[Dict], duration_mins: int) -> List[Dict]:
+        """Async twin of rank_slots"""
+        if not candidate_slots:
+            return []
+        try:
+            return await ahedged("find_slots", "rank_slots",
+                                 lambda: achat_completion("rank_slots", self._rank_messages(candidate_slots, duration_mins),
+                                                          temperature=0.1, max_tokens=150,
+                                                          parse=lambda result: self._apply_ranking(result, candidate_slots),
+                                                          expect='['),
+                                 lambda: candidate_slots)
+        except Exception as e:
+            agent_log.warning("AI slot ranking failed for %s: %s, keeping engine order", self.email, e)
+            metrics.record_fallback('rank_slots')
+            record_phase_path("find_slots", "fallback")
+            return candidate_slots
+    
+    def _negotiation_messages(self, proposed_slots: List[Dict], other_agents_proposals: List[Dict]) -> List[Dict]:
+        mine = "; ".join(compact_slot(slot) for slot in proposed_slots[:3])
+        others = ["; ".join(compact_slot(slot) for slot in slots) or "none" for slots in other_agents_proposals[:2]]
+        
+        def build(count: int) -> str:
+            return f"""Agent {self.email} negotiation. Slots are start..end score.
+My slots: {mine}
+Others: {" | ".join(others[:count])}
 Pick best common slot.
 Return: {{"start":"...","end":"...","confidence":0.9}}"""
-            
+        
+        return [{"role": "user", "content": fit_prompt(build, len(others), "negotiate_slot", minimum=0)}]
+    
+    @staticmethod
+    def _parse_negotiation(result: str) -> Dict:
+        return extract_json(result, '{')
+    
+    def _fallback_negotiation(self, proposed_slots: List[Dict], error: Exception) -> Dict:
+        agent_log.warning("AI negotiation failed for %s: %s, using fallback", self.email, error)
+        metrics.record_fallback('negotiate_slot')
+        record_phase_path("negotiate", "fallback")
+        return self._deterministic_negotiation(proposed_slots)
+    
+    @staticmethod
+    def _deterministic_negotiation(proposed_slots: List[Dict]) -> Dict:
+        # YOUR EXACT FALLBACK LOGIC
+        if proposed_slots:
+            return {
+                "start": proposed_slots[0]["start"],
+                "end": proposed_slots[0]["end"],
+                "confidence": 0.7
+            }
+        else:
+            return {
+                "start": "2025-07-17T14:00:00+05:30",
+                "end": "2025-07-17T14:30:00+05:30",
+                "confidence": 0.5
+            }
+    
+    def negotiate_slot(self, proposed_slots: List[Dict], other_agents_proposals: List[Dict]) -> Dict:
+        """EXACT SAME AI negotiation logic with increased tokens"""
+        try:
             # YOUR EXACT AI CALL with increased tokens
-            response = self.ai_client.chat.completions.create(
-                model=AI_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2,
-                max_tokens=200  # INCREASED from 150
+            return hedged(
+                "negotiate", "negotiate_slot",
+                lambda: chat_completion(
+                    "negotiate_slot",
+                    self._negotiation_messages(proposed_slots, other_agents_proposals),
+                    temperature=0.2,
+                    max_tokens=200,  # INCREASED from 150
+                    parse=self._parse_negotiation,
+                    expect='{'
+                ),
+                lambda: self._deterministic_negotiation(proposed_slots)
+            )
+        except Exception as e:
+            return self._fallback_negotiation(proposed_slots, e)
+    
+    async def anegotiate_slot(self, proposed_slots: List[Dict], other_agents_proposals: List[Dict]) -> Dict:
+        """Async twin of negotiate_slot"""
+        try:
+            return await ahedged(
+                "negotiate", "negotiate_slot",
+                lambda: achat_completion(
+                    "negotiate_slot",
+                    self._negotiation_messages(proposed_slots, other_agents_proposals),
+                    temperature=0.2,
+                    max_tokens=200,
+                    parse=self._parse_negotiation,
+                    expect='{'
+                ),
+                lambda: self._deterministic_negotiation(proposed_slots)
             )
-            
-            result = response.choices[0].message.content.strip()
-            if result:
-                # Fix potential JSON truncation
-                cleaned_result = result
-                if cleaned_result.count('{') > cleaned_result.count('}'):
-                    missing_braces = cleaned_result.count('{') - cleaned_result.count('}')
-                    cleaned_result += '}' * missing_braces
-                
-                return json.loads(cleaned_result)
-            else:
-                raise ValueError("Empty response")
         except Exception as e:
-            print(f"AI negotiation failed for {self.email}: {e}, using fallback")
-            # YOUR EXACT FALLBACK LOGIC
-            if proposed_slots:
-                return {
-                    "start": proposed_slots[0]["start"],
-                    "end": proposed_slots[0]["end"],
-                    "confidence": 0.7
-                }
+            return self._fallback_negotiation(proposed_slots, e)
+
+# ADDED: Calendar access layer - field-masked, batched event listing
+
+class CalendarGateway:
+    """Fetches only the fields the pipeline uses and follows nextPageToken as a stream"""
+    
+    EVENT_FIELDS = "nextPageToken,items(start,end,summary,attendees(email))"
+    BATCH_LIMIT = 50  # Google batch endpoint limit
+    
+    @staticmethod
+    def process_event(event: Dict) -> Dict:
+        """EXACT SAME event shape as your original get_calendar_events"""
+        if 'attendees' in event:
+            attendees = [a['email'] for a in event['attendees']]
+        else:
+            attendees = ["SELF"]
+        return {
+            "StartTime": event['start'].get('dateTime', event['start'].get('date')),
+            "EndTime": event['end'].get('dateTime', event['end'].get('date')),
+            "NumAttendees": len(attendees),
+            "Attendees": attendees,
+            "Summary": event.get('summary', 'Busy')
+        }
+    
+    def _events_request(self, agent, time_min: str, time_max: str, page_token: Optional[str] = None):
+        return agent.calendar_service.events().list(
+            calendarId='primary',
+            timeMin=time_min,
+            timeMax=time_max,
+            singleEvents=True,
+            orderBy='startTime',
+            fields=self.EVENT_FIELDS,
+            pageToken=page_token
+        )
+    
+    def iter_events(self, agent, time_min: str, time_max: str, page_token: Optional[str] = None):
+        """Yield processed events page by page until nextPageToken runs out"""
+        agent.ensure_fresh_credentials()
+        while True:
+            page = self._events_request(agent, time_min, time_max, page_token).execute()
+            trace_count("calendar.calls")
+            for event in page.get('items', []):
+                yield self.process_event(event)
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return
+    
+    def _execute_batch(self, requests: Dict[str, Any]) -> Dict[str, Any]:
+        """Run {key: HttpRequest} through the batch endpoint; values are responses or exceptions"""
+        results = {}
+        
+        def collect(request_id, response, exception):
+            results[request_id] = exception if exception is not None else response
+        
+        keys = list(requests)
+        for offset in range(0, len(keys), self.BATCH_LIMIT):
+            chunk = keys[offset:offset + self.BATCH_LIMIT]
+            batch = BatchHttpRequest(callback=collect, batch_uri=CALENDAR_BATCH_URI)
+            for key in chunk:
+                batch.add(requests[key], request_id=key)
+            batch.execute()
+            trace_count("calendar.calls")
+            trace_count("calendar.batch_parts", len(chunk))
+        return results
+    
+    def fetch_events(self, agents: Dict[str, Any], time_min: str, time_max: str) -> Dict[str, List[Dict]]:
+        """First page for every agent in one batch, remaining pages streamed per agent"""
+        if not agents:
+            return {}
+        if len(agents) == 1:
+            email, agent = next(iter(agents.items()))
+            return {email: list(self.iter_events(agent, time_min, time_max))}
+        
+        for agent in agents.values():
+            agent.ensure_fresh_credentials()
+        pages = self._execute_batch({
+            email: self._events_request(agent, time_min, time_max) for email, agent in agents.items()
+        })
+        
+        events_by_email = {}
+        for email, agent in agents.items():
+            page = pages.get(email)
+            if isinstance(page, Exception) or page is None:
+                calendar_log.warning("Batched event fetch failed for %s: %s, fetching directly", email, page)
+                events_by_email[email] = list(self.iter_events(agent, time_min, time_max))
+                continue
+            events = [self.process_event(event) for event in page.get('items', [])]
+            if page.get('nextPageToken'):
+                events.extend(self.iter_events(agent, time_min, time_max, page['nextPageToken']))
+            events_by_email[email] = events
+        return events_by_email
+
+calendar_gateway = CalendarGateway()
+
+# ADDED: aiohttp calendar access for the asyncio pipeline
+ASYNC_CALENDAR_MAX_CONNECTIONS = int(os.getenv("ASYNC_CALENDAR_MAX_CONNECTIONS", "100"))
+
+class AsyncCalendarGateway:
+    """Same field-masked, paginated events listing as CalendarGateway, over a shared aiohttp session"""
+    
+    def __init__(self):
+        self.base_url = (CALENDAR_API_ENDPOINT or "https://www.googleapis.com/calendar/v3/").rstrip('/') + '/'
+        self._sessions = weakref.WeakKeyDictionary()  # event loop -> ClientSession
+    
+    def _session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=ASYNC_CALENDAR_MAX_CONNECTIONS),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+            self._sessions[loop] = session
+        return session
+    
+    def after_fork(self):
+        self._sessions = weakref.WeakKeyDictionary()
+    
+    async def list_events(self, agent, time_min: str, time_max: str) -> List[Dict]:
+        if not agent.credentials.valid:
+            await asyncio.to_thread(agent.ensure_fresh_credentials)
+        params = {
+            "timeMin": time_min,
+            "timeMax": time_max,
+            "singleEvents": "true",
+            "orderBy": "startTime",
+            "fields": CalendarGateway.EVENT_FIELDS
+        }
+        events = []
+        while True:
+            async with self._session().get(
+                f"{self.base_url}calendars/primary/events",
+                params=params,
+                headers={"Authorization": f"Bearer {agent.credentials.token}"}
+            ) as response:
+                response.raise_for_status()
+                page = await response.json()
+            trace_count("calendar.calls")
+            events.extend(CalendarGateway.process_event(event) for event in page.get('items', []))
+            if not page.get('nextPageToken'):
+                return events
+            params["pageToken"] = page['nextPageToken']
+    
+    async def fetch_events(self, agents: Dict[str, Any], time_min: str, time_max: str) -> Dict[str, List[Dict]]:
+        emails = list(agents)
+        pages = await asyncio.gather(*(self.list_events(agents[e], time_min, time_max) for e in emails))
+        return dict(zip(emails, pages))
+    
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None:
+            await session.close()
+
+async_calendar_gateway = AsyncCalendarGateway()
+
+# ADDED: Calendar windows shared across requests and worker processes through SQLite
+CALENDAR_SHARED_TTL = float(os.getenv("CALENDAR_SHARED_TTL", "0"))  # seconds a fetched window is reused (0 = off)
+
+class SharedCalendarCache:
+    """Recently fetched event windows in the shared SQLite file, readable by every worker"""
+    
+    def __init__(self, path: Optional[str] = SHARED_CACHE_PATH, ttl: float = CALENDAR_SHARED_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = None
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.ttl > 0
+    
+    def _disk(self) -> sqlite3.Connection:
+        """Lazily opened connection (caller holds the lock)"""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS calendar_windows "
+                "(email TEXT, window_start INTEGER, window_end INTEGER, events TEXT, fetched_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS calendar_windows_email ON calendar_windows (email)")
+            self._db.commit()
+        return self._db
+    
+    def lookup(self, email: str, query_start: int, query_end: int) -> Optional[tuple]:
+        """(window_start, window_end, events) of the freshest window covering the query, else None"""
+        with self._lock:
+            row = self._disk().execute(
+                "SELECT window_start, window_end, events FROM calendar_windows "
+                "WHERE email = ? AND window_start <= ? AND window_end >= ? AND fetched_at > ? "
+                "ORDER BY fetched_at DESC LIMIT 1",
+                (email, query_start, query_end, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+    
+    def store(self, email: str, window_start: int, window_end: int, events: List[Dict]):
+        now = time.time()
+        with self._lock:
+            db = self._disk()
+            db.execute("DELETE FROM calendar_windows WHERE fetched_at <= ?", (now - self.ttl,))
+            db.execute("INSERT INTO calendar_windows VALUES (?, ?, ?, ?, ?)",
+                       (email, window_start, window_end, json.dumps(events), now))
+            db.commit()
+    
+    def after_fork(self):
+        self._lock = threading.Lock()
+        self._db = None
+
+shared_calendar_cache = SharedCalendarCache()
+
+# ADDED: Persistent calendar mirror - full sync once per employee, then syncToken increments in the background
+CALENDAR_MIRROR_PATH = os.getenv("CALENDAR_MIRROR_PATH")  # e.g. cache/calendar_mirror.sqlite3 (unset = off)
+CALENDAR_MIRROR_SYNC_INTERVAL = float(os.getenv("CALENDAR_MIRROR_SYNC_INTERVAL", "30"))  # background sync period
+CALENDAR_MIRROR_MAX_STALENESS = float(os.getenv("CALENDAR_MIRROR_MAX_STALENESS", "300"))  # older -> sync before serving
+_calendar_refresh = contextvars.ContextVar("calendar_refresh", default=None)  # emails already re-synced this request
+
+class CalendarMirror:
+    """Local SQLite copy of each employee's primary calendar, answering window queries without the API.
+    
+    An employee is mirrored from their first lookup on: that lookup still goes to the API while the
+    background worker runs the full sync, later ones are served locally. The worker keeps warm agents'
+    calendars current with syncToken increments; a request sees data at most max_staleness old, or
+    re-synced first when it asked for a refresh.
+    """
+    
+    SYNC_FIELDS = "nextPageToken,nextSyncToken,items(id,status,start,end,summary,attendees(email))"
+    
+    def __init__(self, path: Optional[str] = CALENDAR_MIRROR_PATH, interval: float = CALENDAR_MIRROR_SYNC_INTERVAL,
+                 max_staleness: float = CALENDAR_MIRROR_MAX_STALENESS):
+        self.path = path
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._db = None
+        self._sync_locks = {}
+        self._pending = {}  # email -> agent waiting for its full sync
+        self._wake = threading.Event()
+        self._thread = None
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+    
+    def _disk(self) -> sqlite3.Connection:
+        """Lazily opened connection (caller holds the lock)"""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS mirror_events (email TEXT, event_id TEXT, start_epoch INTEGER, "
+                "end_epoch INTEGER, event TEXT, PRIMARY KEY (email, event_id))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS mirror_events_start ON mirror_events (email, start_epoch)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS mirror_state (email TEXT PRIMARY KEY, sync_token TEXT, "
+                "synced_at REAL, max_length INTEGER)"
+            )
+            self._db.commit()
+        return self._db
+    
+    def _state(self, email: str) -> Optional[tuple]:
+        """(sync_token, synced_at, max_length) once the employee's full sync has finished"""
+        with self._lock:
+            return self._disk().execute(
+                "SELECT sync_token, synced_at, max_length FROM mirror_state WHERE email = ?", (email,)
+            ).fetchone()
+    
+    def events(self, agent, time_min: str, time_max: str) -> Optional[List[Dict]]:
+        """Mirrored events overlapping the window (get_calendar_events shape), or None to use the API"""
+        state = self._state(agent.email)
+        if state is None:
+            with self._lock:
+                self._pending.setdefault(agent.email, agent)
+            self._ensure_worker()
+            self._wake.set()
+            return None
+        
+        refreshed = _calendar_refresh.get()
+        forced = refreshed is not None and agent.email not in refreshed
+        if forced or time.time() - state[1] > self.max_staleness:
+            try:
+                self.sync(agent)
+            except Exception as e:
+                calendar_log.warning("Mirror sync failed for %s: %s, reading the API", agent.email, e)
+                return None
+            if refreshed is not None:
+                refreshed.add(agent.email)
+            state = self._state(agent.email)
+        
+        query_start, query_end = iso_to_epoch(time_min), iso_to_epoch(time_max)
+        with self._lock:
+            rows = self._disk().execute(
+                "SELECT event FROM mirror_events WHERE email = ? AND start_epoch >= ? AND start_epoch < ? "
+                "AND end_epoch > ? ORDER BY start_epoch",
+                (agent.email, query_start - (state[2] or 0), query_end, query_start)
+            ).fetchall()
+        metrics.inc('calendar_mirror_hits')
+        return [json.loads(row[0]) for row in rows]
+    
+    def _list_changes(self, agent, sync_token: Optional[str]) -> tuple:
+        """All pages of events.list (full listing without a token) -> (items, next sync token)"""
+        agent.ensure_fresh_credentials()
+        items, page_token = [], None
+        while True:
+            page = agent.calendar_service.events().list(
+                calendarId='primary',
+                singleEvents=True,
+                syncToken=sync_token,
+                pageToken=page_token,
+                fields=self.SYNC_FIELDS
+            ).execute()
+            trace_count("calendar.calls")
+            items.extend(page.get('items', []))
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return items, page.get('nextSyncToken')
+    
+    def sync(self, agent):
+        """Incremental sync from the stored token; a full one when there is none or Google expired it (410)"""
+        with self._lock:
+            sync_lock = self._sync_locks.setdefault(agent.email, threading.Lock())
+        with sync_lock:
+            state = self._state(agent.email)
+            sync_token = state[0] if state else None
+            try:
+                items, next_token = self._list_changes(agent, sync_token)
+            except HttpError as e:
+                if sync_token is None or e.resp.status != 410:
+                    raise
+                calendar_log.info("Sync token expired for %s, running a full sync", agent.email)
+                sync_token = None
+                items, next_token = self._list_changes(agent, None)
+            self._apply(agent.email, items, next_token, full=sync_token is None)
+            metrics.inc('calendar_mirror_syncs', labels={'kind': 'incremental' if sync_token else 'full'})
+    
+    def _apply(self, email: str, items: List[Dict], sync_token: Optional[str], full: bool):
+        rows, deleted = [], []
+        for item in items:
+            if item.get('status') == 'cancelled':
+                deleted.append((email, item['id']))
+                continue
+            event = CalendarGateway.process_event(item)
+            rows.append((email, item['id'], iso_to_epoch(event['StartTime']), iso_to_epoch(event['EndTime']),
+                         json.dumps(event, ensure_ascii=False)))
+        max_length = max((end - start for _, _, start, end, _ in rows), default=0)
+        
+        with self._lock:
+            db = self._disk()
+            with db:  # one transaction: readers never see a half-applied sync
+                if full:
+                    db.execute("DELETE FROM mirror_events WHERE email = ?", (email,))
+                db.executemany("DELETE FROM mirror_events WHERE email = ? AND event_id = ?", deleted)
+                db.executemany("INSERT OR REPLACE INTO mirror_events VALUES (?, ?, ?, ?, ?)", rows)
+                db.execute(
+                    "INSERT INTO mirror_state (email, sync_token, synced_at, max_length) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (email) DO UPDATE SET sync_token = excluded.sync_token, "
+                    "synced_at = excluded.synced_at, max_length = "
+                    + ("excluded.max_length" if full else "MAX(max_length, excluded.max_length)"),
+                    (email, sync_token, time.time(), max_length)
+                )
+    
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = Thread(target=self._run, name="calendar-mirror", daemon=True)
+                    self._thread.start()
+    
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                mirrored = dict(self._disk().execute("SELECT email, synced_at FROM mirror_state").fetchall())
+            
+            agents = dict(pending)
+            for email, agent in agent_registry.warm_agents().items():
+                # Workers share the file: skip calendars another process synced moments ago
+                if email in mirrored and time.time() - mirrored[email] >= self.interval / 2:
+                    agents.setdefault(email, agent)
+            for email, agent in agents.items():
+                try:
+                    self.sync(agent)
+                except Exception as e:
+                    calendar_log.warning("Background mirror sync failed for %s: %s", email, e)
+    
+    def after_fork(self):
+        self._lock = threading.Lock()
+        self._db = None
+        self._sync_locks = {}
+        self._pending = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+calendar_mirror = CalendarMirror()
+
+# ADDED: Request-scoped event store - each participant's window is fetched once per request
+_calendar_cache_counts = contextvars.ContextVar("calendar_cache_counts", default=None)  # this request's hits/misses
+
+class RequestEventStore:
+    """Memoizes calendar fetches for one request and serves sub-ranges from an in-memory interval index"""
+    
+    def __init__(self, agents: Dict[str, Any]):
+        self.agents = agents
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.mirror_hits = 0
+        self._lock = threading.Lock()
+        # email -> list of (window_start, window_end, events, event_starts, max_event_length)
+        self._windows: Dict[str, List[tuple]] = {}
+    
+    def _store(self, email: str, time_min: str, time_max: str, events: List[Dict]):
+        window_start, window_end = iso_to_epoch(time_min), iso_to_epoch(time_max)
+        self._index(email, window_start, window_end, events)
+        if shared_calendar_cache.enabled:
+            try:
+                shared_calendar_cache.store(email, window_start, window_end, events)
+            except sqlite3.Error as e:
+                calendar_log.warning("Shared calendar cache write failed: %s", e)
+    
+    def _index(self, email: str, window_start: int, window_end: int, events: List[Dict]):
+        spans = []
+        for event in events:
+            start, end = iso_to_epoch(event["StartTime"]), iso_to_epoch(event["EndTime"])
+            spans.append((start, end, event))
+        spans.sort(key=lambda span: span[0])
+        max_length = max((end - start for start, end, _ in spans), default=0)
+        with self._lock:
+            self._windows.setdefault(email, []).append(
+                (window_start, window_end, spans, [span[0] for span in spans], max_length)
+            )
+    
+    def _lookup(self, email: str, query_start: int, query_end: int) -> Optional[List[Dict]]:
+        """Events overlapping [query_start, query_end) if a cached window covers it, else None"""
+        with self._lock:
+            windows = list(self._windows.get(email, []))
+        for window_start, window_end, spans, starts, max_length in windows:
+            if window_start <= query_start and query_end <= window_end:
+                lo = bisect.bisect_left(starts, query_start - max_length)
+                hi = bisect.bisect_left(starts, query_end)
+                return [event for start, end, event in spans[lo:hi] if end > query_start]
+        return None
+    
+    def _count(self, hits: int = 0, misses: int = 0, shared_hits: int = 0, mirror_hits: int = 0):
+        """Store totals, plus the current request's own counts when a batch shares this store"""
+        request_counts = _calendar_cache_counts.get()
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.shared_hits += shared_hits
+            self.mirror_hits += mirror_hits
+            if request_counts is not None:
+                request_counts.update(hits=hits, misses=misses, shared_hits=shared_hits, mirror_hits=mirror_hits)
+    
+    def _lookup_shared(self, email: str, query_start: int, query_end: int) -> Optional[List[Dict]]:
+        """Fall back to a window another request (or worker) fetched recently"""
+        if not shared_calendar_cache.enabled:
+            return None
+        try:
+            window = shared_calendar_cache.lookup(email, query_start, query_end)
+        except sqlite3.Error as e:
+            calendar_log.warning("Shared calendar cache lookup failed: %s", e)
+            return None
+        if window is None:
+            return None
+        self._index(email, *window)
+        return self._lookup(email, query_start, query_end)
+    
+    def _split_cached(self, participants: List[str], time_min: str, time_max: str) -> tuple:
+        """(cached results, agents that still need a fetch) for the requested range"""
+        query_start, query_end = iso_to_epoch(time_min), iso_to_epoch(time_max)
+        results, missing = {}, {}
+        shared_hits = 0
+        for email in dict.fromkeys(participants):
+            if email not in self.agents:
+                continue
+            cached = self._lookup(email, query_start, query_end)
+            if cached is None:
+                cached = self._lookup_shared(email, query_start, query_end)
+                shared_hits += cached is not None
+            if cached is None:
+                agent = self.agents.get(email)  # built here on first use (batch prefetch runs before prepare)
+                if agent is not None:
+                    missing[email] = agent
             else:
-                return {
-                    "start": "2025-07-17T14:00:00+05:30",
-                    "end": "2025-07-17T14:30:00+05:30",
-                    "confidence": 0.5
-                }
+                results[email] = cached
+        self._count(hits=len(results), misses=len(missing), shared_hits=shared_hits)
+        return results, missing
+    
+    def _from_mirror(self, missing: Dict[str, Any], time_min: str, time_max: str) -> Dict[str, List[Dict]]:
+        """Serve what the calendar mirror has; found participants are removed from missing"""
+        found = {}
+        if calendar_mirror.enabled:
+            for email, agent in list(missing.items()):
+                try:
+                    events = calendar_mirror.events(agent, time_min, time_max)
+                except sqlite3.Error as e:
+                    calendar_log.warning("Calendar mirror read failed: %s", e)
+                    break
+                if events is not None:
+                    self._index(email, iso_to_epoch(time_min), iso_to_epoch(time_max), events)
+                    found[email] = events
+                    del missing[email]
+            self._count(mirror_hits=len(found))
+        return found
+    
+    def get_events_many(self, participants: List[str], time_min: str, time_max: str) -> Dict[str, List[Dict]]:
+        """Events for every participant with an agent; cached windows first, one batch for the rest"""
+        results, missing = self._split_cached(participants, time_min, time_max)
+        results.update(self._from_mirror(missing, time_min, time_max))
+        if missing:
+            fetched = calendar_gateway.fetch_events(missing, time_min, time_max)
+            for email, events in fetched.items():
+                self._store(email, time_min, time_max, events)
+                results[email] = events
+        return results
+    
+    async def aget_events_many(self, participants: List[str], time_min: str, time_max: str) -> Dict[str, List[Dict]]:
+        """Async twin of get_events_many; misses are fetched concurrently over aiohttp"""
+        results, missing = self._split_cached(participants, time_min, time_max)
+        if missing and calendar_mirror.enabled:
+            results.update(await asyncio.to_thread(self._from_mirror, missing, time_min, time_max))
+        if missing:
+            fetched = await async_calendar_gateway.fetch_events(missing, time_min, time_max)
+            for email, events in fetched.items():
+                self._store(email, time_min, time_max, events)
+                results[email] = events
+        return results
+    
+    def get_events(self, email: str, time_min: str, time_max: str) -> List[Dict]:
+        return self.get_events_many([email], time_min, time_max).get(email, [])
+    
+    def get_busy(self, participants: List[str], time_min: str, time_max: str) -> Dict[str, List[tuple]]:
+        """Merged busy intervals derived from the cached events"""
+        return {
+            email: events_to_busy(events)
+            for email, events in self.get_events_many(participants, time_min, time_max).items()
+        }
+    
+    async def aget_busy(self, participants: List[str], time_min: str, time_max: str) -> Dict[str, List[tuple]]:
+        return {
+            email: events_to_busy(events)
+            for email, events in (await self.aget_events_many(participants, time_min, time_max)).items()
+        }
+    
+    def stats(self) -> Dict:
+        """The current request's counts inside a pipeline (batch members share the store), else the totals"""
+        request_counts = _calendar_cache_counts.get()
+        with self._lock:
+            counts = dict(request_counts) if request_counts is not None else {
+                "hits": self.hits, "misses": self.misses, "shared_hits": self.shared_hits,
+                "mirror_hits": self.mirror_hits}
+        stats = {"hits": counts.get("hits", 0), "misses": counts.get("misses", 0)}
+        if shared_calendar_cache.enabled:
+            stats["shared_hits"] = counts.get("shared_hits", 0)
+        if calendar_mirror.enabled:
+            stats["mirror_hits"] = counts.get("mirror_hits", 0)
+        return stats
+    
+    def participants_cached(self) -> int:
+        with self._lock:
+            return len(self._windows)
+
+# ADDED: Consensus short-circuit - when the phase 1 proposals already agree, negotiation and the boss decision are skipped
+CONSENSUS_SHORT_CIRCUIT = os.getenv("CONSENSUS_SHORT_CIRCUIT", "1") == "1"
+CONSENSUS_MIN_SCORE = float(os.getenv("CONSENSUS_MIN_SCORE", "0.7"))  # mean participant score the common slot needs
+CONSENSUS_MARGIN = float(os.getenv("CONSENSUS_MARGIN", "0.05"))  # lead over the runner-up unless it is everyone's first pick
+
+def find_consensus(proposals_by_participant: Dict[str, List[Dict]], duration_mins: int,
+                   min_score: float = CONSENSUS_MIN_SCORE, margin: float = CONSENSUS_MARGIN) -> Optional[Dict]:
+    """Best slot inside a proposal of every participant, as a decision dict; None when none is clear enough"""
+    duration = duration_mins * 60
+    windows = []
+    for slots in proposals_by_participant.values():
+        parsed = []
+        for slot in slots:
+            try:
+                start, end = iso_to_epoch(slot['start']), iso_to_epoch(slot['end'])
+                score = float(slot.get('score', slot.get('confidence', 0)))
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+            if end - start >= duration:
+                parsed.append((start, end, score))
+        if not parsed:
+            return None  # someone has nothing usable to agree with
+        windows.append(parsed)
+    if not windows:
+        return None
+    
+    candidates = []
+    for start in sorted({start for parsed in windows for start, _, _ in parsed}):
+        scores = []
+        firsts = 0
+        for parsed in windows:
+            fitting = [score for s, e, score in parsed if s <= start and start + duration <= e]
+            if not fitting:
+                break
+            scores.append(max(fitting))
+            firsts += parsed[0][0] <= start and start + duration <= parsed[0][1]
+        else:
+            candidates.append((sum(scores) / len(scores), firsts, start))
+    if not candidates:
+        return None
+    
+    candidates.sort(key=lambda c: (-c[0], -c[1], c[2]))
+    score, firsts, start = candidates[0]
+    unanimous = firsts == len(windows)
+    if score < min_score or (not unanimous and len(candidates) > 1 and score - candidates[1][0] < margin):
+        return None
+    return {
+        "start": epoch_to_ist(start),
+        "end": epoch_to_ist(start + duration),
+        # Half the mean score, half the share of participants who ranked it first
+        "confidence": round(min(1.0, 0.5 * score + 0.5 * firsts / len(windows)), 2),
+        "consensus": {"short_circuit": True, "participants": len(windows), "score": round(score, 2),
+                      "unanimous": unanimous, "common_slots": len(candidates)}
+    }
 
 # OPTIMIZED BossAgent with ALL your AI logic preserved
 class OptimizedBossAgent:
     """Preserves ALL your AI logic, adds MCP support"""
     
     def __init__(self):
-        self.ai_client = OpenAI(api_key="NULL", base_url=AI_BASE_URL)
-        self.employee_agents = {}
-        for email, token_info in EMPLOYEE_TOKENS.items():
-            self.employee_agents[email] = OptimizedEmployeeAgent(email, token_info)
+        self.employee_agents = EmployeeAgentStore(token_source())
         self.ist_tz = pytz.timezone('Asia/Kolkata')
         self.parser_agent = MeetingParserAgent()  # YOUR EXACT PARSER
         self.timezone_agent = TimezoneVerificationAgent()  # MCP-ENHANCED TIMEZONE AGENT
     
-    def parse_meeting_request(self, email_content: str, request_datetime: str) -> Dict:
-        """ENHANCED with AI-powered date and time parsing"""
-        base_date = datetime.strptime(request_datetime, '%d-%m-%YT%H:%M:%S')
-        
-        try:
-            # ENHANCED AI SYSTEM PROMPT for better date/time parsing
-            enhanced_system_prompt = """You are an expert meeting scheduler. Parse meeting requests and extract:
+    def _parse_messages(self, email_content: str, base_date: datetime) -> List[Dict]:
+        # ENHANCED AI SYSTEM PROMPT for better date/time parsing
+        enhanced_system_prompt = """You are an expert meeting scheduler. Parse meeting requests and extract:
 1. Duration in minutes (default: 30)
 2. Urgency level (low/medium/high/urgent, default: medium)
 3. Preferred date and time in ISO format with IST timezone (+05:30)
@@ -444,161 +3880,92 @@ IMPORTANT RULES:
 
 Return JSON: {{"duration_minutes": 30, "urgency": "medium", "preferred_datetime": "2025-07-17T14:00:00+05:30"}}"""
 
-            user_prompt = f"""Parse this meeting request: "{email_content}"
+        user_prompt = f"""Parse this meeting request: "{email_content}"
 Current date: {base_date.strftime('%Y-%m-%d %A')}"""
-
-            # ENHANCED AI CALL with better prompt
-            response = self.ai_client.chat.completions.create(
-                model=AI_MODEL,
-                messages=[
-                    {"role": "system", "content": enhanced_system_prompt.format(base_date=base_date.strftime('%Y-%m-%d %A'))},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=200  # Increased for better parsing
-            )
-            
-            result = response.choices[0].message.content.strip()
-            print(f"🤖 AI Date/Time Parsing Result: {result}")
-            
-            if result:
-                # Clean up potential JSON issues
-                cleaned_result = result
-                if not cleaned_result.startswith('{'):
-                    start_idx = cleaned_result.find('{')
-                    if start_idx != -1:
-                        cleaned_result = cleaned_result[start_idx:]
-                
-                # Fix truncated JSON
-                if cleaned_result.count('{') > cleaned_result.count('}'):
-                    missing_braces = cleaned_result.count('{') - cleaned_result.count('}')
-                    cleaned_result += '}' * missing_braces
-                
-                parsed = json.loads(cleaned_result)
-                print(f"✅ AI Date/Time Parse Success: {parsed}")
-                return parsed
-            else:
-                raise ValueError("Empty AI response")
-                
-        except Exception as e:
-            print(f"AI parsing failed: {e}, using enhanced fallback")
-            # ENHANCED FALLBACK LOGIC with better date calculation
-            duration = 30
-            if "45 minutes" in email_content.lower() or "45 min" in email_content.lower():
-                duration = 45
-            elif "hour" in email_content.lower():
-                duration = 60
-            
-            urgency = "medium"
-            if "urgent" in email_content.lower():
-                urgency = "urgent"
-            elif "high" in email_content.lower():
-                urgency = "high"
-            elif "low" in email_content.lower():
-                urgency = "low"
-            
-            # ENHANCED DATE CALCULATION with AI-like logic
-            current_weekday = base_date.weekday()  # Monday=0, Sunday=6
-            email_lower = email_content.lower()
-            
-            # Enhanced day detection with more patterns
-            target_day = None
-            days_mapping = {
-                'monday': 0, 'mon': 0, 'monday': 0,
-                'tuesday': 1, 'tues': 1, 'tue': 1,
-                'wednesday': 2, 'wed': 2,
-                'thursday': 3, 'thurs': 3, 'thu': 3,
-                'friday': 4, 'fri': 4,
-                'saturday': 5, 'sat': 5,
-                'sunday': 6, 'sun': 6
-            }
-            
-            # Check for specific day mentions
-            for day_name, day_num in days_mapping.items():
-                if day_name in email_lower:
-                    target_day = day_num
-                    break
-            
-            # Check for relative time expressions
-            if "today" in email_lower or "now" in email_lower:
-                target_date = base_date + timedelta(days=1)  # Tomorrow
-            elif "tomorrow" in email_lower:
-                target_date = base_date + timedelta(days=1)
-            elif "next week" in email_lower:
-                if target_day is not None:
-                    # Next week's specific day
-                    days_to_add = 7 + (target_day - current_weekday)
-                    if days_to_add <= 7:  # If it would be this week, add another week
-                        days_to_add += 7
-                    target_date = base_date + timedelta(days=days_to_add)
-                else:
-                    target_date = base_date + timedelta(days=7)  # Next week Monday
-            elif target_day is not None:
-                # Calculate next occurrence of the specified day
-                if current_weekday <= target_day:
-                    days_to_add = target_day - current_weekday
-                    if days_to_add == 0:  # Same day, go to next week
-                        days_to_add = 7
-                else:
-                    days_to_add = 7 - (current_weekday - target_day)
-                target_date = base_date + timedelta(days=days_to_add)
-            else:
-                # Default to next Thursday
-                if current_weekday <= 3:  # Thursday or earlier
-                    days_to_add = 3 - current_weekday
-                    if days_to_add == 0:  # Today is Thursday
-                        days_to_add = 7
-                else:
-                    days_to_add = 7 - (current_weekday - 3)
-                target_date = base_date + timedelta(days=days_to_add)
-            
-            # ENHANCED TIME EXTRACTION with more patterns
-            import re
-            time_patterns = [
-                r'(\d{1,2}):?(\d{0,2})\s*(am|pm|a\.m|p\.m)',
-                r'(\d{1,2})\s*(am|pm|a\.m|p\.m)',
-                r'at\s+(\d{1,2}):?(\d{0,2})',
-                r'(\d{1,2}):(\d{2})\s*(am|pm|a\.m|p\.m)'
-            ]
-            
-            extracted_time = None
-            for pattern in time_patterns:
-                time_match = re.search(pattern, email_lower)
-                if time_match:
-                    groups = time_match.groups()
-                    if len(groups) >= 2:
-                        hour = int(groups[0])
-                        if len(groups) == 3:  # Has minutes
-                            minute = int(groups[1]) if groups[1] else 0
-                            am_pm = groups[2].lower()
-                        else:  # No minutes
-                            minute = 0
-                            am_pm = groups[1].lower()
-                        
-                        # Convert to 24-hour format
-                        if am_pm in ['pm', 'p.m'] and hour != 12:
-                            hour += 12
-                        elif am_pm in ['am', 'a.m'] and hour == 12:
-                            hour = 0
-                        
-                        extracted_time = (hour, minute)
-                        break
-            
-            if extracted_time:
-                target_datetime = target_date.replace(hour=extracted_time[0], minute=extracted_time[1])
-            else:
-                # Default to 2 PM if no time specified
-                target_datetime = target_date.replace(hour=14, minute=0)
-            
-            return {
-                "duration_minutes": duration,
-                "urgency": urgency,
-                "preferred_datetime": target_datetime.strftime('%Y-%m-%dT%H:%M:%S+05:30')
-            }
+        return [
+            {"role": "system", "content": enhanced_system_prompt.format(base_date=base_date.strftime('%Y-%m-%d %A'))},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    @staticmethod
+    def _parse_llm_result(result: str) -> Dict:
+        parse_log.debug("🤖 AI Date/Time Parsing Result: %s", result)
+        parsed = extract_json(result, '{')
+        parse_log.info("✅ AI Date/Time Parse Success: %s", parsed)
+        return parsed
+    
+    def _rule_fast_path(self, email_content: str, base_date: datetime) -> Optional[Dict]:
+        """Rule-based parse when it is confident enough, otherwise None (escalate to the LLM)"""
+        meeting_info, confidence = rule_parser.parse(email_content, base_date)
+        if confidence >= PARSE_CONFIDENCE_THRESHOLD:
+            metrics.inc('parse_rule_fast_path')
+            record_phase_path("parse", "rules")
+            trace_attributes(confidence=confidence)
+            parse_log.info("⚡ Rule parser confident (%s), skipping LLM: %s", confidence, meeting_info)
+            return meeting_info
+        metrics.inc('parse_llm_escalations')
+        trace_attributes(confidence=confidence)
+        parse_log.info("🤔 Rule parser confidence %s below %s, asking LLM", confidence, PARSE_CONFIDENCE_THRESHOLD)
+        return None
+    
+    def parse_meeting_request(self, email_content: str, request_datetime: str) -> Dict:
+        """ENHANCED with AI-powered date and time parsing, behind a rule-based fast path"""
+        base_date = datetime.strptime(request_datetime, '%d-%m-%YT%H:%M:%S')
+        meeting_info = self._rule_fast_path(email_content, base_date)
+        if meeting_info is not None:
+            return meeting_info
+        
+        try:
+            # ENHANCED AI CALL with better prompt
+            return hedged(
+                "parse", "parse_meeting_request",
+                lambda: chat_completion(
+                    "parse_meeting_request",
+                    self._parse_messages(email_content, base_date),
+                    temperature=0.1,
+                    max_tokens=200,  # Increased for better parsing
+                    parse=self._parse_llm_result,
+                    expect='{'
+                ),
+                lambda: rule_parser.parse(email_content, base_date)[0]
+            )
+        except Exception as e:
+            return self._fallback_parse(email_content, base_date, e)
     
-    def coordinate_scheduling_parallel(self, participants: List[str], meeting_info: Dict) -> Dict:
-        """SAME coordination logic with parallel execution"""
+    async def aparse_meeting_request(self, email_content: str, request_datetime: str) -> Dict:
+        """Async twin of parse_meeting_request"""
+        base_date = datetime.strptime(request_datetime, '%d-%m-%YT%H:%M:%S')
+        meeting_info = self._rule_fast_path(email_content, base_date)
+        if meeting_info is not None:
+            return meeting_info
         
+        try:
+            return await ahedged(
+                "parse", "parse_meeting_request",
+                lambda: achat_completion(
+                    "parse_meeting_request",
+                    self._parse_messages(email_content, base_date),
+                    temperature=0.1,
+                    max_tokens=200,
+                    parse=self._parse_llm_result,
+                    expect='{'
+                ),
+                lambda: rule_parser.parse(email_content, base_date)[0]
+            )
+        except Exception as e:
+            return self._fallback_parse(email_content, base_date, e)
+    
+    def _fallback_parse(self, email_content: str, base_date: datetime, error: Exception) -> Dict:
+        parse_log.warning("AI parsing failed: %s, using enhanced fallback", error)
+        metrics.record_fallback('parse_meeting_request')
+        metrics.inc('parse_llm_fallbacks')
+        record_phase_path("parse", "fallback")
+        # ENHANCED FALLBACK LOGIC, now the compiled rule-based parser
+        meeting_info, _ = rule_parser.parse(email_content, base_date)
+        return meeting_info
+    
+    def _plan_search_window(self, meeting_info: Dict, participants: List[str]) -> tuple:
+        """YOUR EXACT window calculation and timezone handling; returns (start_str, end_str, verification)"""
         # YOUR EXACT time window calculation
         if meeting_info.get('preferred_datetime'):
             start_date = datetime.fromisoformat(meeting_info['preferred_datetime'].replace('+05:30', ''))
@@ -613,38 +3980,62 @@ Current date: {base_date.strftime('%Y-%m-%d %A')}"""
         
         # MCP-ENHANCED timezone verification
         proposed_time = meeting_info.get('preferred_datetime', start_str)
-        print(f"🔍 MCP-Enhanced timezone verification for proposed time: {proposed_time}")
-        timezone_verification = self.timezone_agent.verify_timezone_compatibility(
-            proposed_time, self.employee_agents
-        )
-        print(f"🔍 Timezone verification result: {json.dumps(timezone_verification, indent=2)}")
+        timezone_log.debug("🔍 MCP-Enhanced timezone verification for proposed time: %s", proposed_time)
+        with span("timezone_verification", proposed_time=proposed_time):
+            timezone_verification = self.timezone_agent.verify_timezone_compatibility(
+                proposed_time, participants, meeting_info['duration_minutes']
+            )
+        timezone_log.debug("🔍 Timezone verification result: %s", LazyJSON(timezone_verification))
         
         # YOUR EXACT timezone handling
         if not timezone_verification.get('compatible', True):
             suggested_time = timezone_verification.get('suggested_alternative', proposed_time)
-            print(f"Timezone conflict detected. Using suggested time: {suggested_time}")
+            timezone_log.info("Timezone conflict detected. Using suggested time: %s", suggested_time)
             meeting_info['preferred_datetime'] = suggested_time
             start_date = datetime.fromisoformat(suggested_time.replace('+05:30', ''))
             start_str = start_date.strftime('%Y-%m-%dT00:00:00+05:30')
             end_str = (start_date + timedelta(days=search_days.get(meeting_info['urgency'], 14))).strftime('%Y-%m-%dT23:59:59+05:30')
         
+        return start_str, end_str, timezone_verification
+    
+    def coordinate_scheduling_parallel(self, participants: List[str], meeting_info: Dict,
+                                       event_store: Optional[RequestEventStore] = None) -> Dict:
+        """SAME coordination logic with parallel execution"""
+        start_str, end_str, timezone_verification = self._plan_search_window(meeting_info, participants)
+        
+        # One calendar round for everyone instead of one events.list per agent
+        with span("calendar.busy", participants=len(participants)):
+            busy_by_participant = self.fetch_busy(participants, start_str, end_str, event_store)
+        
         # ONLY OPTIMIZATION: Parallel execution of YOUR EXACT AI logic
         # Phase 1: Parallel slot finding with YOUR EXACT AI calls
         def find_slots_for_participant(participant):
             if participant in self.employee_agents:
                 agent = self.employee_agents[participant]
                 # YOUR EXACT AI slot finding call
-                slots = agent.find_available_slots(start_str, end_str, meeting_info['duration_minutes'])
+                slots = agent.find_available_slots(start_str, end_str, meeting_info['duration_minutes'],
+                                                   busy_by_participant.get(participant))
                 return participant, slots
             return participant, []
         
         # Execute YOUR AI calls in parallel
-        all_proposals = {}
-        with ThreadPoolExecutor(max_workers=len(participants)) as executor:
-            futures = [executor.submit(find_slots_for_participant, p) for p in participants]
-            for future in as_completed(futures):
-                participant, slots = future.result()
-                all_proposals[participant] = slots
+        with span("phase1.find_slots", engine=SLOT_ENGINE), phase_budget("find_slots"):
+            if SLOT_ENGINE in ('deterministic', 'hybrid'):
+                all_proposals = self.find_slots_deterministic(participants, start_str, end_str, meeting_info,
+                                                              busy_by_participant)
+            else:
+                all_proposals = {}
+                with ThreadPoolExecutor(max_workers=len(participants)) as executor:
+                    futures = [traced_submit(executor, "find_available_slots", find_slots_for_participant, p,
+                                             participant=p) for p in participants]
+                    for future in as_completed(futures):
+                        participant, slots = future.result()
+                        all_proposals[participant] = slots
+        
+        consensus = self.short_circuit(participants, all_proposals, meeting_info)
+        if consensus is not None:
+            consensus['timezone_verification'] = timezone_verification
+            return consensus
         
         # Phase 2: Parallel negotiation with YOUR EXACT AI calls
         def negotiate_for_participant(participant):
@@ -658,170 +4049,657 @@ Current date: {base_date.strftime('%Y-%m-%d %A')}"""
         
         # Execute YOUR AI negotiations in parallel
         negotiation_results = []
-        with ThreadPoolExecutor(max_workers=len(participants)) as executor:
-            futures = [executor.submit(negotiate_for_participant, p) for p in participants]
+        with span("phase2.negotiate"), phase_budget("negotiate"), \
+                ThreadPoolExecutor(max_workers=len(participants)) as executor:
+            futures = [traced_submit(executor, "negotiate_slot", negotiate_for_participant, p,
+                                     participant=p) for p in participants]
             for future in as_completed(futures):
                 result = future.result()
                 if result:
                     negotiation_results.append(result)
         
         # Phase 3: YOUR EXACT boss decision
-        final_decision = self.make_final_decision(negotiation_results, meeting_info)
+        with span("phase3.decision"), phase_budget("decision"):
+            final_decision = self.make_final_decision(negotiation_results, meeting_info)
         final_decision['timezone_verification'] = timezone_verification
         
         return final_decision
     
-    def make_final_decision(self, negotiation_results: List[Dict], meeting_info: Dict) -> Dict:
-        """EXACT SAME boss AI logic with increased tokens"""
+    async def acoordinate_scheduling(self, participants: List[str], meeting_info: Dict,
+                                     event_store: Optional[RequestEventStore] = None) -> Dict:
+        """Same three phases as coordinate_scheduling_parallel, as coroutines on the shared loop"""
+        start_str, end_str, timezone_verification = await asyncio.to_thread(self._plan_search_window,
+                                                                            meeting_info, participants)
+        with span("calendar.busy", participants=len(participants)):
+            busy_by_participant = await self.afetch_busy(participants, start_str, end_str, event_store)
+        agent_participants = [p for p in participants if p in self.employee_agents]
+        
+        # Phase 1: slot finding
+        with span("phase1.find_slots", engine=SLOT_ENGINE), phase_budget("find_slots"):
+            if SLOT_ENGINE in ('deterministic', 'hybrid'):
+                all_proposals = await self.afind_slots_deterministic(participants, start_str, end_str, meeting_info,
+                                                                     busy_by_participant)
+            else:
+                all_proposals = {p: [] for p in participants}
+                slot_lists = await asyncio.gather(*(
+                    traced("find_available_slots", self.employee_agents[p].afind_available_slots(
+                        start_str, end_str, meeting_info['duration_minutes'], busy_by_participant.get(p)),
+                        participant=p)
+                    for p in agent_participants
+                ))
+                all_proposals.update(zip(agent_participants, slot_lists))
+        
+        consensus = self.short_circuit(participants, all_proposals, meeting_info)
+        if consensus is not None:
+            consensus['timezone_verification'] = timezone_verification
+            return consensus
+        
+        # Phase 2: negotiation
+        with span("phase2.negotiate"), phase_budget("negotiate"):
+            negotiation_results = await asyncio.gather(*(
+                traced("negotiate_slot", self.employee_agents[p].anegotiate_slot(
+                    all_proposals[p], [slots[:3] for email, slots in all_proposals.items() if email != p]),
+                    participant=p)
+                for p in agent_participants
+            ))
+        negotiation_results = [result for result in negotiation_results if result]
+        
+        # Phase 3: boss decision
+        with span("phase3.decision"), phase_budget("decision"):
+            final_decision = await self.amake_final_decision(negotiation_results, meeting_info)
+        final_decision['timezone_verification'] = timezone_verification
+        return final_decision
+    
+    def short_circuit(self, participants: List[str], all_proposals: Dict[str, List[Dict]],
+                      meeting_info: Dict) -> Optional[Dict]:
+        """Final decision straight from the phase 1 proposals when they agree (phases 2 and 3 skipped)"""
+        if not CONSENSUS_SHORT_CIRCUIT:
+            return None
+        agent_participants = [p for p in participants if p in self.employee_agents]
+        with span("consensus", participants=len(agent_participants)) as current:
+            decision = find_consensus({p: all_proposals.get(p, []) for p in agent_participants},
+                                      meeting_info['duration_minutes'])
+            if current is not None:
+                current.attributes["short_circuit"] = decision is not None
+        if decision is None:
+            return None
+        metrics.inc('consensus_short_circuits')
+        record_phase_path("negotiate", "consensus")
+        record_phase_path("decision", "consensus")
+        agent_log.info("🤝 Proposals agree on %s, skipping negotiation", decision['start'])
+        return decision
+    
+    def fetch_busy(self, participants: List[str], start_str: str, end_str: str,
+                   event_store: Optional[RequestEventStore] = None) -> Dict[str, List[tuple]]:
+        """Busy intervals for all participants in one round; empty dict means agents fetch their own"""
+        if event_store is None:
+            event_store = RequestEventStore(self.employee_agents)
+        try:
+            # Full events for the window, so the output day view is served from memory later
+            return event_store.get_busy(participants, start_str, end_str)
+        except Exception as e:
+            calendar_log.warning("Calendar read failed: %s, agents will read their own calendars", e)
+            return {}
+    
+    async def afetch_busy(self, participants: List[str], start_str: str, end_str: str,
+                          event_store: Optional[RequestEventStore] = None) -> Dict[str, List[tuple]]:
+        """Async twin of fetch_busy"""
+        if event_store is None:
+            event_store = RequestEventStore(self.employee_agents)
         try:
-            # YOUR EXACT PROMPT
-            prompt = f"""Boss final decision.
+            return await event_store.aget_busy(participants, start_str, end_str)
+        except Exception as e:
+            calendar_log.warning("Calendar read failed: %s, agents will read their own calendars", e)
+            return {}
+    
+    def _common_slots(self, participants: List[str], start_str: str, end_str: str,
+                      meeting_info: Dict, busy_by_participant: Dict[str, List[tuple]]) -> List[Dict]:
+        timezones = {p: timezone_for(p) for p in participants}
+        common_slots = slot_engine.find_common_slots(
+            busy_by_participant, timezones, start_str, end_str,
+            meeting_info['duration_minutes'], meeting_info.get('preferred_datetime')
+        )
+        agent_log.info("🧮 Slot engine found %d common slots for %d participants", len(common_slots), len(participants))
+        return common_slots
+    
+    def find_slots_deterministic(self, participants: List[str], start_str: str, end_str: str,
+                                 meeting_info: Dict, busy_by_participant: Dict[str, List[tuple]]) -> Dict[str, List[Dict]]:
+        """Phase 1 without LLM slot invention: common free slots from every participant's calendar"""
+        agent_participants = [p for p in participants if p in self.employee_agents]
+        busy_by_participant = dict(busy_by_participant)
+        for participant in agent_participants:
+            if participant not in busy_by_participant:
+                busy_by_participant[participant] = self.employee_agents[participant].get_busy_intervals(start_str, end_str)
+        
+        common_slots = self._common_slots(participants, start_str, end_str, meeting_info, busy_by_participant)
+        
+        def proposals_for_participant(participant):
+            if SLOT_ENGINE == 'hybrid':
+                return participant, self.employee_agents[participant].rank_slots(
+                    common_slots, meeting_info['duration_minutes'])
+            record_phase_path("find_slots", "deterministic")
+            return participant, list(common_slots)
+        
+        all_proposals = {p: [] for p in participants if p not in self.employee_agents}
+        if agent_participants:
+            with ThreadPoolExecutor(max_workers=len(agent_participants)) as executor:
+                futures = [traced_submit(executor, "rank_slots" if SLOT_ENGINE == 'hybrid' else "common_slots",
+                                         proposals_for_participant, p, participant=p) for p in agent_participants]
+                for future in futures:
+                    participant, slots = future.result()
+                    all_proposals[participant] = slots
+        return all_proposals
+    
+    async def afind_slots_deterministic(self, participants: List[str], start_str: str, end_str: str,
+                                        meeting_info: Dict, busy_by_participant: Dict[str, List[tuple]]) -> Dict[str, List[Dict]]:
+        """Async twin of find_slots_deterministic"""
+        agent_participants = [p for p in participants if p in self.employee_agents]
+        busy_by_participant = dict(busy_by_participant)
+        missing = [p for p in agent_participants if p not in busy_by_participant]
+        fetched = await asyncio.gather(*(
+            self.employee_agents[p].aget_busy_intervals(start_str, end_str) for p in missing
+        ))
+        busy_by_participant.update(zip(missing, fetched))
+        
+        common_slots = self._common_slots(participants, start_str, end_str, meeting_info, busy_by_participant)
+        
+        all_proposals = {p: [] for p in participants if p not in self.employee_agents}
+        if SLOT_ENGINE == 'hybrid':
+            ranked = await asyncio.gather(*(
+                self.employee_agents[p].arank_slots(common_slots, meeting_info['duration_minutes'])
+                for p in agent_participants
+            ))
+            all_proposals.update(zip(agent_participants, ranked))
+        else:
+            for participant in agent_participants:
+                record_phase_path("find_slots", "deterministic")
+                all_proposals[participant] = list(common_slots)
+        return all_proposals
+    
+    @staticmethod
+    def _decision_messages(negotiation_results: List[Dict], meeting_info: Dict) -> List[Dict]:
+        results = [compact_slot(result) for result in negotiation_results[:3]]
+        
+        def build(count: int) -> str:
+            return f"""Boss final decision.
 Duration: {meeting_info['duration_minutes']}mins
 Urgency: {meeting_info['urgency']}
-Results: {json.dumps(negotiation_results[:3])}
+Results (start..end confidence): {"; ".join(results[:count])}
 
 Pick best time with highest consensus.
 Return: {{"start":"2025-07-17T14:00:00+05:30","end":"2025-07-17T14:30:00+05:30","confidence":0.95}}"""
-            
+        
+        return [{"role": "user", "content": fit_prompt(build, len(results), "make_final_decision")}]
+    
+    @staticmethod
+    def _parse_decision(result: str) -> Dict:
+        return extract_json(result, '{')
+    
+    @staticmethod
+    def _fallback_decision(negotiation_results: List[Dict], meeting_info: Dict, error: Exception) -> Dict:
+        agent_log.warning("AI final decision failed: %s, using fallback", error)
+        metrics.record_fallback('make_final_decision')
+        record_phase_path("decision", "fallback")
+        return OptimizedBossAgent._deterministic_decision(negotiation_results, meeting_info)
+    
+    @staticmethod
+    def _deterministic_decision(negotiation_results: List[Dict], meeting_info: Dict) -> Dict:
+        # YOUR EXACT FALLBACK LOGIC
+        if negotiation_results:
+            best_result = max(negotiation_results, key=lambda x: x.get('confidence', 0))
+            return {
+                "start": best_result["start"],
+                "end": best_result["end"],
+                "confidence": best_result.get("confidence", 0.7)
+            }
+        else:
+            preferred_dt = meeting_info.get('preferred_datetime', '2025-07-17T14:00:00+05:30')
+            start_dt = datetime.fromisoformat(preferred_dt.replace('+05:30', ''))
+            end_dt = start_dt + timedelta(minutes=meeting_info['duration_minutes'])
+            return {
+                "start": start_dt.strftime('%Y-%m-%dT%H:%M:%S+05:30'),
+                "end": end_dt.strftime('%Y-%m-%dT%H:%M:%S+05:30'),
+                "confidence": 0.6
+            }
+    
+    def make_final_decision(self, negotiation_results: List[Dict], meeting_info: Dict) -> Dict:
+        """EXACT SAME boss AI logic with increased tokens"""
+        try:
             # YOUR EXACT AI CALL with increased tokens
-            response = self.ai_client.chat.completions.create(
-                model=AI_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=200  # INCREASED from 150
+            return hedged(
+                "decision", "make_final_decision",
+                lambda: chat_completion(
+                    "make_final_decision",
+                    self._decision_messages(negotiation_results, meeting_info),
+                    temperature=0.1,
+                    max_tokens=200,  # INCREASED from 150
+                    parse=self._parse_decision,
+                    expect='{'
+                ),
+                lambda: self._deterministic_decision(negotiation_results, meeting_info)
             )
-            
-            result = response.choices[0].message.content.strip()
-            if result:
-                # Fix potential JSON truncation
-                cleaned_result = result
-                if cleaned_result.count('{') > cleaned_result.count('}'):
-                    missing_braces = cleaned_result.count('{') - cleaned_result.count('}')
-                    cleaned_result += '}' * missing_braces
-                
-                return json.loads(cleaned_result)
-            else:
-                raise ValueError("Empty response")
         except Exception as e:
-            print(f"AI final decision failed: {e}, using fallback")
-            # YOUR EXACT FALLBACK LOGIC
-            if negotiation_results:
-                best_result = max(negotiation_results, key=lambda x: x.get('confidence', 0))
-                return {
-                    "start": best_result["start"],
-                    "end": best_result["end"],
-                    "confidence": best_result.get("confidence", 0.7)
-                }
-            else:
-                preferred_dt = meeting_info.get('preferred_datetime', '2025-07-17T14:00:00+05:30')
-                start_dt = datetime.fromisoformat(preferred_dt.replace('+05:30', ''))
-                end_dt = start_dt + timedelta(minutes=meeting_info['duration_minutes'])
-                return {
-                    "start": start_dt.strftime('%Y-%m-%dT%H:%M:%S+05:30'),
-                    "end": end_dt.strftime('%Y-%m-%dT%H:%M:%S+05:30'),
-                    "confidence": 0.6
-                }
-
-def optimized_your_meeting_assistant(data):
-    """EXACT SAME logic flow as your original, just parallel execution"""
+            return self._fallback_decision(negotiation_results, meeting_info, e)
+    
+    async def amake_final_decision(self, negotiation_results: List[Dict], meeting_info: Dict) -> Dict:
+        """Async twin of make_final_decision"""
+        try:
+            return await ahedged(
+                "decision", "make_final_decision",
+                lambda: achat_completion(
+                    "make_final_decision",
+                    self._decision_messages(negotiation_results, meeting_info),
+                    temperature=0.1,
+                    max_tokens=200,
+                    parse=self._parse_decision,
+                    expect='{'
+                ),
+                lambda: self._deterministic_decision(negotiation_results, meeting_info)
+            )
+        except Exception as e:
+            return self._fallback_decision(negotiation_results, meeting_info, e)
+
+# ADDED: Lazy employee agents - built when a participant first appears, refreshed in the background, LRU-evicted
+AGENT_CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "1024"))  # warm employee agents kept per process
+AGENT_IDLE_SECONDS = float(os.getenv("AGENT_IDLE_SECONDS", "3600"))  # unused this long -> evicted (0 = never)
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "600"))  # refresh access tokens expiring this soon
+TOKEN_REFRESH_INTERVAL = float(os.getenv("TOKEN_REFRESH_INTERVAL", "60"))  # seconds between refresh sweeps
+
+class EmployeeAgentStore(Mapping):
+    """employee_agents as a lazy mapping over a token index; only recently seen participants stay warm"""
+    
+    def __init__(self, source, capacity: int = AGENT_CACHE_SIZE, idle_seconds: float = AGENT_IDLE_SECONDS):
+        self.source = source
+        self.capacity = capacity
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._versions = source.scan()  # email -> token version (file mtime or row updated_at)
+        self._failed = {}  # email -> version that would not load; retried once the token changes
+        self._agents = OrderedDict()  # email -> agent, least recently used first
+        self._last_used = {}
+        self._build_seconds = {}  # email -> how long building the warm agent took
+        self._build_locks = {}
+        self._stop = threading.Event()
+        self._thread = None
+        metrics.set('employee_tokens_indexed', len(self._versions))
+    
+    def __len__(self) -> int:
+        return len(self._versions)
+    
+    def __iter__(self):
+        return iter(list(self._versions))
+    
+    def __contains__(self, email) -> bool:
+        """Token-index membership; never builds an agent (a token that failed to load counts as absent)"""
+        with self._lock:
+            version = self._versions.get(email)
+            return version is not None and self._failed.get(email) != version
+    
+    def __getitem__(self, email: str) -> "OptimizedEmployeeAgent":
+        agent = self._get(email)
+        if agent is None:
+            raise KeyError(email)
+        return agent
+    
+    def prepare(self, emails: List[str]):
+        """Build agents for a request's participants now, e.g. from a worker thread ahead of the event loop.
+        
+        Called once per request: each agent that is already warm adds its own build time to
+        agent_setup_seconds_saved.
+        """
+        saved = 0.0
+        for email in dict.fromkeys(emails):
+            with self._lock:
+                warm = email in self._agents
+                build_seconds = self._build_seconds.get(email, 0.0)
+            if self._get(email) is not None and warm:
+                saved += build_seconds
+        if saved:
+            metrics.inc('agent_setup_seconds_saved', round(saved, 4))
+    
+    def warm(self) -> Dict[str, "OptimizedEmployeeAgent"]:
+        """Snapshot of the agents built so far"""
+        with self._lock:
+            return dict(self._agents)
+    
+    def _touch(self, email: str) -> Optional["OptimizedEmployeeAgent"]:
+        """Warm agent marked as most recently used (caller holds the lock)"""
+        agent = self._agents.get(email)
+        if agent is not None:
+            self._agents.move_to_end(email)
+            self._last_used[email] = time.time()
+        return agent
+    
+    def _get(self, email: str) -> Optional["OptimizedEmployeeAgent"]:
+        self._ensure_maintenance()
+        with self._lock:
+            agent = self._touch(email)
+            if agent is not None:
+                return agent
+            version = self._versions.get(email)
+            if version is None or self._failed.get(email) == version:
+                return None
+            build_lock = self._build_locks.setdefault(email, threading.Lock())
+        
+        with build_lock:  # concurrent first uses build the agent once
+            with self._lock:
+                agent = self._touch(email)
+            if agent is not None:
+                return agent
+            build_start = time.perf_counter()
+            try:
+                agent = OptimizedEmployeeAgent(email, self.source.load(email))
+            except Exception as e:
+                startup_log.warning("Failed to load token for %s: %s", email, e)
+                with self._lock:
+                    self._failed[email] = version
+                    self._build_locks.pop(email, None)
+                return None
+            build_seconds = time.perf_counter() - build_start
+            with self._lock:
+                self._build_locks.pop(email, None)
+                self._agents[email] = agent
+                self._last_used[email] = time.time()
+                self._build_seconds[email] = build_seconds
+                while len(self._agents) > self.capacity:
+                    evicted, _ = self._agents.popitem(last=False)
+                    self._last_used.pop(evicted, None)
+                    self._build_seconds.pop(evicted, None)
+                    metrics.inc('agent_evictions')
+                metrics.set('agents_warm', len(self._agents))
+        metrics.inc('agent_builds')
+        metrics.observe('agent_build_seconds', build_seconds)
+        agent_log.debug("Built agent for %s in %.3fs", email, build_seconds)
+        return agent
+    
+    def reindex(self) -> bool:
+        """Pick up added, changed and removed tokens; warm agents get new credentials in place"""
+        current = self.source.scan()
+        with self._lock:
+            if current == self._versions:
+                return False
+            changed = {email: agent for email, agent in self._agents.items()
+                       if current.get(email, self._versions.get(email)) != self._versions.get(email)}
+            removed = set(self._versions) - set(current)
+            for email in removed:
+                self._agents.pop(email, None)
+                self._last_used.pop(email, None)
+                self._build_seconds.pop(email, None)
+                self._failed.pop(email, None)
+            self._versions = current
+        
+        for email, agent in changed.items():
+            try:
+                agent.update_token_info(self.source.load(email))
+            except Exception as e:
+                startup_log.warning("Failed to reload token for %s: %s", email, e)
+                continue
+            startup_log.info("♻️ Reloaded token for %s", email)
+        for email in removed:
+            startup_log.info("♻️ Token removed for %s, agent dropped", email)
+        metrics.set('employee_tokens_indexed', len(current))
+        return True
+    
+    def sweep(self):
+        """Evict idle agents, then refresh access tokens that expire within TOKEN_REFRESH_MARGIN"""
+        now = time.time()
+        with self._lock:
+            if self.idle_seconds > 0:
+                for email in [e for e, used in self._last_used.items() if now - used > self.idle_seconds]:
+                    del self._agents[email]
+                    del self._last_used[email]
+                    self._build_seconds.pop(email, None)
+                    metrics.inc('agent_evictions')
+            agents = list(self._agents.values())
+            metrics.set('agents_warm', len(agents))
+        
+        for agent in agents:
+            try:
+                if agent.refresh_if_expiring(TOKEN_REFRESH_MARGIN):
+                    metrics.inc('credential_refreshes_background')
+            except Exception as e:
+                calendar_log.warning("Background token refresh failed for %s: %s", agent.email, e)
+    
+    def _ensure_maintenance(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if (self._thread is None or not self._thread.is_alive()) and not self._stop.is_set():
+                    self._thread = Thread(target=self._maintain, name="agent-store", daemon=True)
+                    self._thread.start()
+    
+    def _maintain(self):
+        last_sweep = time.time()
+        while not self._stop.wait(min(AGENT_RELOAD_INTERVAL, TOKEN_REFRESH_INTERVAL)):
+            try:
+                if self.reindex():
+                    metrics.inc('agent_hot_reloads')
+                if time.time() - last_sweep >= TOKEN_REFRESH_INTERVAL:
+                    last_sweep = time.time()
+                    self.sweep()
+            except Exception as e:
+                agent_log.warning("Agent store maintenance failed: %s", e)
+    
+    def close(self):
+        self._stop.set()
+    
+    def after_fork(self):
+        """Keep the index and warm agents; locks, the maintenance thread and connections are per process"""
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._stop = threading.Event()
+        self._thread = None
+        for agent in self._agents.values():
+            agent.after_fork()
+
+# ADDED: Warm agent registry - agents are built once per process, not per request
+class AgentRegistry:
+    """Process-wide OptimizedBossAgent shared by all requests; its agent store follows token changes"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boss = None
+        self._cold_setup_seconds = 0.0
+    
+    def get_boss(self) -> "OptimizedBossAgent":
+        """Return the warm boss agent, building it on first use"""
+        with self._lock:
+            if self._boss is None:
+                build_start = time.perf_counter()
+                self._boss = OptimizedBossAgent()
+                self._cold_setup_seconds = time.perf_counter() - build_start
+                metrics.set('agent_cold_setup_seconds', round(self._cold_setup_seconds, 4))
+                startup_log.info("🔥 Agent registry warmed in %.2fs (%d employee tokens indexed)",
+                                 self._cold_setup_seconds, len(self._boss.employee_agents))
+                return self._boss
+            
+            metrics.inc('agent_registry_hits')
+            # The boss and token index; warm employee agents add their build time in prepare()
+            metrics.inc('agent_setup_seconds_saved', round(self._cold_setup_seconds, 4))
+            return self._boss
+    
+    def warm_agents(self) -> Dict[str, "OptimizedEmployeeAgent"]:
+        """Employee agents built so far, without building the boss"""
+        boss = self._boss
+        return boss.employee_agents.warm() if boss is not None else {}
+    
+    def reset(self):
+        """Drop the warm agents; the next request rebuilds them"""
+        with self._lock:
+            if self._boss is not None:
+                self._boss.employee_agents.close()
+            self._boss = None
+    
+    def after_fork(self):
+        """Keep the preloaded state but give each worker its own locks, threads and HTTP connections"""
+        self._lock = threading.Lock()
+        if self._boss is not None:
+            self._boss.employee_agents.after_fork()
+
+agent_registry = AgentRegistry()
+
+def output_day_window(scheduled_meeting: Dict) -> tuple:
+    """YOUR EXACT output day range around the scheduled meeting"""
+    search_date = datetime.fromisoformat(scheduled_meeting['start'].replace('+05:30', ''))
+    day_start = search_date.strftime('%Y-%m-%dT00:00:00+05:30')
+    day_end = search_date.strftime('%Y-%m-%dT23:59:59+05:30')
+    return day_start, day_end
+
+def build_meeting_result(data: Dict, meeting_info: Dict, scheduled_meeting: Dict, all_participants: List[str],
+                         events_by_participant: Dict[str, List[Dict]], start_time: float,
+                         event_store: RequestEventStore, optimization: str) -> Dict:
+    """YOUR EXACT processed/output formats, shared by the threaded and asyncio pipelines"""
+    attendees_with_events = []
+    for participant in all_participants:
+        events = list(events_by_participant.get(participant, []))
+        
+        # YOUR EXACT new meeting addition
+        events.append({
+            "StartTime": scheduled_meeting['start'],
+            "EndTime": scheduled_meeting['end'],
+            "NumAttendees": len(all_participants),
+            "Attendees": all_participants,
+            "Summary": data.get('Subject', 'Meeting')
+        })
+        
+        attendees_with_events.append({
+            "email": participant,
+            "events": events
+        })
+    
+    # YOUR EXACT output format
+    output = {
+        "Request_id": data['Request_id'],
+        "Datetime": data['Datetime'],
+        "Location": data['Location'],
+        "From": data['From'],
+        "Attendees": attendees_with_events,
+        "Subject": data.get('Subject', 'Meeting'),
+        "EmailContent": data['EmailContent'],
+        "EventStart": scheduled_meeting['start'],
+        "EventEnd": scheduled_meeting['end'],
+        "Duration_mins": str(meeting_info['duration_minutes']),
+        "MetaData": {
+            "timezone_verification": scheduled_meeting.get('timezone_verification', {}),
+            "timezone_summary": scheduled_meeting.get('timezone_verification', {}).get('timezone_summary', 'All agents in same timezone'),
+            "timezone_assignments": scheduled_meeting.get('timezone_verification', {}).get('timezone_assignments', {}),
+            "scheduling_step": "MCP-Enhanced timezone verification and Boss Agent scheduling",
+            "processing_time_seconds": round(time.time() - start_time, 2),
+            "optimization": optimization,
+            "calendar_cache": event_store.stats(),
+            "phase_paths": phase_paths_summary(),
+            "consensus": scheduled_meeting.get('consensus', {"short_circuit": False})
+        }
+    }
+    deadline = _request_deadline.get()
+    if deadline is not None:
+        remaining_ms = round((deadline - time.time()) * 1000)
+        output["MetaData"]["deadline"] = {"budget_ms": data.get('Deadline_ms'), "remaining_ms": remaining_ms,
+                                          "met": remaining_ms >= 0}
+    
+    # YOUR EXACT processed format
+    processed = {
+        "Request_id": data['Request_id'],
+        "Datetime": data['Datetime'],
+        "Location": data['Location'],
+        "From": data['From'],
+        "Attendees": data['Attendees'],
+        "Subject": data.get('Subject', 'Meeting'),
+        "EmailContent": data['EmailContent'],
+        "Start": scheduled_meeting['start'],
+        "End": scheduled_meeting['end'],
+        "Duration_mins": str(meeting_info['duration_minutes'])
+    }
+    
+    return {
+        "processed": processed,
+        "output": output
+    }
+
+@traced_request("meeting_request")
+@request_scoped
+def optimized_your_meeting_assistant(data, event_store: Optional[RequestEventStore] = None):
+    """EXACT SAME logic flow as your original, just parallel execution.
+    
+    A batch passes its shared, prefetched event store; single requests get their own.
+    """
     try:
         start_time = time.time()
         
-        # Use optimized boss agent (preserves ALL your AI)
-        boss = OptimizedBossAgent()
+        # Warm boss agent from the registry (preserves ALL your AI)
+        boss = agent_registry.get_boss()
+        if event_store is None:
+            event_store = RequestEventStore(boss.employee_agents)
         
         # YOUR EXACT parsing step
-        meeting_info = boss.parse_meeting_request(
-            data['EmailContent'],
-            data['Datetime']
-        )
+        with span("parse_meeting_request"), phase_budget("parse"):
+            meeting_info = boss.parse_meeting_request(
+                data['EmailContent'],
+                data['Datetime']
+            )
         
         # YOUR EXACT participant logic
         all_participants = [data['From']] + [a['email'] for a in data['Attendees']]
+        boss.employee_agents.prepare(all_participants)
         
         # YOUR EXACT coordination with parallel optimization
-        scheduled_meeting = boss.coordinate_scheduling_parallel(all_participants, meeting_info)
-        
-        # YOUR EXACT output building
-        search_date = datetime.fromisoformat(scheduled_meeting['start'].replace('+05:30', ''))
-        day_start = search_date.strftime('%Y-%m-%dT00:00:00+05:30')
-        day_end = search_date.strftime('%Y-%m-%dT23:59:59+05:30')
-        
-        # Parallel calendar fetching for output (only optimization here)
-        def get_events_for_participant(participant):
-            events = []
-            if participant in boss.employee_agents:
-                events = boss.employee_agents[participant].get_calendar_events(day_start, day_end)
-            
-            # YOUR EXACT new meeting addition
-            events.append({
-                "StartTime": scheduled_meeting['start'],
-                "EndTime": scheduled_meeting['end'],
-                "NumAttendees": len(all_participants),
-                "Attendees": all_participants,
-                "Summary": data.get('Subject', 'Meeting')
-            })
-            
-            return {
-                "email": participant,
-                "events": events
-            }
+        scheduled_meeting = boss.coordinate_scheduling_parallel(all_participants, meeting_info, event_store)
         
-        # Execute calendar fetching in parallel
-        attendees_with_events = []
-        with ThreadPoolExecutor(max_workers=len(all_participants)) as executor:
-            futures = [executor.submit(get_events_for_participant, p) for p in all_participants]
-            for future in as_completed(futures):
-                attendees_with_events.append(future.result())
-        
-        # YOUR EXACT output format
-        output = {
-            "Request_id": data['Request_id'],
-            "Datetime": data['Datetime'],
-            "Location": data['Location'],
-            "From": data['From'],
-            "Attendees": attendees_with_events,
-            "Subject": data.get('Subject', 'Meeting'),
-            "EmailContent": data['EmailContent'],
-            "EventStart": scheduled_meeting['start'],
-            "EventEnd": scheduled_meeting['end'],
-            "Duration_mins": str(meeting_info['duration_minutes']),
-            "MetaData": {
-                "timezone_verification": scheduled_meeting.get('timezone_verification', {}),
-                "timezone_summary": scheduled_meeting.get('timezone_verification', {}).get('timezone_summary', 'All agents in same timezone'),
-                "timezone_assignments": scheduled_meeting.get('timezone_verification', {}).get('timezone_assignments', {}),
-                "scheduling_step": "MCP-Enhanced timezone verification and Boss Agent scheduling",
-                "processing_time_seconds": round(time.time() - start_time, 2),
-                "optimization": "Parallel execution with MCP timezone support"
-            }
-        }
+        # Day view for output, served from the request's event store (batched fetch only on a miss)
+        day_start, day_end = output_day_window(scheduled_meeting)
+        with span("calendar.output_day"):
+            events_by_participant = event_store.get_events_many(all_participants, day_start, day_end)
         
-        # YOUR EXACT processed format
-        processed = {
-            "Request_id": data['Request_id'],
-            "Datetime": data['Datetime'],
-            "Location": data['Location'],
-            "From": data['From'],
-            "Attendees": data['Attendees'],
-            "Subject": data.get('Subject', 'Meeting'),
-            "EmailContent": data['EmailContent'],
-            "Start": scheduled_meeting['start'],
-            "End": scheduled_meeting['end'],
-            "Duration_mins": str(meeting_info['duration_minutes'])
-        }
+        return build_meeting_result(data, meeting_info, scheduled_meeting, all_participants,
+                                    events_by_participant, start_time, event_store,
+                                    "Parallel execution with MCP timezone support")
         
+    except Exception as e:
+        request_log.error("Error: %s", e, exc_info=True)
         return {
-            "processed": processed,
-            "output": output
+            "processed": {"error": str(e)},
+            "output": {"error": str(e)}
         }
+
+@traced_request("meeting_request")
+@request_scoped
+async def async_optimized_your_meeting_assistant(data, event_store: Optional[RequestEventStore] = None):
+    """Same flow as optimized_your_meeting_assistant with every phase as a coroutine"""
+    try:
+        start_time = time.time()
+        
+        boss = agent_registry.get_boss()
+        if event_store is None:
+            event_store = RequestEventStore(boss.employee_agents)
+        
+        all_participants = [data['From']] + [a['email'] for a in data['Attendees']]
+        # First-use agent builds read token files; keep them off the loop, overlapped with parsing
+        preparing = asyncio.ensure_future(asyncio.to_thread(boss.employee_agents.prepare, all_participants))
+        with span("parse_meeting_request"), phase_budget("parse"):
+            meeting_info = await boss.aparse_meeting_request(data['EmailContent'], data['Datetime'])
+        await preparing
+        scheduled_meeting = await boss.acoordinate_scheduling(all_participants, meeting_info, event_store)
+        
+        day_start, day_end = output_day_window(scheduled_meeting)
+        with span("calendar.output_day"):
+            events_by_participant = await event_store.aget_events_many(all_participants, day_start, day_end)
+        
+        return build_meeting_result(data, meeting_info, scheduled_meeting, all_participants,
+                                    events_by_participant, start_time, event_store,
+                                    "Asyncio execution with MCP timezone support")
         
     except Exception as e:
-        print(f"Error: {e}")
+        request_log.error("Error: %s", e, exc_info=True)
         return {
             "processed": {"error": str(e)},
             "output": {"error": str(e)}
         }
 
+def print_meeting_result(data, result):
+    """FIXED: Display processed format for hackathon compliance"""
+    # Full payloads are sampled (LOG_SAMPLE_RATES payload=...) and only serialized when emitted
+    payload_log.info("📋 PROCESSED FORMAT (Hackathon Required):\n%s", LazyJSON(result.get("processed", {})))
+    payload_log.info("🎯 OUTPUT FORMAT (Final Result):\n%s", LazyJSON(result.get("output", {})))
+
 # HACKATHON COMPLIANT FUNCTION - ONLY WRAPPER ADDED
 def your_meeting_assistant(data):
     """
@@ -829,58 +4707,39 @@ def your_meeting_assistant(data):
     ONLY ADDS: proper processed/output format compliance
     NO LOGIC CHANGES AT ALL
     """
-    print(f"\n🎯 HACKATHON: Processing meeting request with ID: {data.get('Request_id', 'Unknown')}")
-    print(f"📧 Email Content: {data.get('EmailContent', 'No content')}")
+    request_log.info("🎯 HACKATHON: Processing meeting request with ID: %s", data.get('Request_id', 'Unknown'))
+    request_log.debug("📧 Email Content: %s", data.get('EmailContent', 'No content'))
     
     # Call your EXACT optimized function (no changes)
     result = optimized_your_meeting_assistant(data)
-    
-    # FIXED: Display processed format for hackathon compliance
-    print(f"\n📋 PROCESSED FORMAT (Hackathon Required):")
-    print("=" * 50)
-    print(json.dumps(result.get("processed", {}), indent=2, ensure_ascii=False))
-    print("=" * 50)
-    
-    print(f"\n🎯 OUTPUT FORMAT (Final Result):")
-    print("=" * 50)
-    print(json.dumps(result.get("output", {}), indent=2, ensure_ascii=False))
-    print("=" * 50)
+    print_meeting_result(data, result)
     
     # Return the result with both processed and output
     return result
 
-# Flask server - ORIGINAL SUBMISSION ENDPOINT
-app = Flask(__name__)
-received_data = []
-
-@app.route('/receive', methods=['POST'])
-def receive():
-    """HACKATHON SUBMISSION ENDPOINT - calls your_meeting_assistant function"""
-    data = request.get_json()
-    print(f"\n🚀 OPTIMIZED: Received meeting request (preserving ALL AI logic)")
-    
-    # ADDED: Track request start (ONLY metrics addition)
-    start_time = time.time()
-    metrics['total_requests'] += 1
-    
-    # Call the HACKATHON REQUIRED function
-    processed_data = your_meeting_assistant(data)
-    received_data.append(data)
+async def async_your_meeting_assistant(data):
+    """Asyncio twin of your_meeting_assistant for the ASGI endpoint"""
+    request_log.info("🎯 HACKATHON: Processing meeting request with ID: %s", data.get('Request_id', 'Unknown'))
+    request_log.debug("📧 Email Content: %s", data.get('EmailContent', 'No content'))
     
-    # ADDED: Track request completion (ONLY metrics addition)
-    processing_time = time.time() - start_time
-    metrics['processing_times'].append(processing_time)
+    result = await async_optimized_your_meeting_assistant(data)
+    print_meeting_result(data, result)
+    return result
+
+def record_request_metrics(data: Dict, processed_data: Dict, processing_time: float):
+    """ADDED: Track request completion (ONLY metrics addition)"""
+    metrics.observe_latency(processing_time)
     
     if 'error' not in processed_data.get('output', {}):
-        metrics['successful_requests'] += 1
+        metrics.inc('successful_requests')
         
         # Track timezone conflicts
         tz_verification = processed_data.get('output', {}).get('MetaData', {}).get('timezone_verification', {})
         if not tz_verification.get('compatible', True):
-            metrics['timezone_conflicts'] += 1
+            metrics.inc('timezone_conflicts')
         
         # Add to recent requests
-        metrics['recent_requests'].append({
+        metrics.add_recent({
             'time': datetime.now().strftime('%H:%M:%S'),
             'from': data.get('From', 'Unknown'),
             'subject': data.get('Subject', 'No Subject'),
@@ -889,8 +4748,8 @@ def receive():
             'success': True
         })
     else:
-        metrics['failed_requests'] += 1
-        metrics['recent_requests'].append({
+        metrics.inc('failed_requests')
+        metrics.add_recent({
             'time': datetime.now().strftime('%H:%M:%S'),
             'from': data.get('From', 'Unknown'),
             'subject': data.get('Subject', 'No Subject'),
@@ -899,7 +4758,265 @@ def receive():
             'success': False
         })
     
-    print(f"\n⚡ PERFORMANCE: {processed_data['output'].get('MetaData', {}).get('processing_time_seconds', 'N/A')}s with ALL AI preserved")
+    request_log.info("⚡ PERFORMANCE: %ss with ALL AI preserved",
+                     processed_data['output'].get('MetaData', {}).get('processing_time_seconds', 'N/A'))
+
+# ADDED: Batch intake - one calendar prefetch per batch, bounded concurrency, NDJSON results
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+BATCH_PREFETCH_DAYS = int(os.getenv("BATCH_PREFETCH_DAYS", "42"))  # parse lead time + longest search + tz shift
+
+def parse_batch_body(body: str) -> tuple:
+    """JSONL body -> (meeting requests, per-line error results)"""
+    batch, errors = [], []
+    for line_number, line in enumerate(body.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise ValueError("Each line must be a JSON object")
+            batch.append(data)
+        except ValueError as e:
+            errors.append({"line": line_number, "processed": {"error": str(e)}, "output": {"error": str(e)}})
+    return batch, errors
+
+def batch_participants(data: Dict) -> List[str]:
+    return [data.get('From')] + [a.get('email') for a in data.get('Attendees', []) if isinstance(a, dict)]
+
+def batch_prefetch_windows(batch: List[Dict]) -> Dict[tuple, List[str]]:
+    """Group participants by the date window their requests can search: (time_min, time_max) -> emails"""
+    spans = {}
+    for data in batch:
+        try:
+            base = datetime.strptime(data['Datetime'], '%d-%m-%YT%H:%M:%S')
+        except (KeyError, TypeError, ValueError):
+            continue
+        for email in batch_participants(data):
+            if email:
+                first, last = spans.get(email, (base, base))
+                spans[email] = (min(first, base), max(last, base))
+    
+    windows = {}
+    for email, (first, last) in spans.items():
+        window = (first.strftime('%Y-%m-%dT00:00:00+05:30'),
+                  (last + timedelta(days=BATCH_PREFETCH_DAYS)).strftime('%Y-%m-%dT23:59:59+05:30'))
+        windows.setdefault(window, []).append(email)
+    return windows
+
+def _batch_result(data: Dict, processed_data: Dict, start_time: float) -> Dict:
+    metrics.inc('total_requests')
+    received_data.append(data)
+    record_request_metrics(data, processed_data, time.time() - start_time)
+    return {"Request_id": data.get('Request_id'), **processed_data}
+
+def prefetch_batch_calendars(event_store: RequestEventStore, batch: List[Dict]):
+    for (time_min, time_max), emails in batch_prefetch_windows(batch).items():
+        try:
+            event_store.get_events_many(emails, time_min, time_max)
+        except Exception as e:
+            batch_log.warning("Batch calendar prefetch failed: %s, requests will fetch on demand", e)
+    batch_log.info("📦 Batch of %d requests, calendars prefetched for %d participants",
+                   len(batch), event_store.participants_cached())
+
+def run_receive_batch(batch: List[Dict]):
+    """Yield each request's processed/output result as soon as it finishes"""
+    metrics.inc('batches')
+    deadlines = [request_deadline(data) for data in batch]  # budgets run from receipt, prefetch included
+    boss = agent_registry.get_boss()
+    event_store = RequestEventStore(boss.employee_agents)
+    prefetch_batch_calendars(event_store, batch)
+    
+    def process(data, deadline, queued_ns):
+        # Batch members queue with everyone else but are never shed: the batch already bounds them
+        with deadline_scope(deadline), pipeline_limiter.slot(request_priority(data, deadline), bounded=False):
+            start_time = time.time()
+            return _batch_result(data, optimized_your_meeting_assistant(data, event_store, queued_ns=queued_ns),
+                                 start_time)
+    
+    with ThreadPoolExecutor(max_workers=BATCH_MAX_CONCURRENCY) as executor:
+        futures = [executor.submit(process, data, deadlines[i], time.time_ns()) for i, data in enumerate(batch)]
+        for future in as_completed(futures):
+            yield future.result()
+
+async def arun_receive_batch(batch: List[Dict]):
+    """Async twin of run_receive_batch for the ASGI endpoint"""
+    metrics.inc('batches')
+    deadlines = [request_deadline(data) for data in batch]
+    boss = await asyncio.to_thread(agent_registry.get_boss)
+    event_store = RequestEventStore(boss.employee_agents)
+    
+    async def prefetch(time_min, time_max, emails):
+        try:
+            await event_store.aget_events_many(emails, time_min, time_max)
+        except Exception as e:
+            batch_log.warning("Batch calendar prefetch failed: %s, requests will fetch on demand", e)
+    
+    await asyncio.gather(*(prefetch(time_min, time_max, emails)
+                           for (time_min, time_max), emails in batch_prefetch_windows(batch).items()))
+    batch_log.info("📦 Batch of %d requests, calendars prefetched for %d participants",
+                   len(batch), event_store.participants_cached())
+    
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    
+    async def process(data, deadline, queued_ns):
+        with deadline_scope(deadline):
+            async with semaphore, pipeline_limiter.aslot(request_priority(data, deadline), bounded=False):
+                start_time = time.time()
+                return _batch_result(data, await async_optimized_your_meeting_assistant(
+                    data, event_store, queued_ns=queued_ns), start_time)
+    
+    queued_ns = time.time_ns()
+    for next_result in asyncio.as_completed([process(data, deadlines[i], queued_ns) for i, data in enumerate(batch)]):
+        yield await next_result
+
+def run_joint_batch(batch: List[Dict]):
+    """Schedule a batch together so requests sharing participants never get overlapping slots.
+    
+    Each request is parsed and its search window planned as usual, then one JointScheduler pass assigns
+    every slot; results come back in input order once the whole batch is solved.
+    """
+    metrics.inc('batches')
+    metrics.inc('joint_batches')
+    boss = agent_registry.get_boss()
+    event_store = RequestEventStore(boss.employee_agents)
+    prefetch_batch_calendars(event_store, batch)
+    
+    def prepare(data):
+        start_time = time.time()
+        paths = {}
+        cache_counts = Counter()
+        token = _phase_paths.set(paths)
+        counts_token = _calendar_cache_counts.set(cache_counts)
+        try:
+            with pipeline_limiter.slot(request_priority(data), bounded=False):
+                meeting_info = boss.parse_meeting_request(data['EmailContent'], data['Datetime'])
+                participants = [data['From']] + [a['email'] for a in data['Attendees']]
+                boss.employee_agents.prepare(participants)
+                start_str, end_str, verification = boss._plan_search_window(meeting_info, participants)
+                busy = boss.fetch_busy(participants, start_str, end_str, event_store)
+            return {"meeting_info": meeting_info, "participants": participants, "start_str": start_str,
+                    "end_str": end_str, "verification": verification, "busy": busy,
+                    "paths": paths, "cache_counts": cache_counts, "start_time": start_time}
+        except Exception as e:
+            request_log.error("Error: %s", e, exc_info=True)
+            return {"error": str(e), "start_time": start_time}
+        finally:
+            _calendar_cache_counts.reset(counts_token)
+            _phase_paths.reset(token)
+    
+    with ThreadPoolExecutor(max_workers=BATCH_MAX_CONCURRENCY) as executor:
+        prepared = list(executor.map(prepare, batch))
+    
+    solvable = [i for i, item in enumerate(prepared) if "error" not in item]
+    busy_by_participant = {}
+    for i in solvable:
+        for participant, intervals in prepared[i]["busy"].items():
+            busy_by_participant.setdefault(participant, []).extend(intervals)
+    meetings = []
+    for i in solvable:
+        meeting_info = prepared[i]["meeting_info"]
+        meetings.append({
+            "participants": prepared[i]["participants"],
+            "start": iso_to_epoch(prepared[i]["start_str"]),
+            "end": iso_to_epoch(prepared[i]["end_str"]),
+            "duration": meeting_info['duration_minutes'] * 60,
+            "anchor": iso_to_epoch(meeting_info.get('preferred_datetime') or prepared[i]["start_str"]),
+            "urgency": URGENCY_RANK.get(meeting_info.get('urgency'), URGENCY_RANK['medium'])
+        })
+    solve_start = time.perf_counter()
+    with span("joint_schedule", meetings=len(meetings)):
+        slots = joint_scheduler.schedule(
+            meetings, {p: merge_intervals(intervals) for p, intervals in busy_by_participant.items()})
+    solve_seconds = time.perf_counter() - solve_start
+    placed = sum(1 for slot in slots if slot and slot["placed"])
+    metrics.observe('joint_solve_seconds', solve_seconds)
+    batch_log.info("🧩 Joint schedule: %d/%d meetings placed without conflicts in %.3fs",
+                   placed, len(batch), solve_seconds)
+    
+    slot_for = dict(zip(solvable, slots))
+    for i, data in enumerate(batch):
+        item = prepared[i]
+        if "error" in item:
+            yield _batch_result(data, {"processed": {"error": item["error"]}, "output": {"error": item["error"]}},
+                                item["start_time"])
+            continue
+        token = _phase_paths.set(item["paths"])
+        counts_token = _calendar_cache_counts.set(item["cache_counts"])
+        try:
+            slot = slot_for[i]
+            if slot is None:
+                scheduled_meeting = boss._deterministic_decision([], item["meeting_info"])
+                record_phase_path("schedule", "fallback")
+            else:
+                scheduled_meeting = {"start": epoch_to_ist(slot["start"]), "end": epoch_to_ist(slot["end"]),
+                                     "confidence": slot["score"]}
+                record_phase_path("schedule", "joint")
+            scheduled_meeting['timezone_verification'] = item["verification"]
+            day_start, day_end = output_day_window(scheduled_meeting)
+            events_by_participant = event_store.get_events_many(item["participants"], day_start, day_end)
+            processed_data = build_meeting_result(data, item["meeting_info"], scheduled_meeting, item["participants"],
+                                                  events_by_participant, item["start_time"], event_store,
+                                                  f"Joint batch scheduling across {len(batch)} requests")
+            processed_data["output"]["MetaData"]["joint_schedule"] = {
+                "placed": bool(slot and slot["placed"]),
+                "batch_size": len(batch),
+                "solve_seconds": round(solve_seconds, 3)
+            }
+        except Exception as e:
+            request_log.error("Error: %s", e, exc_info=True)
+            processed_data = {"processed": {"error": str(e)}, "output": {"error": str(e)}}
+        finally:
+            _calendar_cache_counts.reset(counts_token)
+            _phase_paths.reset(token)
+        yield _batch_result(data, processed_data, item["start_time"])
+
+async def arun_joint_batch(batch: List[Dict]):
+    """Joint scheduling for the ASGI endpoint; the solve is CPU-bound, so it runs off the loop"""
+    for result in await asyncio.to_thread(lambda: list(run_joint_batch(batch))):
+        yield result
+
+# Flask server - ORIGINAL SUBMISSION ENDPOINT
+app = Flask(__name__)
+received_data = deque(maxlen=RECEIVED_DATA_LIMIT)  # last few request bodies, for debugging
+
+NOT_AN_OBJECT_ERROR = "Request body must be a JSON object"
+
+@app.route('/receive', methods=['POST'])
+def receive():
+    """HACKATHON SUBMISSION ENDPOINT - calls your_meeting_assistant function"""
+    data = request.get_json()
+    if not isinstance(data, dict):
+        # ADDED: a list/string/number body is a client error, not a 500 from data.get(...)
+        return app.response_class(response=json.dumps({"error": NOT_AN_OBJECT_ERROR}), status=400,
+                                  mimetype='application/json')
+    if request.headers.get('X-Trace'):
+        data['Trace'] = True  # attach the span tree to MetaData
+    if request.headers.get('X-Deadline-Ms'):
+        data.setdefault('Deadline_ms', request.headers['X-Deadline-Ms'])
+    if request.headers.get('X-Calendar-Refresh'):
+        data['Calendar_refresh'] = True  # re-sync mirrored calendars before reading them
+    deadline = request_deadline(data)  # the clock starts at receipt, so queueing counts
+    request_log.info("🚀 OPTIMIZED: Received meeting request (preserving ALL AI logic)")
+    
+    # ADDED: Track request start (ONLY metrics addition)
+    start_time = time.time()
+    
+    # ADDED: Admission control - queue by urgency, shed load with 429/503 + Retry-After
+    try:
+        with deadline_scope(deadline), pipeline_limiter.slot(request_priority(data, deadline)):
+            metrics.inc('total_requests')
+            # Call the HACKATHON REQUIRED function
+            processed_data = your_meeting_assistant(data)
+    except AdmissionRejected as e:
+        return app.response_class(
+            response=json.dumps({"error": str(e)}),
+            status=e.status,
+            mimetype='application/json',
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    received_data.append(data)
+    
+    record_request_metrics(data, processed_data, time.time() - start_time)
     
     # FIXED: Return just the output as expected by hackathon
     response = app.response_class(
@@ -909,13 +5026,341 @@ def receive():
     )
     return response
 
+@app.route('/receive_batch', methods=['POST'])
+def receive_batch():
+    """JSONL batch of /receive bodies in, NDJSON results out in completion order"""
+    batch, errors = parse_batch_body(request.get_data(as_text=True))
+    joint = request.args.get('joint', '').lower() in ('1', 'true', 'yes')
+    batch_log.info("📦 OPTIMIZED: Received batch of %d meeting requests%s", len(batch), " (joint)" if joint else "")
+    
+    def generate():
+        for error in errors:
+            yield json.dumps(error, ensure_ascii=False) + "\n"
+        if batch:
+            for result in (run_joint_batch if joint else run_receive_batch)(batch):
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+    
+    return app.response_class(response=generate(), status=200, mimetype='application/x-ndjson')
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return app.response_class(response=worker_metrics.prometheus(), status=200,
+                              mimetype='text/plain; version=0.0.4')
+
+# ADDED: ASGI endpoint for the asyncio pipeline (run with: uvicorn submission_server:asgi_app)
+ASYNC_MAX_INFLIGHT = int(os.getenv("ASYNC_MAX_INFLIGHT", "2000"))
+ASYNC_MAX_BODY_BYTES = int(os.getenv("ASYNC_MAX_BODY_BYTES", str(1024 * 1024)))
+ASYNC_MAX_BATCH_BODY_BYTES = int(os.getenv("ASYNC_MAX_BATCH_BODY_BYTES", str(64 * 1024 * 1024)))
+_async_inflight = weakref.WeakKeyDictionary()  # event loop -> semaphore bounding in-flight pipelines
+
+async def _asgi_send_json(send, status: int, payload: Dict, headers: Optional[List[tuple]] = None):
+    body = json.dumps(payload, indent=2, ensure_ascii=False).encode('utf-8')
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())] + (headers or [])
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def _asgi_read_body(receive, limit: int = ASYNC_MAX_BODY_BYTES) -> bytes:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            raise ValueError("Request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+async def _asgi_receive_batch(scope, receive, send):
+    """Streams NDJSON results with more_body chunks as each request finishes"""
+    try:
+        body = await _asgi_read_body(receive, ASYNC_MAX_BATCH_BODY_BYTES)
+    except ValueError as e:
+        await _asgi_send_json(send, 400, {"error": str(e)})
+        return
+    batch, errors = parse_batch_body(body.decode('utf-8'))
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/x-ndjson")]
+    })
+    for error in errors:
+        await send({"type": "http.response.body", "body": (json.dumps(error) + "\n").encode(), "more_body": True})
+    query = urllib.parse.parse_qs(scope.get("query_string", b"").decode('latin-1'))
+    joint = query.get("joint", [""])[0].lower() in ('1', 'true', 'yes')
+    if batch:
+        async for result in (arun_joint_batch if joint else arun_receive_batch)(batch):
+            line = json.dumps(result, ensure_ascii=False) + "\n"
+            await send({"type": "http.response.body", "body": line.encode('utf-8'), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+async def asgi_app(scope, receive, send):
+    """Minimal ASGI application serving POST /receive through the asyncio pipeline"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await asyncio.to_thread(agent_registry.get_boss)  # warm agents before traffic
+                if mcp_time_client is not None:
+                    await asyncio.to_thread(mcp_time_client.health_check)  # spawn the MCP session once
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await async_calendar_gateway.close()
+                if mcp_time_client is not None:
+                    mcp_time_client.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    if scope["path"] == "/metrics" and scope["method"] == "GET":
+        body = worker_metrics.prometheus().encode('utf-8')
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/plain; version=0.0.4"),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+        return
+    if scope["path"] == "/receive_batch" and scope["method"] == "POST":
+        await _asgi_receive_batch(scope, receive, send)
+        return
+    if scope["path"] != "/receive" or scope["method"] != "POST":
+        await _asgi_send_json(send, 404, {"error": "Not found"})
+        return
+    
+    try:
+        data = json.loads(await _asgi_read_body(receive))
+    except ValueError as e:
+        await _asgi_send_json(send, 400, {"error": str(e)})
+        return
+    if not isinstance(data, dict):
+        await _asgi_send_json(send, 400, {"error": NOT_AN_OBJECT_ERROR})
+        return
+    
+    loop = asyncio.get_running_loop()
+    semaphore = _async_inflight.get(loop)
+    if semaphore is None:
+        semaphore = _async_inflight[loop] = asyncio.Semaphore(ASYNC_MAX_INFLIGHT)
+    
+    headers = dict(scope.get("headers", []))
+    header_deadline = headers.get(b"x-deadline-ms")
+    if header_deadline:
+        data.setdefault('Deadline_ms', header_deadline.decode())
+    if headers.get(b"x-calendar-refresh"):
+        data['Calendar_refresh'] = True
+    deadline = request_deadline(data)
+    start_time = time.time()
+    try:
+        with deadline_scope(deadline):
+            async with semaphore, pipeline_limiter.aslot(request_priority(data, deadline)):
+                metrics.inc('total_requests')
+                processed_data = await async_your_meeting_assistant(data)
+    except AdmissionRejected as e:
+        await _asgi_send_json(send, e.status, {"error": str(e)},
+                              headers=[(b"retry-after", str(e.retry_after).encode())])
+        return
+    record_request_metrics(data, processed_data, time.time() - start_time)
+    await _asgi_send_json(send, 200, processed_data)
+
+SERVER_PORT = int(os.getenv("SERVER_PORT", "5000"))
+
 def run_flask():
-    app.run(host='0.0.0.0', port=5000)
+    app.run(host='0.0.0.0', port=SERVER_PORT)
+
+def require_uvicorn():
+    """SERVER_MODE=asgi needs uvicorn; stop at startup with the fix instead of a traceback (or one per worker)"""
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        startup_log.error("SERVER_MODE=asgi needs uvicorn, which is not installed. Install it with "
+                          "'pip install uvicorn==0.24.0' (or 'pip install -r requirements.txt'), "
+                          "or start with SERVER_MODE=flask.")
+        sys.exit(1)
+
+def run_asgi():
+    import uvicorn
+    uvicorn.run(asgi_app, host='0.0.0.0', port=SERVER_PORT, log_level="warning")
+
+# ADDED: Prefork serving - warm state is loaded once, then SERVER_WORKERS processes accept on one socket
+SERVER_DRAIN_SECONDS = float(os.getenv("SERVER_DRAIN_SECONDS", "30"))  # in-flight requests get this long on shutdown
+
+class _InflightTracker:
+    """WSGI middleware counting requests until their response body is closed"""
+    
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self._count = 0
+        self._idle = threading.Condition()
+    
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+        with self._idle:
+            self._count += 1
+        try:
+            return ClosingIterator(self.wsgi_app(environ, start_response), self._done)
+        except BaseException:
+            self._done()
+            raise
+    
+    def _done(self):
+        with self._idle:
+            self._count -= 1
+            if self._count == 0:
+                self._idle.notify_all()
+    
+    def wait_idle(self, timeout: float) -> bool:
+        with self._idle:
+            return self._idle.wait_for(lambda: self._count == 0, timeout)
+
+def _reinit_after_fork():
+    """Forked workers inherit objects whose threads, sockets and locks belong to the parent.
+    
+    Every module-level lock and every singleton holding one is replaced here: a lock that some parent
+    thread held at fork time would otherwise stay locked in the worker forever.
+    """
+    global _hedge_executor, _ai_client, _ai_client_lock, _trace_export_lock, _phase_paths_lock
+    _ai_client_lock = threading.Lock()
+    _trace_export_lock = threading.Lock()
+    _phase_paths_lock = threading.Lock()
+    metrics.after_fork()
+    worker_metrics.after_fork()
+    start_log_listener()
+    _hedge_executor = ThreadPoolExecutor(max_workers=DEADLINE_HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+    _ai_client = None
+    _async_ai_clients.clear()
+    pipeline_limiter.after_fork()
+    llm_limiter.after_fork()
+    llm_breaker.after_fork()
+    timezone_engine.after_fork()
+    prompt_tokenizer.after_fork()
+    async_calendar_gateway.after_fork()
+    llm_batcher.after_fork()
+    completion_cache.after_fork()
+    shared_calendar_cache.after_fork()
+    calendar_mirror.after_fork()
+    if mcp_time_client is not None:
+        mcp_time_client.after_fork()
+    agent_registry.after_fork()
+
+def _serve_worker(sock, mode: str):
+    """Serve on the inherited socket until SIGTERM/SIGINT, then drain in-flight requests"""
+    import signal
+    if mode == "asgi":
+        import uvicorn
+        # uvicorn handles SIGTERM/SIGINT itself: stop accepting, wait for open requests, then exit
+        server = uvicorn.Server(uvicorn.Config(asgi_app, log_level="warning",
+                                               timeout_graceful_shutdown=SERVER_DRAIN_SECONDS))
+        server.run(sockets=[sock])
+        return
+    
+    from werkzeug.serving import make_server
+    tracked = _InflightTracker(app)
+    server = make_server('0.0.0.0', SERVER_PORT, tracked, threaded=True, fd=sock.fileno())
+    draining = threading.Event()
+    
+    def drain(signum, frame):
+        if not draining.is_set():
+            draining.set()
+            # shutdown() waits for serve_forever to return, which runs on this (the main) thread
+            Thread(target=server.shutdown, daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, drain)
+    signal.signal(signal.SIGINT, drain)
+    server.serve_forever()
+    if not tracked.wait_idle(SERVER_DRAIN_SECONDS):
+        startup_log.warning("Worker %d exiting with requests still in flight after %.0fs drain",
+                            os.getpid(), SERVER_DRAIN_SECONDS)
+
+def run_prefork(workers: int, mode: str):
+    """Supervise worker processes: respawn crashed ones, forward shutdown and wait for their drain"""
+    import gc
+    import signal
+    import socket
+    
+    sock = socket.create_server(('0.0.0.0', SERVER_PORT), backlog=2048)
+    sock.set_inheritable(True)
+    worker_metrics.enable(METRICS_MULTIPROC_DIR or os.path.join(tempfile.gettempdir(),
+                                                                f"meeting-assistant-metrics-{SERVER_PORT}"))
+    agent_registry.get_boss()  # the token index and shared agents are built once and shared copy-on-write
+    worker_metrics.publish()  # preload counters belong to the supervisor; workers count from zero
+    os.register_at_fork(after_in_child=_reinit_after_fork)
+    gc.freeze()  # keep the preloaded objects out of collections that would touch (and copy) their pages
+    
+    supervisor_pid = os.getpid()
+    children = {}
+    stopping = {"kill_at": None}
+    
+    def spawn(index: int):
+        stop_log_listener()  # queued records would otherwise be written once per process
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _serve_worker(sock, mode)
+            except BaseException:
+                startup_log.exception("Worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                with contextlib.suppress(Exception):
+                    worker_metrics.publish()
+                stop_log_listener()
+                os._exit(code)
+        start_log_listener()
+        children[pid] = index
+        startup_log.info("👷 Worker %d started (pid %d)", index, pid)
+    
+    def stop(signum, frame):
+        if os.getpid() != supervisor_pid or stopping["kill_at"] is not None:
+            return
+        stopping["kill_at"] = time.time() + SERVER_DRAIN_SECONDS + 5
+        startup_log.info("🛑 Draining %d workers", len(children))
+        for pid in children:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(workers):
+        spawn(index)
+    
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            if stopping["kill_at"] is not None and time.time() > stopping["kill_at"]:
+                for child in children:
+                    with contextlib.suppress(ProcessLookupError):
+                        os.kill(child, signal.SIGKILL)
+            time.sleep(0.2)
+            continue
+        index = children.pop(pid, None)
+        worker_metrics.retire(pid)
+        if index is None or stopping["kill_at"] is not None:
+            continue
+        startup_log.warning("Worker %d (pid %d) exited with status %d, respawning",
+                            index, pid, os.waitstatus_to_exitcode(status))
+        metrics.inc('worker_respawns')
+        worker_metrics.publish()
+        time.sleep(1)  # a worker that dies on startup should not spin the supervisor
+        spawn(index)
+    sock.close()
 
 if __name__ == "__main__":
-    print("🎯 HACKATHON: AI Meeting Assistant ready!")
-    print("🔥 ALL ORIGINAL AI LOGIC PRESERVED 100%")
-    print("✅ FORMAT COMPLIANCE ADDED")
-    print("🚀 API Endpoint: http://localhost:5000/receive")
-    print("📋 Now returns both 'processed' and 'output' fields")
-    run_flask()
+    startup_log.info("🎯 HACKATHON: AI Meeting Assistant ready!")
+    startup_log.info("🔥 ALL ORIGINAL AI LOGIC PRESERVED 100%")
+    startup_log.info("✅ FORMAT COMPLIANCE ADDED")
+    startup_log.info("🚀 API Endpoint: http://localhost:5000/receive")
+    startup_log.info("📦 Batch Endpoint: http://localhost:5000/receive_batch (JSONL in, NDJSON out)")
+    startup_log.info("📈 Metrics: http://localhost:5000/metrics (Prometheus text format)")
+    startup_log.info("📋 Now returns both 'processed' and 'output' fields")
+    server_mode = os.getenv("SERVER_MODE", "flask").lower()
+    if server_mode == "asgi":
+        require_uvicorn()
+    if SERVER_WORKERS > 1:
+        run_prefork(SERVER_WORKERS, server_mode)
+    elif server_mode == "asgi":
+        run_asgi()
+    else:
+        run_flask()
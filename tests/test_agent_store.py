@@ -0,0 +1,66 @@
+"""EmployeeAgentStore laziness and warm-agent accounting, with a stub agent class and token source"""
+import pytest
+
+import submission_server as server
+from submission_server import EmployeeAgentStore
+
+
+class StubSource:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.loads = []
+    
+    def scan(self):
+        return {email: 1 for email in self.tokens}
+    
+    def load(self, email):
+        self.loads.append(email)
+        if self.tokens[email] is None:
+            raise ValueError("unreadable token")
+        return self.tokens[email]
+
+
+class StubAgent:
+    def __init__(self, email, token_info):
+        self.email = email
+        self.token_info = token_info
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(server, "OptimizedEmployeeAgent", StubAgent)
+    source = StubSource({"a@example.com": {"token": "a"}, "broken@example.com": None})
+    agents = EmployeeAgentStore(source, capacity=8, idle_seconds=0)
+    yield agents, source
+    agents.close()
+
+
+def test_membership_checks_the_token_index_without_building(store):
+    agents, source = store
+    assert "a@example.com" in agents
+    assert "broken@example.com" in agents
+    assert "nobody@example.com" not in agents
+    assert source.loads == []
+    assert agents.warm() == {}
+
+
+def test_a_token_that_fails_to_load_stops_counting_as_a_member(store):
+    agents, _ = store
+    agents.prepare(["broken@example.com"])
+    assert "broken@example.com" not in agents
+    assert agents.get("broken@example.com") is None
+
+
+def test_warm_agents_add_their_build_time_to_the_savings(store):
+    agents, source = store
+    
+    def saved():
+        return server.metrics.get("agent_setup_seconds_saved")
+    
+    before = saved()
+    agents.prepare(["a@example.com", "a@example.com"])  # cold: built once, nothing saved
+    assert source.loads == ["a@example.com"] and saved() == before
+    agents._build_seconds["a@example.com"] = 0.25
+    agents.prepare(["a@example.com"])
+    assert saved() - before == pytest.approx(0.25)
+    assert source.loads == ["a@example.com"]
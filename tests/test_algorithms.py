@@ -0,0 +1,185 @@
+"""Focused tests for the pure scheduling helpers: no calendar, LLM or MCP server is contacted"""
+import pytest
+
+import submission_server as server
+from submission_server import (JSONStreamExtractor, JointScheduler, extract_json, find_consensus, iso_to_epoch,
+                               intersect_intervals, merge_intervals, subtract_intervals)
+
+HOUR = 3600
+MONDAY_9AM = iso_to_epoch("2025-07-07T09:00:00+05:30")  # participants below default to Asia/Kolkata
+
+
+def at(hour: float) -> int:
+    return MONDAY_9AM + int((hour - 9) * HOUR)
+
+
+def slot(start_hour: float, end_hour: float, score: float) -> dict:
+    return {"start": server.epoch_to_ist(at(start_hour)), "end": server.epoch_to_ist(at(end_hour)), "score": score}
+
+
+# --- SlotEngine interval helpers ---
+
+def test_merge_intervals_sorts_and_joins_overlapping_and_touching():
+    assert merge_intervals([(5, 8), (1, 3), (2, 4), (8, 10), (12, 13)]) == [(1, 4), (5, 10), (12, 13)]
+
+
+def test_merge_intervals_drops_empty_and_nested():
+    assert merge_intervals([(3, 3), (4, 2), (1, 10), (2, 5)]) == [(1, 10)]
+    assert merge_intervals([]) == []
+
+
+def test_intersect_intervals():
+    a = [(0, 10), (20, 30)]
+    b = [(5, 25), (28, 40)]
+    assert intersect_intervals(a, b) == [(5, 10), (20, 25), (28, 30)]
+    assert intersect_intervals(a, [(10, 20)]) == []
+    assert intersect_intervals([], b) == []
+
+
+def test_subtract_intervals():
+    base = [(0, 10), (20, 30)]
+    busy = [(2, 4), (8, 22), (25, 26)]
+    assert subtract_intervals(base, busy) == [(0, 2), (4, 8), (22, 25), (26, 30)]
+    assert subtract_intervals(base, []) == base
+    assert subtract_intervals([(0, 10)], [(0, 10)]) == []
+
+
+# --- JointScheduler bitsets ---
+
+def test_starts_needs_a_full_run_of_free_cells():
+    #           cells: 6543210
+    mask = 0b1110111
+    assert JointScheduler._starts(mask, 1) == mask
+    assert JointScheduler._starts(mask, 2) == 0b0110011
+    assert JointScheduler._starts(mask, 3) == 0b0010001
+    assert JointScheduler._starts(mask, 4) == 0
+
+
+def test_starts_blocked_marks_every_start_overlapping_a_taken_cell():
+    assert JointScheduler._starts_blocked(0b1000, 3) == 0b1110
+    assert JointScheduler._starts_blocked(0, 3) == 0
+
+
+def test_nearest_prefers_the_earlier_cell_on_a_tie():
+    assert JointScheduler._nearest(0b100010, 3) == 1
+    assert JointScheduler._nearest(0b100000, 0) == 5
+    assert JointScheduler._nearest(0b000001, 4) == 0
+    assert JointScheduler._nearest(0, 2) is None
+
+
+def test_inner_and_touched_cells_round_partial_cells_differently():
+    scheduler = JointScheduler(step_minutes=30)
+    interval = [(45 * 60, 135 * 60)]  # 00:45 - 02:15 from the origin
+    assert scheduler._inner_cells(interval, 0, 8) == 0b1100  # 01:00 - 02:00
+    assert scheduler._touched_cells(interval, 0, 8) == 0b11110  # 00:30 - 02:30
+
+
+def _meeting(participants, hour, duration_mins=60, urgency="medium"):
+    return {"participants": participants, "start": at(9), "end": at(18), "duration": duration_mins * 60,
+            "anchor": at(hour), "urgency": server.URGENCY_RANK[urgency]}
+
+
+def test_schedule_separates_meetings_sharing_a_participant():
+    meetings = [_meeting(["a@example.com", "b@example.com"], 10),
+                _meeting(["a@example.com", "c@example.com"], 10)]
+    first, second = JointScheduler(step_minutes=30).schedule(meetings, {})
+    assert first["placed"] and second["placed"]
+    assert first["end"] <= second["start"] or second["end"] <= first["start"]
+    assert {first["start"], second["start"]} & {at(10)}
+
+
+def test_schedule_lets_disjoint_meetings_share_a_slot_and_respects_busy_time():
+    meetings = [_meeting(["a@example.com"], 10), _meeting(["b@example.com"], 10)]
+    busy = {"b@example.com": [(at(10), at(11))]}
+    first, second = JointScheduler(step_minutes=30).schedule(meetings, busy)
+    assert first["start"] == at(10)
+    assert second["start"] in (at(9), at(11))
+    assert not (second["start"] < at(11) and at(10) < second["end"])
+
+
+def test_schedule_returns_none_without_any_free_slot():
+    meetings = [_meeting(["a@example.com"], 10)]
+    assert JointScheduler(step_minutes=30).schedule(meetings, {"a@example.com": [(at(8), at(19))]}) == [None]
+
+
+# --- JSONStreamExtractor ---
+
+def test_extractor_stops_at_the_end_of_the_first_value():
+    extractor = JSONStreamExtractor('[')
+    assert not extractor.feed('Sure: [{"start": "a", "end": "b]"}')
+    assert extractor.feed('] and some trailing prose [1]')
+    assert extractor.value() == [{"start": "a", "end": "b]"}]
+
+
+def test_truncated_array_drops_the_incomplete_element():
+    extractor = JSONStreamExtractor('[')
+    extractor.feed('[{"start": "s1", "end": "e1", "score": 0.9}, {"start": "s2", "en')
+    assert not extractor.complete
+    assert extractor.value() == [{"start": "s1", "end": "e1", "score": 0.9}]
+
+
+def test_truncated_array_inside_the_first_element_is_empty():
+    assert extract_json('[{"start": "s1", "end": "e', '[') == []
+    assert extract_json('["a", "b', '[') == ["a"]
+
+
+def test_truncated_object_is_closed():
+    assert extract_json('{"start": "s", "reason": "long expla', '{') == {"start": "s", "reason": "long expla"}
+
+
+def test_missing_json_raises():
+    with pytest.raises(ValueError):
+        extract_json("no json here", '[')
+
+
+# --- find_consensus ---
+
+def test_consensus_prefers_more_first_choices_on_equal_scores():
+    proposals = {
+        "a": [slot(11, 12, 0.8), slot(10, 11, 0.8)],
+        "b": [slot(11, 12, 0.8), slot(10, 11, 0.8)],
+    }
+    decision = find_consensus(proposals, 60, margin=0)
+    assert decision["start"] == server.epoch_to_ist(at(11))
+    assert decision["consensus"]["unanimous"]
+
+
+def test_consensus_prefers_the_earlier_start_on_a_full_tie():
+    proposals = {
+        "a": [slot(10, 11, 0.8), slot(11, 12, 0.8)],
+        "b": [slot(11, 12, 0.8), slot(10, 11, 0.8)],
+    }
+    decision = find_consensus(proposals, 60, margin=0)
+    assert decision["start"] == server.epoch_to_ist(at(10))
+    assert not decision["consensus"]["unanimous"]
+
+
+def test_consensus_declines_an_ambiguous_lead():
+    proposals = {
+        "a": [slot(10, 11, 0.9), slot(11, 12, 0.88)],
+        "b": [slot(11, 12, 0.9), slot(10, 11, 0.88)],
+    }
+    assert find_consensus(proposals, 60, margin=0.05) is None
+
+
+def test_unanimous_first_choice_ignores_the_margin():
+    proposals = {
+        "a": [slot(10, 11, 0.9), slot(11, 12, 0.89)],
+        "b": [slot(10, 11, 0.9), slot(11, 12, 0.89)],
+    }
+    decision = find_consensus(proposals, 60, margin=0.05)
+    assert decision["start"] == server.epoch_to_ist(at(10))
+    assert decision["confidence"] == 0.95
+
+
+def test_consensus_needs_a_good_enough_common_slot():
+    assert find_consensus({"a": [slot(10, 11, 0.5)], "b": [slot(10, 11, 0.5)]}, 60, min_score=0.7) is None
+    assert find_consensus({"a": [slot(10, 11, 0.9)], "b": [slot(12, 13, 0.9)]}, 60) is None
+    assert find_consensus({"a": [slot(10, 11, 0.9)], "b": [{"start": "bad"}]}, 60) is None
+
+
+def test_consensus_fits_the_duration_inside_longer_proposals():
+    proposals = {"a": [slot(10, 12, 0.9)], "b": [slot(11, 13, 0.9)]}
+    decision = find_consensus(proposals, 60)
+    assert decision["start"] == server.epoch_to_ist(at(11))
+    assert decision["end"] == server.epoch_to_ist(at(12))
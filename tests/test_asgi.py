@@ -0,0 +1,79 @@
+"""The ASGI app driven in-process (no uvicorn): request validation, routing and the /receive happy path"""
+import asyncio
+import json
+
+import pytest
+
+import submission_server as server
+
+
+def call(method: str, path: str, body: bytes = b"", headers=(), query: bytes = b"") -> tuple:
+    """(status, headers, body) of one ASGI HTTP request"""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+    
+    async def receive():
+        return messages.pop(0)
+    
+    async def send(message):
+        sent.append(message)
+    
+    scope = {"type": "http", "method": method, "path": path, "query_string": query, "headers": list(headers)}
+    asyncio.run(server.asgi_app(scope, receive, send))
+    start = sent[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+@pytest.mark.parametrize("body", [b"[]", b'"x"', b"5", b"null"])
+def test_non_object_body_is_a_400_like_flask(body):
+    status, headers, payload = call("POST", "/receive", body)
+    assert status == 400
+    assert headers[b"content-type"] == b"application/json"
+    assert json.loads(payload) == {"error": server.NOT_AN_OBJECT_ERROR}
+    
+    flask_response = server.app.test_client().post("/receive", data=body, content_type="application/json")
+    assert flask_response.status_code == 400
+    assert flask_response.get_json() == json.loads(payload)
+
+
+def test_invalid_json_is_a_400():
+    status, _, payload = call("POST", "/receive", b"{not json")
+    assert status == 400
+    assert "error" in json.loads(payload)
+
+
+def test_unknown_route_is_a_404():
+    status, _, payload = call("GET", "/receive")
+    assert status == 404
+    assert json.loads(payload) == {"error": "Not found"}
+
+
+def test_metrics_are_prometheus_text():
+    status, headers, payload = call("GET", "/metrics")
+    assert status == 200
+    assert headers[b"content-type"].startswith(b"text/plain")
+    assert b"meeting_assistant_uptime_seconds" in payload
+
+
+def test_batch_reports_non_object_lines():
+    status, headers, payload = call("POST", "/receive_batch", b'[1, 2]\n\n"x"\n')
+    assert status == 200
+    assert headers[b"content-type"] == b"application/x-ndjson"
+    lines = [json.loads(line) for line in payload.decode().splitlines()]
+    assert [line["line"] for line in lines] == [1, 3]
+    assert all(line["output"]["error"] == "Each line must be a JSON object" for line in lines)
+
+
+def test_receive_runs_the_async_pipeline_with_header_settings(monkeypatch):
+    seen = {}
+    
+    async def pipeline(data):
+        seen.update(data)
+        return {"processed": {"ok": True}, "output": {"Request_id": data["Request_id"]}}
+    
+    monkeypatch.setattr(server, "async_your_meeting_assistant", pipeline)
+    status, _, payload = call("POST", "/receive", json.dumps({"Request_id": "r1"}).encode(),
+                              headers=[(b"x-deadline-ms", b"5000"), (b"x-calendar-refresh", b"1")])
+    assert status == 200
+    assert json.loads(payload)["output"] == {"Request_id": "r1"}
+    assert seen["Deadline_ms"] == "5000" and seen["Calendar_refresh"] is True
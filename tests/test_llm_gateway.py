@@ -0,0 +1,91 @@
+"""Circuit breaker and LLM slot limiter interplay, with no inference backend behind them"""
+import asyncio
+import time
+
+import pytest
+
+import submission_server as server
+from submission_server import AdmissionRejected, CircuitBreaker, PriorityLimiter
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+@pytest.fixture
+def half_open(monkeypatch):
+    """A breaker whose next call is the half-open probe, and an LLM limiter with its only slot taken"""
+    breaker = CircuitBreaker()
+    limiter = PriorityLimiter("llm_test", 1)
+    monkeypatch.setattr(server, "llm_breaker", breaker)
+    monkeypatch.setattr(server, "llm_limiter", limiter)
+    monkeypatch.setattr(server, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(server, "LLM_BREAKER_COOLDOWN", 0.0)
+    for _ in range(server.LLM_BREAKER_FAILURES):
+        breaker.on_failure(RuntimeError("backend down"), probe=False)
+    assert breaker.mode == "open"
+    limiter.acquire(bounded=False)
+    yield breaker, limiter
+    limiter.release()
+
+
+def assert_probe_available(breaker):
+    assert breaker.before_call() is True  # the next caller becomes the probe instead of being short-circuited
+    assert breaker.mode == "half_open"
+
+
+def test_probe_rejected_while_queued_is_released(half_open):
+    breaker, _ = half_open
+    token = server._request_priority.set((server.URGENCY_RANK["medium"], time.time(), time.time() + 0.05))
+    try:
+        with pytest.raises(AdmissionRejected):
+            server.chat_completion("test", MESSAGES, temperature=0, max_tokens=5)
+    finally:
+        server._request_priority.reset(token)
+    assert_probe_available(breaker)
+
+
+def test_probe_cancelled_while_queued_is_released(half_open):
+    breaker, _ = half_open
+    
+    async def cancel_queued_call():
+        task = asyncio.ensure_future(server.achat_completion("test", MESSAGES, temperature=0, max_tokens=5))
+        await asyncio.sleep(0.05)  # the probe is now waiting for the LLM slot
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    asyncio.run(cancel_queued_call())
+    assert_probe_available(breaker)
+
+
+def test_failed_probe_reopens_the_circuit(half_open, monkeypatch):
+    breaker, limiter = half_open
+    limiter.release()
+    
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("backend down")
+    
+    monkeypatch.setattr(server, "_raw_chat_completion", unreachable)
+    with pytest.raises(ConnectionError):
+        server.chat_completion("test", MESSAGES, temperature=0, max_tokens=5)
+    assert breaker.mode == "open"
+    monkeypatch.setattr(server, "LLM_BREAKER_COOLDOWN", 60.0)
+    with pytest.raises(server.LLMUnavailable):
+        breaker.before_call()
+    limiter.acquire(bounded=False)
+
+
+def test_cache_hits_and_misses_are_exported_per_call_site(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    cache = server.CompletionCache(max_entries=4, ttl=60, path=path)
+    key = server.CompletionCache.key(MESSAGES, 0, 5)
+    
+    def count(name):
+        return server.metrics.get(name, labels={"call_site": "cache_test"})
+    
+    hits, misses = count("llm_cache_hits"), count("llm_cache_misses")
+    assert cache.get("cache_test", key) is None
+    cache.put(key, "pong")
+    assert cache.get("cache_test", key) == "pong"  # memory tier
+    assert server.CompletionCache(path=path).get("cache_test", key) == "pong"  # SQLite tier of a fresh process
+    assert (count("llm_cache_hits") - hits, count("llm_cache_misses") - misses) == (2, 1)
+    assert 'meeting_assistant_llm_cache_hits{call_site="cache_test"}' in server.metrics.prometheus()
@@ -0,0 +1,58 @@
+"""RuleBasedMeetingParser: negated urgency cues and the "sat" weekday abbreviation"""
+from datetime import datetime
+
+import pytest
+
+from submission_server import PARSE_CONFIDENCE_THRESHOLD, rule_parser
+
+BASE = datetime(2025, 7, 2, 12, 34, 55)  # a Wednesday
+SLOT = " Meet Monday at 3 PM for 30 minutes."
+
+
+def parse(email: str) -> tuple:
+    return rule_parser.parse(email, BASE)
+
+
+@pytest.mark.parametrize("email, urgency", [
+    ("Important:" + SLOT, "high"),
+    ("URGENT -" + SLOT, "urgent"),
+    ("Nothing important." + SLOT, "medium"),
+    ("This is not important:" + SLOT, "medium"),
+    ("No emergency, really." + SLOT, "medium"),
+    ("It is not that urgent." + SLOT, "low"),
+    ("It isn't urgent." + SLOT, "low"),
+    ("Not a low priority item, it is critical." + SLOT, "high"),
+    ("Nothing important, whenever works", "low"),
+])
+def test_negated_urgency_cues_do_not_count(email, urgency):
+    assert parse(email)[0]["urgency"] == urgency
+
+
+def test_negation_does_not_reach_across_clauses():
+    assert parse("No rush on the report, but this is important." + SLOT)[0]["urgency"] == "low"
+    assert rule_parser.urgency("The deck is not done. Important: we need to talk") == "high"
+
+
+def test_conflicting_urgency_cues_are_left_to_the_llm():
+    info, confidence = parse("It isn't urgent but important." + SLOT)
+    assert confidence < PARSE_CONFIDENCE_THRESHOLD
+    _, plain_confidence = parse("Important." + SLOT)
+    assert plain_confidence >= PARSE_CONFIDENCE_THRESHOLD
+
+
+def test_sat_the_verb_is_not_a_weekday():
+    info, _ = parse("We sat at the table yesterday." + SLOT)
+    assert info["preferred_datetime"] == "2025-07-07T15:00:00+05:30"  # Monday, with no competing day
+    info, confidence = parse("Meet at 3 PM for 30 minutes, we sat down earlier")
+    assert info["preferred_datetime"] == "2025-07-03T15:00:00+05:30"  # the no-day default (Thursday)
+    assert confidence < PARSE_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("email", [
+    "Meet on Sat at 3 PM for 30 minutes",
+    "Meet sat at 3 PM for 30 minutes",
+    "Meet Saturday at 3 PM for 30 minutes",
+    "Meet this sat, 3 PM, 30 minutes",
+])
+def test_sat_in_a_date_context_is_saturday(email):
+    assert parse(email)[0]["preferred_datetime"] == "2025-07-05T15:00:00+05:30"